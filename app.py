@@ -1,28 +1,42 @@
 import streamlit as st
-import anthropic
-import base64
-import json
+import hashlib
+import logging
 import math
-import re
-from collections import defaultdict
+import os
+import time
+import uuid
 from html import escape as html_escape
 
 from core.pension_core import (
-    SYSTEM_PROMPT, USER_PROMPT,
-    format_number, g,
-    get_payment_value, get_movement_value,
-    detect_deposit_source, validate_report,
-    compute_analysis, check_insurance,
-    FUND_PLANS, ADVISOR_PLAN, MAX_FEES,
-    extract_fee_rates, calc_annual_fee,
-    EQUITY_TRACKS, MADEDEI_WARNING_FUNDS,
-    find_fund_key, is_equity_track, is_age_related_track,
-    GOV_EMPLOYERS, GOV_ADVISORY_URL, is_gov_employer,
+    format_number, get_movement_value,
+    EQUITY_TRACKS, MADEDEI_WARNING_FUNDS, GOV_ADVISORY_URL,
+)
+from core.extraction_cache import (
+    ExtractionCache, pdf_hash, cache_key,
+    DEFAULT_CACHE_PATH, DEFAULT_TTL_SECONDS, DEFAULT_MAX_BYTES,
+)
+from core.messages import (
+    INSURED_INCOME_LINE, DISABILITY_PENSION_INFO, MAXIMUM_COVERAGE,
+    CURRENT_FEES, CHEAPER_FUND, CHEAPER_FUND_AND_ADVISOR, CHEAPER_ADVISOR, ALTSHULER_RETURNS,
+    MENORAH_ACTUARIAL_DEFICIT, DEPOSIT_AVERAGE, MISSING_SELF_DEPOSITS, MISSING_EMPLOYER_DEPOSITS,
+    LAST_MONTH_NOTE, LOW_DEPOSIT_RATE, EXCESS_SELF_DEPOSIT, EQUITY_RECOMMENDATION,
+    SPLIT_TRACKS_SELF_EMPLOYED, SPLIT_TRACKS_EMPLOYEE, SP500_CONCENTRATION, MADEDEI_CONCENTRATION, HALACHA_TRACK,
+    PORTFOLIO_DUPLICATE_INSURANCE, PORTFOLIO_CONSOLIDATION, PORTFOLIO_CONSOLIDATION_SAVING, GOV_ADVISORY_SUBSIDY,
+)
+from core.report_model import build_report_model, data_hash, MIXED_DEPOSIT_SOURCE
+from core.portfolio import build_portfolio_models, compute_portfolio
+from core.history_store import HistoryStore, DEFAULT_HISTORY_PATH
+from core.tracing import tracer, span, traced, start_metrics_server, start_metrics_file_writer
+from core.jobs import ExtractionJobQueue, DEFAULT_MAX_WORKERS
+from core.admission import (
+    AdmissionController, MemoryBucketStore, SQLiteBucketStore,
+    CLIENT_LIMIT, DEFAULT_CLIENT_BURST, DEFAULT_CLIENT_PER_HOUR, DEFAULT_GLOBAL_BURST,
+    DEFAULT_GLOBAL_PER_MINUTE, DEFAULT_MAX_WAIT_SECONDS, DEFAULT_MAX_QUEUE_DEPTH,
 )
 
 # ─── Security Constants ───
 MAX_PDF_SIZE_KB = 400  # Maximum PDF size in KB
-MAX_ANALYSES_PER_SESSION = 10  # Rate limit per session
+JOB_POLL_SECONDS = 1.5  # How often a session checks its extraction job
 
 
 # ─── Safe HTML helper ───
@@ -41,184 +55,24 @@ st.set_page_config(
 )
 
 # ─── Custom CSS for RTL + Dark styling ───
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Heebo:wght@400;500;600;700;800&family=Alef:wght@400;700&display=swap');
-
-/* Global RTL */
-.stApp, .main, .block-container {
-    direction: rtl;
-    font-family: 'Alef', sans-serif !important;
-    font-size: 1.15rem !important;
-}
+# The stylesheet (static/app.css) is served by streamlit's static file serving and
+# cached by the browser, so a rerun sends a link tag rather than the whole CSS.
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "app.css")
 
-/* Headings use Heebo */
-.stMarkdown h1, .stMarkdown h2, .stMarkdown h3, .stMarkdown h4,
-[data-testid="stMarkdownContainer"] h1,
-[data-testid="stMarkdownContainer"] h2,
-[data-testid="stMarkdownContainer"] h3,
-[data-testid="stMarkdownContainer"] h4 {
-    font-family: 'Heebo', sans-serif !important;
-    text-align: right;
-    direction: rtl;
-}
-
-/* Hide anchor links next to headers */
-.stMarkdown h1 a, .stMarkdown h2 a, .stMarkdown h3 a, .stMarkdown h4 a,
-[data-testid="stMarkdownContainer"] h1 a,
-[data-testid="stMarkdownContainer"] h2 a,
-[data-testid="stMarkdownContainer"] h3 a,
-[data-testid="stMarkdownContainer"] h4 a {
-    display: none !important;
-}
-
-/* Force right-align and font on all markdown and alert content */
-.stMarkdown, .stAlert, .stMarkdown p,
-[data-testid="stMarkdownContainer"],
-[data-testid="stMarkdownContainer"] p,
-[data-testid="stMarkdownContainer"] span,
-[data-testid="stAlert"] p,
-[data-testid="stAlert"] span {
-    text-align: right;
-    direction: rtl;
-    font-family: 'Alef', sans-serif !important;
-    font-size: 1.15rem !important;
-}
 
-/* Table cells */
-.pension-table td, .pension-table th {
-    font-family: 'Alef', sans-serif !important;
-    font-size: 1.05rem !important;
-}
-
-/* Hero section */
-.hero-title {
-    text-align: center;
-    font-size: 2.4rem;
-    font-weight: 800;
-    font-family: 'Heebo', sans-serif;
-    background: linear-gradient(135deg, #38bdf8, #a78bfa, #f472b6);
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-    background-clip: text;
-    margin-bottom: 4px;
-}
-.hero-sub {
-    text-align: center;
-    color: #94a3b8;
-    font-size: 1rem;
-    margin-bottom: 32px;
-}
-
-/* Summary cards */
-.summary-row {
-    display: flex;
-    gap: 12px;
-    margin-bottom: 24px;
-    flex-wrap: wrap;
-}
-.summary-card {
-    flex: 1;
-    min-width: 140px;
-    background: rgba(15, 23, 42, 0.6);
-    border: 1px solid #1e293b;
-    border-radius: 12px;
-    padding: 16px;
-    text-align: center;
-}
-.sc-label {
-    font-size: 0.75rem;
-    color: #64748b;
-    margin-bottom: 4px;
-}
-.sc-value {
-    font-size: 1.1rem;
-    font-weight: 700;
-    color: #e2e8f0;
-}
-.sc-highlight {
-    background: linear-gradient(135deg, #38bdf8, #a78bfa);
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-    background-clip: text;
-}
+@st.cache_resource
+def page_styles():
+    """HTML that applies the stylesheet, built once per process: a <link> versioned by
+    content hash, or the CSS inline when static file serving is off."""
+    with open(STYLESHEET_PATH, encoding="utf-8") as f:
+        css = f.read()
+    if st.get_option("server.enableStaticServing"):
+        version = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+        return f'<link rel="stylesheet" href="app/static/app.css?v={version}">'
+    return f"<style>{css}</style>"
 
-/* Table styling */
-.pension-table {
-    width: 100%;
-    border-collapse: separate;
-    border-spacing: 0;
-    font-size: 0.88rem;
-    direction: rtl;
-}
-.pension-table thead th {
-    padding: 12px 14px;
-    background: rgba(30, 41, 59, 0.7);
-    color: #94a3b8;
-    font-weight: 600;
-    font-size: 0.8rem;
-    text-align: right;
-    border-bottom: 1px solid #334155;
-}
-.pension-table tbody td {
-    padding: 11px 14px;
-    border-bottom: 1px solid rgba(30, 41, 59, 0.5);
-    color: #cbd5e1;
-}
-.pension-table tbody tr:hover td {
-    background: rgba(56, 189, 248, 0.03);
-}
-.num-cell {
-    text-align: left;
-    font-variant-numeric: tabular-nums;
-    font-weight: 500;
-    direction: ltr;
-    unicode-bidi: embed;
-}
-.neg {
-    color: #f87171 !important;
-}
-.label-cell {
-    font-weight: 600;
-    color: #94a3b8;
-    width: 160px;
-}
-.value-cell {
-    color: #e2e8f0;
-    font-weight: 500;
-}
-.total-row td {
-    background: rgba(56, 189, 248, 0.06) !important;
-    font-weight: 700 !important;
-    border-top: 2px solid rgba(56, 189, 248, 0.2);
-    color: #38bdf8 !important;
-}
-.total-cell {
-    color: #38bdf8 !important;
-    font-weight: 700;
-}
-.empty-msg {
-    text-align: center;
-    color: #475569;
-    padding: 24px;
-    font-style: italic;
-}
 
-/* Hide Streamlit defaults */
-.stDeployButton, header[data-testid="stHeader"] { display: none !important; }
-[data-testid="stToolbar"] { display: none !important; }
-[data-testid="stDecoration"] { display: none !important; }
-.viewerBadge_container__r5tak { display: none !important; }
-iframe[title="streamlit_app"] + div { display: none !important; }
-#MainMenu { display: none !important; }
-footer { display: none !important; }
-
-/* Radio buttons RTL fix */
-.stRadio > div { direction: rtl; }
-.stRadio label { font-family: 'Alef', sans-serif; }
-.stCheckbox label { font-family: 'Alef', sans-serif; }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(page_styles(), unsafe_allow_html=True)
 
 # ─── Helper Functions (app.py-only) ───
 def is_negative(n):
@@ -241,66 +95,169 @@ def num_td(value, is_total=False):
     return f'<td class="{" ".join(classes)}">{safe(format_number(value))}</td>'
 
 
-def call_anthropic(pdf_bytes):
-    """Send PDF to Anthropic API and return parsed JSON."""
-    api_key = st.secrets.get("ANTHROPIC_API_KEY", "")
-    if not api_key:
-        st.error("מפתח API לא הוגדר. הגדר ANTHROPIC_API_KEY ב-Secrets.")
-        return None
+logger = logging.getLogger(__name__)
 
-    client = anthropic.Anthropic(api_key=api_key)
-    b64 = base64.standard_b64encode(pdf_bytes).decode("utf-8")
 
-    try:
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=8000,
-            system=SYSTEM_PROMPT,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "document",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "application/pdf",
-                                "data": b64,
-                            },
-                        },
-                        {"type": "text", "text": USER_PROMPT},
-                    ],
-                }
-            ],
-        )
-    except anthropic.BadRequestError as e:
-        error_msg = str(e.message) if hasattr(e, 'message') else str(e)
-        if "credit balance" in error_msg.lower():
-            st.error("שגיאה: אין מספיק קרדיט ב-API. יש לרכוש קרדיט נוסף.")
-        else:
-            st.error("שגיאה בעיבוד הדוח. נסה שוב או העלה דוח אחר.")
-        return None
-    except anthropic.APIError:
-        st.error("שגיאה בתקשורת עם שרת ה-AI. נסה שוב מאוחר יותר.")
-        return None
+@st.cache_resource
+def get_extraction_cache():
+    """Process-wide extraction cache, shared by all sessions."""
+    return ExtractionCache(
+        path=st.secrets.get("EXTRACTION_CACHE_PATH", DEFAULT_CACHE_PATH),
+        ttl_seconds=int(st.secrets.get("EXTRACTION_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        max_bytes=int(st.secrets.get("EXTRACTION_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+    )
 
-    text = "".join(block.text for block in message.content if hasattr(block, "text"))
-    clean = text.replace("```json", "").replace("```", "").strip()
 
-    try:
-        return json.loads(clean)
-    except json.JSONDecodeError:
-        st.error("שגיאה בפענוח התשובה מה-AI. נסה שוב.")
+@st.cache_resource
+def get_history_store():
+    """Process-wide store of past analyses for year-over-year trends.
+    None (history disabled) when HISTORY_SALT is not set."""
+    salt = st.secrets.get("HISTORY_SALT", "")
+    if not salt:
+        logger.warning("HISTORY_SALT is not set: report history is disabled")
         return None
+    return HistoryStore(path=st.secrets.get("HISTORY_DB_PATH", DEFAULT_HISTORY_PATH), salt=salt)
+
+
+@st.cache_resource
+def get_model_router():
+    """Process-wide model tiering router (EXTRACTION_MODELS: comma-separated, cheapest first)."""
+    from core.model_router import ModelRouter, parse_model_tiers
+
+    return ModelRouter(parse_model_tiers(st.secrets.get("EXTRACTION_MODELS", "")))
+
+
+def get_metrics_counters():
+    """API client counters plus model router, admission and job queue stats, for the metrics exporters."""
+    from core.api_client import get_client_metrics
+
+    return {**get_client_metrics(), **get_model_router().stats(), **get_admission_controller().stats(),
+            "jobs/coalesced": get_job_queue().coalesced}
+
+
+@st.cache_resource
+def get_admission_controller():
+    """Process-wide rate limiter of new extractions. With ADMISSION_DB_PATH set, the
+    buckets are kept in SQLite and shared by every app process on the host."""
+    path = st.secrets.get("ADMISSION_DB_PATH", "")
+    return AdmissionController(
+        SQLiteBucketStore(path) if path else MemoryBucketStore(),
+        client_burst=int(st.secrets.get("ADMISSION_CLIENT_BURST", DEFAULT_CLIENT_BURST)),
+        client_per_hour=float(st.secrets.get("ADMISSION_CLIENT_PER_HOUR", DEFAULT_CLIENT_PER_HOUR)),
+        global_burst=int(st.secrets.get("ADMISSION_GLOBAL_BURST", DEFAULT_GLOBAL_BURST)),
+        global_per_minute=float(st.secrets.get("ADMISSION_GLOBAL_PER_MINUTE", DEFAULT_GLOBAL_PER_MINUTE)),
+        max_wait_seconds=float(st.secrets.get("ADMISSION_MAX_WAIT_SECONDS", DEFAULT_MAX_WAIT_SECONDS)),
+        max_queue_depth=int(st.secrets.get("ADMISSION_MAX_QUEUE_DEPTH", DEFAULT_MAX_QUEUE_DEPTH)),
+    )
+
+
+def client_key():
+    """Rate limiting key of the current user: the client IP, which survives a page
+    refresh, or the session when the IP is unknown. X-Forwarded-For is only used
+    when ADMISSION_TRUST_PROXY is set, since clients can forge it."""
+    context = getattr(st, "context", None)
+    ip = ""
+    if context is not None:
+        if str(st.secrets.get("ADMISSION_TRUST_PROXY", "")).lower() in ("1", "true", "yes"):
+            ip = context.headers.get("X-Forwarded-For", "").split(",")[0].strip()
+        ip = ip or getattr(context, "ip_address", None) or ""
+    if ip:
+        return f"ip:{ip}"
+    return f"session:{st.session_state.setdefault('client_id', uuid.uuid4().hex)}"
+
+
+def is_served_without_api(pdf_bytes):
+    """Whether an extraction of this PDF won't call the API: it is already being
+    extracted, its result is in the history store, or ModelRouter.extract would
+    accept a cached answer (the final tier's, or a cheaper tier's that passes
+    report_problems)."""
+    if get_job_queue().is_in_flight(pdf_bytes):
+        return True
+    history = get_history_store()
+    if history and history.has_pdf(pdf_hash(pdf_bytes)):
+        return True
+    # A cached answer of a cheaper tier only saves the API call if the router won't escalate it
+    from core.model_router import report_problems
+
+    cache = get_extraction_cache()
+    *cheaper, final = get_model_router().models
+    for model in cheaper:
+        cached = cache.get(cache_key(pdf_bytes, model))
+        if cached is not None and not report_problems(cached):
+            return True
+    return cache.contains(cache_key(pdf_bytes, final))
+
+
+def admit_extraction(pdf_bytes):
+    """Ask the admission controller for one extraction. Returns None when admitted,
+    otherwise the message to show. A PDF that won't call the API (re-opening an
+    analysed report, or joining an in-flight job) is admitted without a token."""
+    if is_served_without_api(pdf_bytes):
+        return None
+    admission = get_admission_controller().admit(client_key(), get_job_queue().pending_count())
+    if admission.admitted:
+        return None
+    minutes = max(1, math.ceil(admission.retry_after_seconds / 60))
+    if admission.reason == CLIENT_LIMIT:
+        return f"הגעת למגבלת הניתוחים. ניתן לנסות שוב בעוד {minutes} דקות."
+    return "המערכת עמוסה כרגע. נסה שוב בעוד דקה."
 
 
+@st.cache_resource
+def get_job_queue():
+    """Process-wide extraction worker pool, shared by all sessions.
+    The extraction stack (anthropic, httpx, PyMuPDF) is imported here, on the first
+    upload, rather than at the top of the script, so it doesn't delay the first paint."""
+    from core.api_client import load_client_settings
 
-
-def render_insurance_analysis(data, user_profile, analysis=None):
+    api_key = st.secrets.get("ANTHROPIC_API_KEY", "")
+    cache = get_extraction_cache()
+    client_settings = load_client_settings(st.secrets)
+    history = get_history_store()
+    router = get_model_router()
+    section_parallel = str(st.secrets.get("EXTRACTION_SECTION_PARALLEL", "")).lower() in ("1", "true", "yes")
+
+    def extract(pdf_bytes, on_progress):
+        # A report analysed before (even after its cache entry expired) comes from the history store
+        digest = pdf_hash(pdf_bytes)
+        data = history.get_by_pdf(digest) if history else None
+        if data is None:
+            data = router.extract(
+                pdf_bytes, api_key, cache=cache, client_settings=client_settings, on_progress=on_progress,
+                section_parallel=section_parallel,
+            )
+            if history:
+                # History is a by-product: failing to record must not fail a paid, successful extraction
+                try:
+                    history.record(data, digest)
+                except Exception:
+                    logger.exception("could not record report history")
+        return data
+
+    return ExtractionJobQueue(
+        extract,
+        max_workers=int(st.secrets.get("EXTRACTION_MAX_WORKERS", DEFAULT_MAX_WORKERS)),
+    )
+
+
+@st.cache_resource
+def get_metrics_exporter():
+    """Start the Prometheus exporters configured in secrets (once per process).
+    METRICS_PORT serves GET /metrics; METRICS_FILE is rewritten periodically."""
+    port = st.secrets.get("METRICS_PORT")
+    path = st.secrets.get("METRICS_FILE")
+    if port:
+        start_metrics_server(st.secrets.get("METRICS_HOST", "127.0.0.1"), int(port), extra=get_metrics_counters)
+    if path:
+        start_metrics_file_writer(path, float(st.secrets.get("METRICS_INTERVAL_SECONDS", 15)), extra=get_metrics_counters)
+    return bool(port or path)
+
+
+@traced()
+def render_insurance_analysis(model):
     """Render the insurance analysis section."""
-    if analysis is None:
-        analysis = compute_analysis(data, user_profile)
-    warnings = check_insurance(analysis, user_profile)
+    analysis = model.analysis
+    warnings = model.insurance_warnings
 
     st.markdown("### 🛡️ בחינת הכיסויים הביטוחיים בקרן")
 
@@ -319,7 +276,7 @@ def render_insurance_analysis(data, user_profile, analysis=None):
         rate_note = ""
         if deposit_source == "עצמאי" and analysis.get("deposit_rate_non_default"):
             rate_note = " (שים לב - החישוב נעשה שלא לפי שיעור הפקדה ברירת מחדל – 16%)"
-        st.markdown(f"**הכנסה מבוטחת:** ₪{income:,} &nbsp;|&nbsp; **שיעור הפקדה:** {rate}%{rate_note}", unsafe_allow_html=True)
+        st.markdown(INSURED_INCOME_LINE.render(income=income, rate=rate, rate_note=rate_note), unsafe_allow_html=True)
 
     st.markdown("---")
 
@@ -332,31 +289,17 @@ def render_insurance_analysis(data, user_profile, analysis=None):
             else:
                 st.warning(f"{icon} {formatted}")
         # Show disability info even when there are warnings
-        disability_val_num = analysis.get("disability_pension", 0)
-        if disability_val_num > 0:
-            disability_val = format_number(disability_val_num)
-            st.info(f"במקרה של נכות של 75% ומעלה הקרן תשלם קצבה חודשית של **₪{disability_val}**.")
+        disability = analysis.get("disability_pension", 0)
+        if disability > 0:
+            st.info(DISABILITY_PENSION_INFO.render(disability=disability))
     else:
         # ── Default: everything looks good ──
-        gender = user_profile.get("gender", "גבר")
-        spouse_word = "לאשתך" if gender == "גבר" else "לבעלך"
-
-        spouse_val_num = analysis.get("spouse_pension", 0)
-        orphan_val_num = analysis.get("orphan_pension", 0)
-        total_survivors = spouse_val_num + orphan_val_num
-        spouse_val = format_number(spouse_val_num)
-        orphan_val = format_number(orphan_val_num)
-        total_survivors_val = format_number(total_survivors)
-        disability_val = format_number(analysis.get("disability_pension", 0))
-
-        nimtsa = g(gender, "נמצא", "נמצאת")
-        msg = f"""מהדוח נראה ש{g(gender, 'אתה', 'את')} {nimtsa} במסלול ביטוח עם כיסויים מקסימליים.
-
-הקרן מבטיחה {spouse_word} קצבה חודשית של **₪{spouse_val}** לכל החיים אם ח"ו יקרה לך משהו.
-בנוסף הקרן תשלם **₪{orphan_val}** בכל חודש עד שהילד הקטן יגיע לגיל 21, ובסך הכל **₪{total_survivors_val}**.
-
-במקרה של נכות של 75% ומעלה הקרן תשלם קצבה חודשית של **₪{disability_val}**."""
-        st.success(msg)
+        spouse = analysis.get("spouse_pension", 0)
+        orphan = analysis.get("orphan_pension", 0)
+        st.success(MAXIMUM_COVERAGE.render(
+            model.gender, spouse=spouse, orphan=orphan, total=spouse + orphan,
+            disability=analysis.get("disability_pension", 0),
+        ))
 
 
 # ─── בדיקת דמי ניהול ───
@@ -398,96 +341,40 @@ def build_gauge_svg(value_pct, cheapest_amount=0, max_amount=0):
     return svg
 
 
-def render_fee_analysis(data, analysis, user_profile):
+@traced()
+def render_fee_analysis(model):
     """Render fee analysis section with gauge and comparison table."""
     st.markdown("### 🏷️ בחינת דמי ניהול")
-    gender = user_profile.get("gender", "גבר")
+    gender = model.gender
 
-    closing_balance = analysis.get("closing_balance", 0)
-    if not closing_balance or closing_balance <= 0:
+    fees = model.fees
+    if fees["status"] == "no_balance":
         st.info("אין מספיק נתונים לבחינת דמי ניהול.")
         return
-
-    # Extract current fee rates
-    deposit_fee, savings_fee = extract_fee_rates(data)
-    if deposit_fee == 0 and savings_fee == 0:
+    if fees["status"] == "no_fees":
         st.info("לא נמצאו נתוני דמי ניהול בדוח.")
         return
 
-    # Calculate projected annual deposit from actual deposits in report
-    total_deposits = analysis.get("total_deposits", 0)
-    report_period = analysis.get("report_period", "")
-    if "רבעון 1" in report_period or "רבעון ראשון" in report_period:
-        annual_deposit = total_deposits * 4
-    elif "רבעון 2" in report_period or "רבעון שני" in report_period:
-        annual_deposit = total_deposits * 2
-    elif "רבעון 3" in report_period or "רבעון שלישי" in report_period:
-        annual_deposit = round(total_deposits * 4 / 3)
-    elif "רבעון 4" in report_period or "רבעון רביעי" in report_period:
-        annual_deposit = total_deposits
-    else:
-        annual_deposit = total_deposits
-    monthly_deposit = annual_deposit / 12
-    avg_savings = closing_balance * 1.02 + 6 * monthly_deposit
-
-    # Current fees
-    current_fee = calc_annual_fee(deposit_fee, savings_fee, annual_deposit, avg_savings)
-
-    # Maximum fees
-    max_fee = calc_annual_fee(MAX_FEES[0], MAX_FEES[1], annual_deposit, avg_savings)
-
-    # Build all options with fund names: (fund_name, dep%, sav%, annual_fee)
-    all_options = []
-    for fund_name, plans in FUND_PLANS.items():
-        for dep, sav in plans:
-            fee = calc_annual_fee(dep, sav, annual_deposit, avg_savings)
-            all_options.append((fund_name, dep, sav, fee))
-
-    adv_fee = calc_annual_fee(ADVISOR_PLAN[0], ADVISOR_PLAN[1], annual_deposit, avg_savings)
-
-    # Find cheapest (including current)
-    all_fees = [current_fee] + [o[3] for o in all_options] + [adv_fee]
-    cheapest_fee = min(all_fees)
-
-    # Gauge position: 0% = cheapest, 100% = max
-    if max_fee > cheapest_fee:
-        gauge_pct = ((current_fee - cheapest_fee) / (max_fee - cheapest_fee)) * 100
-        gauge_pct = max(0, min(100, gauge_pct))
-    else:
-        gauge_pct = 50
+    deposit_fee = fees["deposit_fee"]
+    savings_fee = fees["savings_fee"]
+    current_fee = fees["current_fee"]
+    cheapest_fee = fees["cheapest_fee"]
+    adv_fee = fees["adv_fee"]
 
     # ── Display current fees ──
-    st.markdown(f"""
-**דמי הניהול שלך:** {deposit_fee}% מהפקדה + {savings_fee}% מצבירה
-**עלות שנתית צפויה:** ₪{format_number(round(current_fee))}
-""")
+    st.markdown(CURRENT_FEES.render(deposit_fee=deposit_fee, savings_fee=savings_fee, current_fee=current_fee))
 
     # ── Gauge ──
-    st.markdown(build_gauge_svg(gauge_pct, round(cheapest_fee), round(max_fee)), unsafe_allow_html=True)
+    st.markdown(build_gauge_svg(fees["gauge_pct"], round(cheapest_fee), round(fees["max_fee"])), unsafe_allow_html=True)
     st.markdown(f'<div style="text-align:center;color:#94a3b8;font-size:0.85rem;margin-top:4px;">דמי הניהול שלך ביחס לטווח האפשרויות</div>', unsafe_allow_html=True)
 
     # ── Recommendations ──
-
-    # Sort non-advisor options by fee
-    all_options.sort(key=lambda x: x[3])
-
-    # Find cheapest non-advisor option (may have multiple funds with same fee)
-    cheapest_fund_fee = all_options[0][3] if all_options else None
-    cheapest_fund_dep = all_options[0][1] if all_options else None
-    cheapest_fund_sav = all_options[0][2] if all_options else None
-
-    # All fund names that offer the cheapest plan
-    cheapest_fund_names = []
-    if cheapest_fund_fee is not None:
-        cheapest_fund_names = list(set(
-            o[0] for o in all_options if abs(o[3] - cheapest_fund_fee) < 1
-        ))
-
-    # Is advisor cheapest overall?
-    advisor_is_cheapest = adv_fee < cheapest_fund_fee if cheapest_fund_fee else False
-
-    # Max possible saving
-    max_saving = current_fee - cheapest_fee
+    cheapest_fund_fee = fees["cheapest_fund_fee"]
+    cheapest_fund_dep = fees["cheapest_fund_dep"]
+    cheapest_fund_sav = fees["cheapest_fund_sav"]
+    cheapest_fund_names = fees["cheapest_fund_names"]
+    advisor_is_cheapest = fees["advisor_is_cheapest"]
+    max_saving = fees["max_saving"]
 
     if current_fee <= cheapest_fee * 1.05:
         st.success("✅ דמי הניהול שלך ברמה תחרותית מאוד!")
@@ -495,162 +382,67 @@ def render_fee_analysis(data, analysis, user_profile):
         st.success("✅ דמי הניהול שלך ברמה תחרותית מאוד!")
     elif advisor_is_cheapest and adv_fee < current_fee:
         # Advisor is cheapest - show second best (fund) first, then advisor
-        fund_saving = current_fee - cheapest_fund_fee
-        adv_saving = current_fee - adv_fee
-        fund_names_str = " / ".join(cheapest_fund_names)
-
-        msg = f"""בקרן הפנסיה של **{fund_names_str}** {g(gender, 'תוכל', 'תוכלי')} לקבל דמי ניהול של {cheapest_fund_dep}% מהפקדה + {cheapest_fund_sav}% מצבירה.
-{g(gender, 'תוכל', 'תוכלי')} לחסוך בשנה הבאה בערך **₪{format_number(round(fund_saving))}**.
-
-יועץ פנסיוני יוכל להשיג לך דמי ניהול של 1% על ההפקדה ו-0.145% מהצבירה.
-כך {g(gender, 'תחסוך', 'תחסכי')} בשנה הבאה בערך **₪{format_number(round(adv_saving))}**."""
-        st.info(f"💡 {msg}")
+        st.info(CHEAPER_FUND_AND_ADVISOR.render(
+            gender, fund_names=" / ".join(cheapest_fund_names), deposit_fee=cheapest_fund_dep,
+            savings_fee=cheapest_fund_sav, saving=current_fee - cheapest_fund_fee, advisor_saving=current_fee - adv_fee,
+        ))
         if any("אלטשולר" in name for name in cheapest_fund_names):
-            st.warning(f"⚠️ יחד עם זאת {g(gender, 'קח', 'קחי')} בחשבון שהתשואות של אלטשולר בלטו לרעה בשנים האחרונות.")
+            st.warning(ALTSHULER_RETURNS.render(gender))
     elif cheapest_fund_fee is not None and cheapest_fund_fee < current_fee:
         # Fund is cheapest
-        fund_saving = current_fee - cheapest_fund_fee
-        fund_names_str = " / ".join(cheapest_fund_names)
-
-        msg = f"""בקרן הפנסיה של **{fund_names_str}** {g(gender, 'תוכל', 'תוכלי')} לקבל דמי ניהול של {cheapest_fund_dep}% מהפקדה + {cheapest_fund_sav}% מצבירה.
-{g(gender, 'תוכל', 'תוכלי')} לחסוך בשנה הבאה בערך **₪{format_number(round(fund_saving))}**."""
-        st.info(f"💡 {msg}")
+        st.info(CHEAPER_FUND.render(
+            gender, fund_names=" / ".join(cheapest_fund_names), deposit_fee=cheapest_fund_dep,
+            savings_fee=cheapest_fund_sav, saving=current_fee - cheapest_fund_fee,
+        ))
         if any("אלטשולר" in name for name in cheapest_fund_names):
-            st.warning(f"⚠️ יחד עם זאת {g(gender, 'קח', 'קחי')} בחשבון שהתשואות של אלטשולר בלטו לרעה בשנים האחרונות.")
+            st.warning(ALTSHULER_RETURNS.render(gender))
 
         # Also mention advisor if even cheaper
         if adv_fee < current_fee:
-            adv_saving = current_fee - adv_fee
-            st.info(f"💡 יועץ פנסיוני יוכל להשיג לך דמי ניהול של 1% על ההפקדה ו-0.145% מהצבירה. כך {g(gender, 'תחסוך', 'תחסכי')} בשנה הבאה בערך **₪{format_number(round(adv_saving))}**.")
+            st.info(CHEAPER_ADVISOR.render(gender, advisor_saving=current_fee - adv_fee))
 
     # ── Menorah warning ──
-    fund_name_str = analysis.get("fund_name", "")
+    fund_name_str = model.analysis.get("fund_name", "")
     if "מנורה" in fund_name_str:
-        actuarial_cost = get_movement_value(data.get("movements", []), "אקטוארי")
-        msg = f"""{g(gender, 'שים', 'שימי')} לב, בדוח מופיע שהורידו לך **₪{format_number(round(actuarial_cost))}** בתקופת הדוח בגלל הגרעון האקטוארי של הקרן.
-קרן הפנסיה של מנורה היא באופן כמעט עקבי עם האיזון האקטוארי הגרוע ביותר מה שגורע מהצבירה הפנסיונית שלך.
-ב-5 השנים האחרונות הגרעון הממוצע של הקרן היה 0.19% בשעה שיש קרנות שהחזירו כסף לחוסכים אצלם!
-ההשפעה של גרעון אקטוארי שקולה להשפעה של דמי ניהול מצבירה.
-{g(gender, 'שקול', 'שיקלי')} לעבור לקרן פנסיה אחרת ובפרט קרנות שהציגו איזון אקטוארי חיובי, גם אם דמי הניהול יהיו מעט יותר גבוהים."""
-        formatted = msg.replace("\n", "  \n")
-        st.warning(f"⚠️ {formatted}")
+        actuarial_cost = get_movement_value(model.data.get("movements", []), "אקטוארי")
+        st.warning(MENORAH_ACTUARIAL_DEFICIT.markdown(gender, actuarial_cost=actuarial_cost))
 
 # ─── עד כאן בדיקת דמי ניהול ───
 
 
 # ─── בחינת הפקדות ───
 
-def render_deposit_chart(data, analysis, user_profile):
+@traced()
+def render_deposit_chart(model):
     """Render a bar chart of monthly salaries deposited."""
-    deposit_source = detect_deposit_source(data)
-    gender = st.session_state.get("user_profile", {}).get("gender", "גבר")
+    summary = model.deposits
+    deposit_source = summary["deposit_source"]
+    gender = model.gender
     st.markdown("### 💰 בדיקת הפקדות")
     if deposit_source == "עצמאי":
         st.markdown("**📊 ההפקדות החודשיות לקרן**")
     else:
         st.markdown("**📊 השכר החודשי עליו בוצעו הפקדות לקרן**")
 
-    deposits = data.get("deposits", [])
-    late_deposits = data.get("late_deposits", [])
-    all_deposits = deposits + late_deposits
-
-    if not all_deposits:
+    if summary["status"] == "no_deposits":
         st.info("אין נתוני הפקדות להצגה.")
         return
-
-    # Determine report year from report_period
-    report_period = data.get("header", {}).get("report_period", "")
-    report_date = data.get("header", {}).get("report_date", "")
-
-    # Extract report year
-    report_year = None
-    year_match = re.search(r'20\d{2}', report_period)
-    if year_match:
-        report_year = int(year_match.group())
-    elif report_date:
-        year_match = re.search(r'20\d{2}', report_date)
-        if year_match:
-            report_year = int(year_match.group())
-
-    if not report_year:
+    if summary["status"] == "no_year":
         st.info("לא ניתן לזהות את שנת הדוח.")
         return
-
-    # Group data by month - only current year, skip previous years
-    # salary_month format: "MM/YYYY"
-    # For עצמאי: show total deposits. For שכיר: show salary.
-    monthly_salaries = defaultdict(list)
-    value_field = "total" if deposit_source == "עצמאי" else "salary"
-
-    for dep in all_deposits:
-        sm = dep.get("salary_month", "")
-        value = dep.get(value_field)
-        if value is None:
-            value = dep.get("salary")
-        if value is None:
-            value = dep.get("total")
-        if not value:
-            continue
-
-        # For self-employed, salary_month may be missing - fall back to deposit_date
-        if not sm:
-            dd = dep.get("deposit_date", "")
-            if dd:
-                # deposit_date format: DD/MM/YYYY or DD.MM.YYYY
-                try:
-                    parts = dd.replace(".", "/").split("/")
-                    if len(parts) == 3:
-                        sm = f"{parts[1]}/{parts[2]}"
-                except Exception:
-                    pass
-        if not sm:
-            continue
-
-        try:
-            parts = sm.split("/")
-            if len(parts) == 2:
-                month_num = int(parts[0])
-                year_num = int(parts[1])
-                # Handle 2-digit year (e.g. "24" -> 2024)
-                if year_num < 100:
-                    year_num += 2000
-                if year_num == report_year and 1 <= month_num <= 12:
-                    monthly_salaries[month_num].append(float(value))
-        except (ValueError, IndexError):
-            continue
-
-    if not monthly_salaries:
+    if summary["status"] == "no_months":
         st.info("אין נתוני הפקדות לשנת הדוח להצגה.")
         return
 
-    # ── Determine report period end month ──
-    period_end_month = 12  # default: annual
-    last_month_name = "דצמבר"
-    period_label = "השנה"
-
-    if "רבעון 1" in report_period or "רבעון ראשון" in report_period or "הרבעון הראשון" in report_period:
-        period_end_month = 3
-        last_month_name = "מרץ"
-        period_label = "הרבעון"
-    elif "רבעון 2" in report_period or "רבעון שני" in report_period or "הרבעון השני" in report_period:
-        period_end_month = 6
-        last_month_name = "יוני"
-        period_label = "הרבעון"
-    elif "רבעון 3" in report_period or "רבעון שלישי" in report_period or "הרבעון השלישי" in report_period:
-        period_end_month = 9
-        last_month_name = "ספטמבר"
-        period_label = "הרבעון"
-    elif "רבעון 4" in report_period or "רבעון רביעי" in report_period or "הרבעון הרביעי" in report_period:
-        period_end_month = 12
-        last_month_name = "דצמבר"
-        period_label = "הרבעון"
+    report_year = summary["report_year"]
+    monthly_totals = summary["monthly_totals"]
+    period_end_month = summary["period_end_month"]
+    last_month_has_deposit = summary["last_month_has_deposit"]
 
     # Build SVG bar chart - show months up to period end
-    months = list(range(1, period_end_month + 1))
+    months = summary["months"]
     num_months = len(months)
-    max_salary = max(sum(monthly_salaries.get(m, [0])) for m in months)
-    if max_salary == 0:
-        max_salary = 1
+    max_salary = summary["max_total"]
 
     chart_w = 600
     chart_h = 250
@@ -660,16 +452,12 @@ def render_deposit_chart(data, analysis, user_profile):
     bar_w = min(36, int((chart_w - 20) / num_months * 0.7))
     gap = (chart_w - num_months * bar_w) / (num_months + 1)
 
-    # Check if last month of period has a deposit (for asterisk in chart)
-    last_month_has_deposit = bool(monthly_salaries.get(period_end_month))
-
     svg = f'<svg viewBox="0 0 {chart_w} {chart_h}" xmlns="http://www.w3.org/2000/svg" style="max-width:100%;margin:0 auto;display:block;direction:ltr;">'
 
     # Bars
     for i, m in enumerate(months):
         x = gap + i * (bar_w + gap)
-        salaries = monthly_salaries.get(m, [])
-        total = sum(salaries)
+        total = monthly_totals.get(m, 0)
 
         # Draw single bar based on net total (not stacked)
         if total > 0:
@@ -697,68 +485,34 @@ def render_deposit_chart(data, analysis, user_profile):
     st.markdown(svg, unsafe_allow_html=True)
 
     # ── Summary ──
-    expected_months = list(range(1, period_end_month))  # months 1 to end-1
-    display_months = list(range(1, period_end_month + 1))  # for display including last
-
-    all_totals = [sum(monthly_salaries.get(m, [])) for m in display_months if monthly_salaries.get(m)]
-    if all_totals:
-        avg_val = sum(all_totals) / len(all_totals)
-        months_with_deposits = len(all_totals)
-        total_expected = len(display_months)
+    if summary["avg_value"] is not None:
         avg_label = "הפקדה ממוצעת" if deposit_source == "עצמאי" else "שכר ממוצע"
-        st.markdown(f"**{avg_label}:** ₪{format_number(round(avg_val))} &nbsp;|&nbsp; **חודשים עם הפקדות בשנת {report_year}:** {months_with_deposits}/{total_expected}", unsafe_allow_html=True)
+        st.markdown(DEPOSIT_AVERAGE.render(
+            avg_label=avg_label, average=summary["avg_value"], report_year=report_year,
+            months_with_deposits=summary["months_with_deposits"], months=num_months,
+        ), unsafe_allow_html=True)
 
     # Check missing deposits only for months that SHOULD have been deposited during the period
-    missing_expected = [m for m in expected_months if not monthly_salaries.get(m)]
+    missing_expected = summary["missing_months"]
     if missing_expected:
         missing_str = ", ".join(str(m) for m in missing_expected)
         if deposit_source == "עצמאי":
-            st.warning(f"⚠️ לא נמצאו הפקדות עבור חודשים: {missing_str}. {g(gender, 'וודא', 'וודאי')} שלא ביצעת הפקדות נוספות שלא נקלטו בחשבונך בקרן.")
+            st.warning(MISSING_SELF_DEPOSITS.render(gender, months=missing_str))
         else:
-            st.warning(f"⚠️ לא נמצאו הפקדות עבור חודשים: {missing_str}. יש לוודא שהמעסיק הפקיד את כל ההפקדות.")
+            st.warning(MISSING_EMPLOYER_DEPOSITS.render(months=missing_str))
 
     # Note about last month deposit - with matching red asterisk
     if not last_month_has_deposit:
-        st.markdown(f'<div style="background:#dbeafe;border-radius:8px;padding:14px 18px;color:#1e40af;font-size:1.1rem;direction:rtl;text-align:right;margin-top:8px;"><span style="color:#ef4444;font-weight:bold;font-size:1.4rem;">*</span> ההפקדה בגין חודש {last_month_name} בדרך כלל מתבצעת אחרי סוף {period_label} ולכן לא מופיעה בדוח זה.</div>', unsafe_allow_html=True)
+        st.markdown(LAST_MONTH_NOTE.render(month_name=summary["last_month_name"], period_label=summary["period_label"]),
+                    unsafe_allow_html=True)
 
     # Low deposit rate warning (moved here from insurance section)
-    deposit_source_val = analysis.get("deposit_source", "שכיר")
-    deposit_rate_val = analysis.get("deposit_rate", 0)
-    can_calc_val = analysis.get("can_calc_income", False)
-    if can_calc_val and deposit_source_val == "שכיר" and deposit_rate_val < 18.48:
-        gender = user_profile.get("gender", "גבר")
-        low_rate_msg = f"""{g(gender, 'שים', 'שימי')} לב, שיעור ההפקדות מתוך השכר נראה נמוך מהמינימום לפי חוק (6% תגמולי עובד + 6.5% תגמולי מעסיק + 6% פיצויים).
-ייתכן שמופקד לך לפנסיה גם על החזרי הוצאות (במקרה זה מקובל להפקיד רק 5% עובד ו-5% מעסיק). אחרת {g(gender, 'בדוק', 'בדקי')} מה הסיבה לכך."""
-        formatted_lr = low_rate_msg.replace("\n", "  \n")
-        st.error(f"⚠️ {formatted_lr}")
+    if summary["low_deposit_rate"]:
+        st.error(LOW_DEPOSIT_RATE.markdown(gender))
 
     # Self-employed excess deposit warning (above tax benefit threshold)
-    if deposit_source_val == "עצמאי" and report_year and report_year >= 2025:
-        gender = user_profile.get("gender", "גבר")
-        # Check last 3 months of reporting period
-        last_3_months = list(range(max(1, period_end_month - 2), period_end_month + 1))
-        last_3_totals = [sum(monthly_salaries.get(m, [])) for m in last_3_months]
-        last_3_above = all(t > 3201 for t in last_3_totals if t > 0)
-        # Also check if more than 3 months above threshold
-        all_monthly_totals = [sum(monthly_salaries.get(m, [])) for m in range(1, period_end_month + 1) if monthly_salaries.get(m)]
-        months_above = sum(1 for t in all_monthly_totals if t > 3201)
-        # Annual total
-        annual_total_deposits = sum(sum(monthly_salaries.get(m, [])) for m in range(1, period_end_month + 1))
-        # Annualize if quarterly report
-        if period_end_month <= 3:
-            projected_annual = annual_total_deposits * 4
-        elif period_end_month <= 6:
-            projected_annual = annual_total_deposits * 2
-        elif period_end_month <= 9:
-            projected_annual = round(annual_total_deposits * 4 / 3)
-        else:
-            projected_annual = annual_total_deposits
-
-        if (last_3_above and len([t for t in last_3_totals if t > 0]) >= 3) or months_above > 3 or projected_annual > 38412:
-            excess_msg = f"""{g(gender, 'אתה מפקיד', 'את מפקידה')} סכום שהוא מעבר לסכום שמקנה לך הטבות מס.
-ייתכן מאוד שכדאי להתייעץ האם נכון יותר {g(gender, 'עבורך', 'עבורך')} להפנות חלק מההפקדה לכלים פיננסיים אחרים שבהם {g(gender, 'אינך מוותר', 'אינך מוותרת')} על הנזילות של הכסף."""
-            formatted_ex = excess_msg.replace("\n", "  \n")
-            st.warning(f"⚠️ {formatted_ex}")
+    if summary["excess_self_deposit"]:
+        st.warning(EXCESS_SELF_DEPOSIT.markdown(gender))
 
 # ─── עד כאן בחינת הפקדות ───
 
@@ -766,12 +520,14 @@ def render_deposit_chart(data, analysis, user_profile):
 # ─── בחינת מסלולי השקעה ───
 
 
-def render_investment_analysis(data, analysis, user_profile):
+@traced()
+def render_investment_analysis(model):
     """Render investment track analysis."""
     st.markdown("### 📈 בחינת מסלולי השקעה")
-    gender = user_profile.get("gender", "גבר")
+    gender = model.gender
+    analysis = model.analysis
 
-    tracks = data.get("investment_tracks", [])
+    tracks = model.data.get("investment_tracks", [])
     if not tracks:
         st.info("אין נתוני מסלולי השקעה בדוח.")
         return
@@ -791,36 +547,17 @@ def render_investment_analysis(data, analysis, user_profile):
         st.info("לא ניתן לחשב גיל משוער לצורך ניתוח מסלולי השקעה.")
         return
 
-    fund_name = analysis.get("fund_name", "")
-    fund_key = find_fund_key(fund_name)
-    gender = user_profile.get("gender", "גבר")
     multiplier = 196 if gender == "גבר" else 194
 
     # Classify user's tracks
-    user_track_names = [t.get("track_name", "") for t in tracks]
-    equity_tracks = []
-    non_equity_tracks = []
-    has_sp500 = False
-    has_madedei = False
-    has_age_track = False
-    has_halacha = False
-
-    for name in user_track_names:
-        name_lower = name.lower().strip()
-        if "s&p" in name_lower or "s&amp;p" in name_lower or "500" in name_lower:
-            has_sp500 = True
-        if "מדדי מניות" in name or "עוקב מדדי מניות" in name:
-            has_madedei = True
-        if "הלכה" in name:
-            has_halacha = True
-
-        if fund_key and is_equity_track(name, fund_key):
-            equity_tracks.append(name)
-        else:
-            non_equity_tracks.append(name)
-
-        if is_age_related_track(name):
-            has_age_track = True
+    classified = model.tracks
+    fund_key = classified["fund_key"]
+    equity_tracks = classified["equity_tracks"]
+    non_equity_tracks = classified["non_equity_tracks"]
+    has_sp500 = classified["has_sp500"]
+    has_madedei = classified["has_madedei"]
+    has_age_track = classified["has_age_track"]
+    has_halacha = classified["has_halacha"]
 
     # ── Age <= 52: recommend equity ──
     if age <= 52:
@@ -834,28 +571,16 @@ def render_investment_analysis(data, analysis, user_profile):
             improved_fv = closing_balance * ((1 + 0.0525) ** years_to_67) if years_to_67 > 0 else closing_balance
             improved_pension = round(improved_fv / multiplier)
 
-            msg = f"""בהתחשב בטווח השנים שנותר לך עד לפרישה אני ממליץ {g(gender, 'שתבחר', 'שתבחרי')} במסלול או במסלולים מנייתיים בלבד.
-ב-5 השנים האחרונות המסלולים המנייתיים הניבו תשואה עודפת של כ-1.25% ביחס למסלולי 'בני 50 ומטה' (ופער גדול יותר מול יתר המסלולים).
-הקצבה מהכספים {g(gender, 'שצברת', 'שצברת')} עד סוף תקופת הדוח היא **₪{format_number(pension_at_67)}**.
-אם {g(gender, 'תשפר', 'תשפרי')} את התשואה ב-1.25% הקצבה על אותם כספים תגדל ל-**₪{format_number(improved_pension)}**.
-כמובן שהפער יהיה גדול יותר כי התשואה העודפת תהיה גם על הכספים שיופקדו לקרן בעתיד."""
-            formatted = msg.replace("\n", "  \n")
-            st.info(f"💡 {formatted}")
+            st.info(EQUITY_RECOMMENDATION.markdown(gender, pension_at_67=pension_at_67, improved_pension=improved_pension))
 
             # Check if mixed equity + age-based track
             if equity_tracks and has_age_track:
                 non_eq_names = ", ".join(non_equity_tracks)
                 deposit_source = analysis.get("deposit_source", "שכיר")
                 if deposit_source == "עצמאי":
-                    msg2 = f"""הכסף שלך מפוצל בין מסלול מנייתי לבין מסלול שאיננו מנייתי ({non_eq_names}).
-סביר להניח שבמסלול הלא מנייתי נמצאים כספי פיצויים.
-{g(gender, 'בדוק', 'בדקי')} עם הקרן מה צריך לעשות בכדי להעביר אותם למסלול ההשקעה {g(gender, 'שבחרת', 'שבחרת')}."""
+                    st.warning(SPLIT_TRACKS_SELF_EMPLOYED.markdown(gender, tracks=non_eq_names))
                 else:
-                    msg2 = f"""הכסף שלך מפוצל בין מסלול מנייתי לבין מסלול שאיננו מנייתי ({non_eq_names}).
-סביר להניח שבמסלול הלא מנייתי נמצאים כספי הפיצויים שלך המהווים כ-30%-40% מהפנסיה שלך.
-בכדי להעביר גם אותם למסלול מנייתי יש צורך באישור של המעסיק."""
-                formatted2 = msg2.replace("\n", "  \n")
-                st.warning(f"ℹ️ {formatted2}")
+                    st.warning(SPLIT_TRACKS_EMPLOYEE.markdown(tracks=non_eq_names))
 
     # ── Age > 52: recommend gradual reduction ──
     else:
@@ -863,27 +588,15 @@ def render_investment_analysis(data, analysis, user_profile):
 
     # ── S&P 500 warning (any age) - BEFORE recommendation ──
     if has_sp500:
-        msg_sp = f"""{g(gender, 'אתה מושקע', 'את מושקעת')} במדד S&P 500. מדד זה סובל היום מריכוזיות גבוהה.
-המשקל של 9 החברות הגדולות הכלולות בו הוא כ-40% מה שמגדיל את הסיכון הכרוך בהשקעה בו.
-בנוסף התימחור של המניות הכלולות בו משקף מידה רבה של אופטימיות שאם היא תתברר כמוגזמת התשואה שהמדד יניב תהיה נמוכה.
-מעבר לכך אין לך חשיפה למניות של חברות מוצלחות מיתר העולם."""
-        formatted_sp = msg_sp.replace("\n", "  \n")
-        st.warning(f"⚠️ {formatted_sp}")
+        st.warning(SP500_CONCENTRATION.markdown(gender))
 
     # ── מדדי מניות concentration warning (specific funds, any age) ──
     if has_madedei and fund_key in MADEDEI_WARNING_FUNDS:
-        msg_md = """בפנסיה אנחנו צריכים לנהוג בזהירות. מסלול מדדי מניות הוא מסלול עם רמת ריכוז גבוהה מאוד וממילא סיכון גבוה.
-המניות הכלולות בו אמנם הניבו תשואה חריגה בעבר אבל זה כרוך בסיכון שלגמרי לא בטוח שמתאים לכספי פנסיה."""
-        formatted_md = msg_md.replace("\n", "  \n")
-        st.warning(f"⚠️ {formatted_md}")
+        st.warning(MADEDEI_CONCENTRATION.markdown())
 
     # ── Halacha track warning (age <= 52, not Infinity) ──
     if has_halacha and age <= 52 and fund_key != "אינפיניטי":
-        msg_hl = f"""במסלול ההלכה בקרן בה {g(gender, 'אתה נמצא', 'את נמצאת')} החשיפה למניות איננה מקסימלית.
-הצפי הוא שהתשואה שלך תהיה נמוכה יותר בגלל זה.
-{g(gender, 'שקול', 'שיקלי')} לעבור למסלול מותאם להלכה שיש בו חשיפה מנייתית מקסימלית בכדי לשפר את הפנסיה שלך."""
-        formatted_hl = msg_hl.replace("\n", "  \n")
-        st.warning(f"⚠️ {formatted_hl}")
+        st.warning(HALACHA_TRACK.markdown(gender))
 
     # ── Fund recommendation - AFTER warnings ──
     if age <= 52 and fund_key and EQUITY_TRACKS[fund_key]["recommendation"]:
@@ -892,7 +605,102 @@ def render_investment_analysis(data, analysis, user_profile):
 # ─── עד כאן בחינת מסלולי השקעה ───
 
 
+# ─── היסטוריה לאורך השנים ───
+
+@traced()
+def render_history(points):
+    """Render closing balance and fees across the member's stored reports."""
+    st.markdown("### 📅 הקרן שלך לאורך זמן")
+
+    # ── Balance line chart ──
+    chart_w = 600
+    chart_h = 220
+    margin_x = 50
+    margin_top = 30
+    plot_h = 140
+    balances = [p["closing_balance"] or 0 for p in points]
+    max_balance = max(balances) or 1
+    step = (chart_w - 2 * margin_x) / max(1, len(points) - 1)
+    coords = [
+        (margin_x + i * step, margin_top + plot_h - (b / max_balance) * plot_h)
+        for i, b in enumerate(balances)
+    ]
+    svg = f'<svg viewBox="0 0 {chart_w} {chart_h}" xmlns="http://www.w3.org/2000/svg" style="max-width:100%;margin:0 auto;display:block;direction:ltr;">'
+    svg += '<polyline fill="none" stroke="#38bdf8" stroke-width="2.5" points="' + " ".join(f"{x:.1f},{y:.1f}" for x, y in coords) + '"/>'
+    for (x, y), p, b in zip(coords, points, balances):
+        svg += f'<circle cx="{x:.1f}" cy="{y:.1f}" r="4" fill="#38bdf8"/>'
+        svg += f'<text x="{x:.1f}" y="{y - 10:.1f}" text-anchor="middle" fill="#e2e8f0" font-size="10" font-family="Alef">{b:,.0f}</text>'
+        svg += f'<text x="{x:.1f}" y="{margin_top + plot_h + 24}" text-anchor="middle" fill="#94a3b8" font-size="11" font-family="Alef">{safe(p["report_period"])}</text>'
+    svg += '</svg>'
+    st.markdown(svg, unsafe_allow_html=True)
+
+    # ── Fees table ──
+    html = '<table class="pension-table"><thead><tr><th>תקופה</th><th>צבירה</th><th>דמי ניהול מהפקדה</th><th>דמי ניהול מצבירה</th><th>הכנסה מבוטחת</th></tr></thead><tbody>'
+    for p in points:
+        html += (
+            f'<tr><td>{safe(p["report_period"])}</td>{num_td(p["closing_balance"])}'
+            f'<td class="num-cell">{safe(p["deposit_fee"])}%</td><td class="num-cell">{safe(p["savings_fee"])}%</td>'
+            f'{num_td(round(p["insured_income"]) if p["insured_income"] else None)}</tr>'
+        )
+    html += "</tbody></table>"
+    st.markdown(html, unsafe_allow_html=True)
+
+
+# ─── ניתוח משולב של כמה קרנות ───
+
+@traced()
+def render_portfolio(portfolio, gender):
+    """Render the combined view of several funds."""
+    st.markdown("### 🗂️ תמונה משולבת של קרנות הפנסיה")
+
+    html = '<table class="pension-table"><thead><tr><th>קרן</th><th>צבירה</th><th>דמי ניהול</th><th>עלות שנתית צפויה</th></tr></thead><tbody>'
+    for f in portfolio["funds"]:
+        fees = f"{f['deposit_fee']}% + {f['savings_fee']}%" if f["current_fee"] is not None else "-"
+        cost = round(f["current_fee"]) if f["current_fee"] is not None else None
+        html += f'<tr><td>{safe(f["fund_name"])}</td>{num_td(f["closing_balance"])}<td class="num-cell">{safe(fees)}</td>{num_td(cost)}</tr>'
+    html += f'<tr class="total-row"><td>סה"כ</td>{num_td(portfolio["total_balance"], True)}<td></td>{num_td(round(portfolio["total_current_fee"]), True)}</tr>'
+    html += "</tbody></table>"
+    st.markdown(html, unsafe_allow_html=True)
+    st.markdown("")
+
+    if portfolio["skipped"]:
+        st.warning(f"⚠️ דוחות שלא נכללו בניתוח המשולב: {', '.join(portfolio['skipped'])}")
+
+    # ── Duplicated insurance ──
+    if portfolio["duplicate_insurance"]:
+        st.warning(PORTFOLIO_DUPLICATE_INSURANCE.markdown(gender, funds=" / ".join(portfolio["active_funds"])))
+
+    # ── Consolidated fee comparison ──
+    consolidated = portfolio["consolidated"]
+    if consolidated is None:
+        return
+    msg = PORTFOLIO_CONSOLIDATION.markdown(
+        gender, fund_names=" / ".join(consolidated["cheapest_fund_names"]), deposit_fee=consolidated["cheapest_fund_dep"],
+        savings_fee=consolidated["cheapest_fund_sav"], fund_fee=consolidated["cheapest_fund_fee"], advisor_fee=consolidated["adv_fee"],
+    )
+    saving = consolidated["saving"]
+    if saving is not None and saving >= 100:
+        msg += PORTFOLIO_CONSOLIDATION_SAVING.markdown(gender, saving=saving)
+    st.info(msg)
+
+
+@traced()
+def render_partial_results(partial, user_profile):
+    """Render what can be shown while the deposits table is still streaming."""
+    if not {"header", "expected_payments", "movements"} <= partial.keys():
+        return
+    model = build_report_model(partial, user_profile)
+    if not model.is_valid or model.deposit_source == MIXED_DEPOSIT_SOURCE:
+        return
+    st.info("⏳ ניתוח ראשוני – ממשיך לקרוא את טבלת ההפקדות...")
+    render_insurance_analysis(model)
+    if "investment_tracks" in partial:
+        st.markdown("---")
+        render_investment_analysis(model)
+
+
 # ─── Main App ───
+get_metrics_exporter()
 st.markdown('<div class="hero-title">רובייקטיבי</div>', unsafe_allow_html=True)
 st.markdown('<div class="hero-sub">מנתח דוחות פנסיה אובייקטיבי · ללא אינטרס</div>', unsafe_allow_html=True)
 
@@ -921,118 +729,186 @@ st.session_state["user_profile"] = {
 st.markdown("---")
 
 # ─── File Upload + Auto Analysis ───
-# Custom CSS to clean up file uploader
-st.markdown("""
-<style>
-/* Hide the default uploader label */
-[data-testid="stFileUploader"] > label {
-    display: none !important;
-}
-/* Make dropzone more compact */
-[data-testid="stFileUploaderDropzone"] {
-    padding: 12px 16px !important;
-}
-/* Hebrew upload instructions above the uploader */
-.upload-instructions {
-    text-align: center;
-    padding: 12px 16px;
-    margin-bottom: -10px;
-    font-family: 'Alef', sans-serif;
-}
-.upload-instructions .main-text {
-    font-size: 1.1rem;
-    font-weight: 700;
-    color: #000000;
-    margin-bottom: 4px;
-}
-.upload-instructions .sub-text {
-    font-size: 0.85rem;
-    color: #64748b;
-}
-</style>
-""", unsafe_allow_html=True)
-
 # Prevent upload before selections
+uploaded = None
+uploaded_files = []
+portfolio_mode = False
 if gender is None or marital_status is None:
     st.info("יש לבחור מין וסטטוס משפחתי לפני העלאת הדוח.")
-    uploaded = None
 else:
+    portfolio_mode = st.checkbox("יש לי יותר מקרן פנסיה אחת – ניתוח משולב")
     st.markdown("""
     <div class="upload-instructions">
         <div class="main-text">📄 העלה דוח פנסיה בפורמט PDF</div>
         <div class="sub-text">עד 4 עמודים · PDF בלבד</div>
     </div>
     """, unsafe_allow_html=True)
-    uploaded = st.file_uploader("העלה דוח פנסיה", type=["pdf"], label_visibility="collapsed")
+    if portfolio_mode:
+        uploaded_files = st.file_uploader(
+            "העלה דוחות פנסיה", type=["pdf"], accept_multiple_files=True, label_visibility="collapsed",
+        ) or []
+    else:
+        uploaded = st.file_uploader("העלה דוח פנסיה", type=["pdf"], label_visibility="collapsed")
 
 if uploaded is not None:
     # Auto-analyze: run if this is a new file
     file_key = f"{uploaded.name}_{uploaded.size}"
-    if st.session_state.get("last_file_key") != file_key:
+    is_new_file = st.session_state.get("last_file_key") != file_key
+    if is_new_file and st.session_state.get("pending_file_key") != file_key:
         # ── File size check ──
         file_size_kb = uploaded.size / 1024
         if file_size_kb > MAX_PDF_SIZE_KB:
             st.error("הקובץ גדול מדי. דוח פנסיה רגיל שוקל עד 400KB. ודא שהעלית את הקובץ הנכון.")
         else:
-            # ── Rate limiting ──
-            analysis_count = st.session_state.get("analysis_count", 0)
-            if analysis_count >= MAX_ANALYSES_PER_SESSION:
-                st.error("הגעת למגבלת הניתוחים לסשן זה. רענן את הדף כדי להתחיל מחדש.")
+            uploaded.seek(0)
+            with span("upload_read"):
+                pdf_bytes = uploaded.read()
+            if not pdf_bytes:
+                st.error("שגיאה: הקובץ ריק. נסה להעלות שוב.")
             else:
-                result = None
-                with st.spinner("מנתח את הדוח באמצעות AI... (עשוי לקחת עד דקה)"):
-                    uploaded.seek(0)
-                    pdf_bytes = uploaded.read()
-                    if not pdf_bytes:
-                        st.error("שגיאה: הקובץ ריק. נסה להעלות שוב.")
-                    else:
-                        result = call_anthropic(pdf_bytes)
-
-                if result:
-                    st.session_state["pension_data"] = result
-                    st.session_state["last_file_key"] = file_key
-                    st.session_state["analysis_count"] = analysis_count + 1
-                    st.rerun()
+                # ── Rate limiting ──
+                with span("admission"):
+                    refusal = admit_extraction(pdf_bytes)
+                if refusal:
+                    st.error(refusal)
+                else:
+                    st.session_state["extraction_job_id"] = get_job_queue().submit(pdf_bytes)
+                    st.session_state["pending_file_key"] = file_key
+
+# ─── Poll Extraction Job ───
+job_id = st.session_state.get("extraction_job_id")
+if job_id:
+    job = get_job_queue().get(job_id)
+    if job is not None and not job.finished:
+        render_partial_results(job.partial, st.session_state.get("user_profile", {}))
+        with st.spinner("מנתח את הדוח באמצעות AI... (עשוי לקחת עד דקה)"):
+            time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
+    pending_file_key = st.session_state.pop("pending_file_key", None)
+    st.session_state.pop("extraction_job_id", None)
+    if job is None:
+        st.error("שגיאה בעיבוד הדוח. נסה שוב או העלה דוח אחר.")
+    elif job.error:
+        st.error(job.error)
+    else:
+        st.session_state["pension_data"] = job.result
+        st.session_state["pension_data_hash"] = data_hash(job.result)
+        st.session_state["last_file_key"] = pending_file_key
+        st.rerun()
+
+# ─── Portfolio Upload ───
+# file_key -> job id / (data, data hash) / error message, kept across reruns so
+# adding a file only extracts the new one
+portfolio_jobs = st.session_state.setdefault("portfolio_jobs", {})
+portfolio_data = st.session_state.setdefault("portfolio_data", {})
+portfolio_errors = st.session_state.setdefault("portfolio_errors", {})
+if portfolio_mode:
+    file_keys = {f"{f.name}_{f.size}": f for f in uploaded_files}
+    # Files removed from the uploader; a dropped job still finishes and fills the cache
+    for store in (portfolio_jobs, portfolio_data, portfolio_errors):
+        for key in [k for k in store if k not in file_keys]:
+            del store[key]
+
+    for file_key, f in file_keys.items():
+        if file_key in portfolio_data or file_key in portfolio_jobs or file_key in portfolio_errors:
+            continue
+        if f.size / 1024 > MAX_PDF_SIZE_KB:
+            portfolio_errors[file_key] = f"{f.name}: הקובץ גדול מדי. דוח פנסיה רגיל שוקל עד 400KB."
+        else:
+            with span("upload_read"):
+                pdf_bytes = f.getvalue()
+            if not pdf_bytes:
+                portfolio_errors[file_key] = f"{f.name}: הקובץ ריק."
+                continue
+            with span("admission"):
+                refusal = admit_extraction(pdf_bytes)
+            if refusal:
+                # Not stored as the file's error, so the file is retried on the next upload change
+                st.error(refusal)
+                break
+            portfolio_jobs[file_key] = get_job_queue().submit(pdf_bytes)
+
+    for message in portfolio_errors.values():
+        st.error(message)
+
+# ─── Poll Portfolio Jobs ───
+if portfolio_mode and portfolio_jobs:
+    running = False
+    for file_key, pjob_id in list(portfolio_jobs.items()):
+        pjob = get_job_queue().get(pjob_id)
+        if pjob is not None and not pjob.finished:
+            running = True
+            continue
+        del portfolio_jobs[file_key]
+        if pjob is None:
+            portfolio_errors[file_key] = "שגיאה בעיבוד הדוח. נסה שוב או העלה דוח אחר."
+        elif pjob.error:
+            portfolio_errors[file_key] = pjob.error
+        else:
+            portfolio_data[file_key] = (pjob.result, data_hash(pjob.result))
+    if running:
+        with st.spinner(f"מנתח {len(portfolio_jobs)} דוחות באמצעות AI... (עשוי לקחת עד דקה)"):
+            time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
+
+# ─── Display Portfolio ───
+if portfolio_mode and portfolio_data:
+    user_profile = st.session_state.get("user_profile", {})
+    portfolio_models = build_portfolio_models(portfolio_data.values(), user_profile)
+    render_portfolio(compute_portfolio(portfolio_models), user_profile.get("gender", "גבר"))
+    for pmodel in portfolio_models:
+        if not pmodel.is_valid or pmodel.deposit_source == MIXED_DEPOSIT_SOURCE:
+            continue
+        with st.expander(f"📋 {pmodel.analysis.get('fund_name', '')}"):
+            render_insurance_analysis(pmodel)
+            st.markdown("---")
+            render_deposit_chart(pmodel)
+            st.markdown("---")
+            render_fee_analysis(pmodel)
+            st.markdown("---")
+            render_investment_analysis(pmodel)
 
 # ─── Display Results ───
-if "pension_data" in st.session_state:
-    data = st.session_state["pension_data"]
+if not portfolio_mode and "pension_data" in st.session_state:
+    user_profile = st.session_state.get("user_profile", {})
+    model = build_report_model(
+        st.session_state["pension_data"], user_profile, st.session_state.get("pension_data_hash"),
+    )
 
     # Validate report type
-    is_valid, validation_error = validate_report(data)
-    if not is_valid:
-        st.error(f"⚠️ {validation_error}")
+    if not model.is_valid:
+        st.error(f"⚠️ {model.error}")
     else:
         # Check for mixed deposits (שכיר + עצמאי)
-        deposit_source = detect_deposit_source(data)
-        if deposit_source == "שכיר + עצמאי":
+        if model.deposit_source == MIXED_DEPOSIT_SOURCE:
             st.error("⚠️ עדיין לא למדתי לנתח דוח פנסיה שבוצעו אליה גם הפקדות כשכיר וגם הפקדות כעצמאי.")
         else:
             st.markdown('<div style="text-align:center;font-family:Heebo,sans-serif;font-size:2.2rem;font-weight:700;margin-bottom:24px;">📋 ניתוח רובייקטיבי של דוח הפנסיה</div>', unsafe_allow_html=True)
-            user_profile = st.session_state.get("user_profile", {})
-            analysis = compute_analysis(data, user_profile)
-            render_insurance_analysis(data, user_profile, analysis)
+            analysis = model.analysis
+            render_insurance_analysis(model)
             st.markdown("---")
-            render_deposit_chart(data, analysis, user_profile)
+            render_deposit_chart(model)
             st.markdown("---")
-            render_fee_analysis(data, analysis, user_profile)
+            render_fee_analysis(model)
             st.markdown("---")
-            render_investment_analysis(data, analysis, user_profile)
+            render_investment_analysis(model)
+
+            # ── Year-over-year history (same member and fund) ──
+            history = get_history_store()
+            history_key = history.member_key(model.data) if history else None
+            if history_key:
+                history_points = history.trend(history_key, fund_name=analysis.get("fund_name", ""))
+                if len(history_points) >= 2:
+                    st.markdown("---")
+                    render_history(history_points)
 
             # ── Government employer advisory subsidy ──
-            gender = user_profile.get("gender", "גבר")
-            employer = data.get("header", {}).get("employer", "")
-            # Also check employer from deposits table
-            if not is_gov_employer(employer):
-                for dep in data.get("deposits", []):
-                    dep_employer = dep.get("employer", "")
-                    if dep_employer and is_gov_employer(dep_employer):
-                        employer = dep_employer
-                        break
-            if is_gov_employer(employer):
+            gender = model.gender
+            # Header employer, or any employer from the deposits table
+            if model.gov_employer:
                 st.markdown("---")
-                gov_msg = f'החשב הכללי מעודד את עובדי המדינה לקחת ייעוץ פנסיוני אובייקטיבי. לשם כך הוא נותן סבסוד של 600 ש"ח לעובד מדינה שלוקח ייעוץ. {g(gender, "קח", "קחי")} ייעוץ פנסיוני {g(gender, "ונצל", "ונצלי")} את ההטבה הזו. <a href="{safe(GOV_ADVISORY_URL)}" target="_blank">לצפייה בחוזר החשב הכללי {g(gender, "לחץ", "לחצי")} כאן</a>.'
-                st.markdown(f'<div style="background:#f0fdf4;border-radius:8px;padding:14px 18px;color:#166534;font-size:1.1rem;direction:rtl;text-align:right;">💡 {gov_msg}</div>', unsafe_allow_html=True)
+                st.markdown(GOV_ADVISORY_SUBSIDY.render(gender, url=safe(GOV_ADVISORY_URL)), unsafe_allow_html=True)
 
             # ── High income recommendation (before CTA) ──
             insured_income = analysis.get("insured_income", 0)
@@ -1068,55 +944,6 @@ if "pension_data" in st.session_state:
             </div>
             """, unsafe_allow_html=True)
 
-            # ── Print CSS for PDF export ──
-            st.markdown("""
-            <style>
-            @media print {
-                .stRadio, .stCheckbox, [data-testid="stFileUploader"],
-                [data-testid="stToolbar"], [data-testid="stHeader"],
-                .stDeployButton, .stSpinner, #MainMenu, footer,
-                .no-print, [data-testid="stFileUploaderDropzone"],
-                .upload-instructions, .save-pdf-area {
-                    display: none !important;
-                }
-                body, .stApp, .main, .block-container {
-                    direction: rtl !important;
-                    font-family: 'Alef', sans-serif !important;
-                }
-                /* Force color printing */
-                * {
-                    -webkit-print-color-adjust: exact !important;
-                    print-color-adjust: exact !important;
-                    color-adjust: exact !important;
-                }
-                .stApp, .main, .block-container, [data-testid="stAppViewContainer"] {
-                    background: white !important;
-                }
-                .stMarkdown, .stMarkdown p, [data-testid="stMarkdownContainer"] p {
-                    color: black !important;
-                }
-                .sc-value, .sc-label, .num-cell, .pension-table td, .pension-table th {
-                    color: black !important;
-                }
-                .summary-card {
-                    background: #f8fafc !important;
-                    border: 1px solid #e2e8f0 !important;
-                }
-                .sc-highlight {
-                    -webkit-text-fill-color: #0369a1 !important;
-                    color: #0369a1 !important;
-                }
-                .total-row td, .total-cell {
-                    color: #0369a1 !important;
-                    -webkit-text-fill-color: #0369a1 !important;
-                }
-                .neg { color: #dc2626 !important; }
-                /* Hide the save-as-PDF iframe */
-                iframe { display: none !important; }
-            }
-            </style>
-            """, unsafe_allow_html=True)
-
             # ── Save as PDF button (uses components.html for JS) ──
             st.markdown("---")
             import streamlit.components.v1 as components
@@ -1137,3 +964,11 @@ if "pension_data" in st.session_state:
 # Version marker for debugging
 st.markdown('<div style="text-align:center;color:#94a3b8;font-size:0.8rem;margin-top:40px;direction:rtl;line-height:1.8;">⚠️ הניתוח מבוסס על בינה מלאכותית ועלולות ליפול בו טעויות. אין להסתמך עליו כייעוץ פנסיוני.</div>', unsafe_allow_html=True)
 st.markdown('<div style="text-align:center;color:#4a5568;font-size:0.75rem;margin-top:8px;">גירסת בטא</div>', unsafe_allow_html=True)
+
+# Operator view of API usage (connection reuse, retries, cached vs uncached tokens) and stage latency
+if st.secrets.get("SHOW_API_METRICS", False):
+    with st.expander("מדדי API"):
+        from core.api_client import get_client_metrics
+        st.json(get_client_metrics())
+        st.json(get_model_router().stats())
+        st.json(tracer.summary())
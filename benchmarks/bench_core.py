@@ -0,0 +1,168 @@
+"""
+רובייקטיבי - Core Analysis Benchmarks
+=====================================
+Times each core analysis function, and the full report-model pipeline, over
+synthetic reports at several batch sizes. Results are compared with the stored
+baselines and the run fails when a function is slower than the threshold allows.
+
+    python -m benchmarks.bench_core                       # compare with baselines
+    python -m benchmarks.bench_core --sizes 1 100         # quick run
+    python -m benchmarks.bench_core --update-baselines    # store this machine's numbers
+
+Each case is timed in several rounds and the median is compared, so a
+momentary load spike doesn't fail the run.
+
+Baselines are per-report times in microseconds and are machine specific:
+refresh them on the machine that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from core.deposit_frame import build_deposit_frame
+from core.pension_core import (
+    validate_report, detect_deposit_source, check_report_consistency,
+    compute_analysis, check_insurance, compute_deposit_summary,
+    compute_fee_comparison, classify_tracks, find_gov_employer,
+)
+from core.report_model import build_report_model, clear_report_model_cache, data_hash
+from benchmarks.synthetic import generate_reports
+
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_SIZES = [1, 100, 10000, 100000]
+DEFAULT_THRESHOLD = 1.5  # fail when more than 50% slower than baseline
+DEFAULT_REPEATS = 5  # rounds over all cases; each case's median is compared
+MIN_TIMED_SECONDS = 0.05  # small sizes are repeated until at least this long
+DISTINCT_REPORTS = 2000  # larger sizes cycle through this many generated reports
+SEED = 20240101
+
+
+# ─── Cases ───
+
+def _prepare(reports):
+    """Per-report inputs that the timed functions take as arguments."""
+    prepared = []
+    for data, profile in reports:
+        analysis = compute_analysis(data, profile)
+        prepared.append((data, profile, analysis, build_deposit_frame(data)))
+    return prepared
+
+
+def _pipeline(data, profile, analysis, frame):
+    clear_report_model_cache()
+    return build_report_model(data, profile, data_hash(data))
+
+
+CASES = {
+    "validate_report": lambda data, profile, analysis, frame: validate_report(data),
+    "check_report_consistency": lambda data, profile, analysis, frame: check_report_consistency(data),
+    "build_deposit_frame": lambda data, profile, analysis, frame: build_deposit_frame(data),
+    "detect_deposit_source": lambda data, profile, analysis, frame: detect_deposit_source(data, frame),
+    "compute_analysis": lambda data, profile, analysis, frame: compute_analysis(data, profile, frame),
+    "check_insurance": lambda data, profile, analysis, frame: check_insurance(analysis, profile),
+    "compute_deposit_summary": lambda data, profile, analysis, frame: compute_deposit_summary(data, analysis, frame),
+    "compute_fee_comparison": lambda data, profile, analysis, frame: compute_fee_comparison(data, analysis),
+    "classify_tracks": lambda data, profile, analysis, frame: classify_tracks(
+        data.get("investment_tracks", []), analysis.get("fund_name", "")),
+    "find_gov_employer": lambda data, profile, analysis, frame: find_gov_employer(data),
+    "report_pipeline": _pipeline,
+}
+
+
+def time_case(fn, inputs, size):
+    """Microseconds per report for running fn over size inputs (cycled)."""
+    count = len(inputs)
+    best = None
+    elapsed_total = 0.0
+    while best is None or elapsed_total < MIN_TIMED_SECONDS:
+        start = time.perf_counter()
+        for i in range(size):
+            fn(*inputs[i % count])
+        elapsed = time.perf_counter() - start
+        elapsed_total += elapsed
+        best = elapsed if best is None else min(best, elapsed)
+    return best / size * 1e6
+
+
+def run(sizes, cases, repeats=DEFAULT_REPEATS):
+    """{case: {size: us_per_report}}, the median of repeats rounds. Each round times
+    every case once, so a burst of machine load hits one sample of many cases
+    rather than every sample of one."""
+    inputs = _prepare(generate_reports(min(max(sizes), DISTINCT_REPORTS), seed=SEED))
+    samples = {name: {str(size): [] for size in sizes} for name in cases}
+    for _ in range(repeats):
+        for name in cases:
+            for size in sizes:
+                samples[name][str(size)].append(time_case(CASES[name], inputs, size))
+    return {
+        name: {size: statistics.median(times) for size, times in by_size.items()}
+        for name, by_size in samples.items()
+    }
+
+
+# ─── Baselines ───
+
+def load_baselines(path=BASELINES_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(results, path=BASELINES_PATH):
+    baselines = load_baselines(path)
+    for name, by_size in results.items():
+        baselines.setdefault(name, {}).update({size: round(us, 2) for size, us in by_size.items()})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(results, baselines, threshold):
+    """Print a report table. Returns the list of (case, size, ratio) regressions."""
+    regressions = []
+    print(f"{'case':<28}{'size':>8}{'us/report':>12}{'baseline':>12}{'ratio':>8}")
+    for name, by_size in results.items():
+        for size, us in by_size.items():
+            base = baselines.get(name, {}).get(size)
+            ratio = us / base if base else None
+            flag = ""
+            if ratio is not None and ratio > threshold:
+                regressions.append((name, size, ratio))
+                flag = "  REGRESSION"
+            base_str = f"{base:.2f}" if base else "-"
+            ratio_str = f"{ratio:.2f}" if ratio is not None else "-"
+            print(f"{name:<28}{size:>8}{us:>12.2f}{base_str:>12}{ratio_str:>8}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the core analysis functions.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown ratio against the baseline")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="rounds to take the median of")
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.cases, args.repeats)
+    regressions = compare(results, load_baselines(args.baselines), args.threshold)
+    if args.update_baselines:
+        save_baselines(results, args.baselines)
+        print(f"baselines written to {args.baselines}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold}x baseline", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
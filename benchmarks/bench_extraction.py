@@ -0,0 +1,179 @@
+"""
+רובייקטיבי - Extraction Benchmarks
+==================================
+End-to-end timing of call_anthropic and the Message Batches backend against the
+local stub server (core.stub_server), which replays synthetic reports with the
+given latency and injected faults. Measures throughput and latency at several
+concurrency levels, and the retries and failures caused by the faults.
+
+    python -m benchmarks.bench_extraction                               # 50 reports, 1/4/16 workers
+    python -m benchmarks.bench_extraction --latency 1 --overload-rate 0.1 --rate-limit-rate 0.05
+    python -m benchmarks.bench_extraction --recordings reports.jsonl --backend batch
+
+Runs offline: no API key or network access is needed.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.api_client import DEFAULT_CLIENT_SETTINGS, get_client, get_client_metrics
+from core.batch_backend import MessageBatchBackend
+from core.extraction import call_anthropic, ExtractionError
+from core.stub_server import StubAPI, ReplayResponder, load_recordings, start_in_background
+from benchmarks.synthetic import generate_reports
+
+
+STUB_API_KEY = "stub-key"
+DEFAULT_WORKERS = [1, 4, 16]
+SEED = 20240101
+
+COUNTERS = ("http_requests", "retries", "api_failures", "connections_opened", "connections_reused")
+
+
+def synthetic_recordings(count, seed=SEED):
+    """[(key, text)] recordings of count synthetic reports."""
+    return [("", json.dumps(report, ensure_ascii=False)) for report, _ in generate_reports(count, seed=seed)]
+
+
+def synthetic_pdfs(count):
+    """Distinct placeholder PDFs. They are sent as-is (no preprocessing),
+    so only their hashes matter to the stub."""
+    return [f"%PDF-1.4\n% synthetic report {i}\n%%EOF\n".encode("ascii") for i in range(count)]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _counter_delta(before, after):
+    return {name: after.get(name, 0) - before.get(name, 0) for name in COUNTERS}
+
+
+# ─── Runs ───
+
+def run_streaming(pdfs, workers, settings):
+    """Extract every PDF with call_anthropic on a thread pool. Returns a result row."""
+    def extract(pdf_bytes):
+        start = time.perf_counter()
+        try:
+            call_anthropic(pdf_bytes, STUB_API_KEY, cache=None, client_settings=settings,
+                           preprocess=False)
+            ok = True
+        except ExtractionError:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    before = get_client_metrics()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(extract, pdfs))
+    elapsed = time.perf_counter() - start
+    latencies = [seconds for _, seconds in outcomes]
+    return {
+        "backend": "stream",
+        "workers": workers,
+        "reports": len(pdfs),
+        "errors": sum(1 for ok, _ in outcomes if not ok),
+        "seconds": elapsed,
+        "reports_per_second": len(pdfs) / elapsed if elapsed else 0.0,
+        "p50_seconds": percentile(latencies, 50),
+        "p95_seconds": percentile(latencies, 95),
+        "max_seconds": max(latencies) if latencies else 0.0,
+        **_counter_delta(before, get_client_metrics()),
+    }
+
+
+def run_batch(pdfs, settings, poll_seconds):
+    """Extract every PDF through MessageBatchBackend. Returns a result row."""
+    backend = MessageBatchBackend(get_client(STUB_API_KEY, settings), cache=None, poll_seconds=poll_seconds,
+                                  preprocess=False)
+    before = get_client_metrics()
+    start = time.perf_counter()
+    results = backend.extract_all(pdfs)
+    elapsed = time.perf_counter() - start
+    return {
+        "backend": "batch",
+        "workers": 1,
+        "reports": len(pdfs),
+        "errors": sum(1 for r in results.values() if isinstance(r, ExtractionError)),
+        "seconds": elapsed,
+        "reports_per_second": len(pdfs) / elapsed if elapsed else 0.0,
+        "p50_seconds": elapsed,
+        "p95_seconds": elapsed,
+        "max_seconds": elapsed,
+        **_counter_delta(before, get_client_metrics()),
+    }
+
+
+def print_rows(rows):
+    print(f"{'backend':<8}{'workers':>8}{'reports':>8}{'errors':>7}{'rep/s':>9}{'p50 s':>8}{'p95 s':>8}"
+          f"{'max s':>8}{'http':>6}{'retries':>8}{'failed':>7}{'new conn':>9}")
+    for r in rows:
+        print(f"{r['backend']:<8}{r['workers']:>8}{r['reports']:>8}{r['errors']:>7}{r['reports_per_second']:>9.2f}"
+              f"{r['p50_seconds']:>8.3f}{r['p95_seconds']:>8.3f}{r['max_seconds']:>8.3f}{r['http_requests']:>6}"
+              f"{r['retries']:>8}{r['api_failures']:>7}{r['connections_opened']:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark extraction against the local stub server.")
+    parser.add_argument("--count", type=int, default=50, help="reports per run")
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS)
+    parser.add_argument("--backend", choices=["stream", "batch", "both"], default="stream")
+    parser.add_argument("--recordings", default=None, help="JSONL file or directory to replay (default: synthetic)")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds before a response starts")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="stub seconds between streamed deltas")
+    parser.add_argument("--overload-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0)
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_CLIENT_SETTINGS["max_retries"])
+    parser.add_argument("--backoff", type=float, default=0.1, help="initial client backoff seconds")
+    parser.add_argument("--batch-delay", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--json", action="store_true", help="print the result rows as JSON")
+    args = parser.parse_args(argv)
+
+    recordings = load_recordings(args.recordings) if args.recordings else synthetic_recordings(args.count, args.seed)
+    api = StubAPI(
+        ReplayResponder(recordings), args.batch_delay, args.latency, args.jitter,
+        {"overloaded": args.overload_rate, "rate_limit": args.rate_limit_rate, "malformed": args.malformed_rate},
+        args.retry_after, seed=args.seed, chunk_delay_seconds=args.chunk_delay,
+    )
+    server, base_url = start_in_background(api)
+    settings = dict(
+        DEFAULT_CLIENT_SETTINGS,
+        base_url=base_url,
+        max_retries=args.max_retries,
+        backoff_initial_seconds=args.backoff,
+        max_connections=max(args.workers),
+        max_keepalive_connections=max(args.workers),
+    )
+    pdfs = synthetic_pdfs(args.count)
+
+    rows = []
+    try:
+        if args.backend in ("stream", "both"):
+            for workers in args.workers:
+                rows.append(run_streaming(pdfs, workers, settings))
+        if args.backend in ("batch", "both"):
+            rows.append(run_batch(pdfs, settings, poll_seconds=min(1.0, args.batch_delay / 4 or 0.1)))
+    finally:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps({"rows": rows, "stub": api.stats()}, indent=2))
+    else:
+        print_rows(rows)
+        print(f"stub: {api.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+רובייקטיבי - Insurance Audit Benchmark
+======================================
+Batch insurance audit over synthetic members: times audit_insurance (vectorised
+rule evaluation, with and without rendering the messages) against calling
+check_insurance per member, checks that both give the same warnings, and lists
+how often each rule fired.
+
+    python -m benchmarks.bench_insurance_audit
+    python -m benchmarks.bench_insurance_audit --count 100000 --dataframe
+"""
+
+import argparse
+import sys
+import time
+
+from core.pension_core import compute_analysis, check_insurance, audit_insurance, insurance_columns, INSURANCE_RULES
+from benchmarks.synthetic import generate_reports
+
+
+SEED = 20240101
+DISTINCT_REPORTS = 2000  # larger counts cycle through this many generated reports
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the batch insurance audit.")
+    parser.add_argument("--count", type=int, default=10000, help="members in the batch")
+    parser.add_argument("--dataframe", action="store_true", help="pass the batch as a pandas DataFrame")
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args(argv)
+
+    reports = generate_reports(min(args.count, DISTINCT_REPORTS), seed=args.seed)
+    distinct = [(compute_analysis(data, profile), profile) for data, profile in reports]
+    members = [distinct[i % len(distinct)] for i in range(args.count)]
+    analyses = [analysis for analysis, _ in members]
+    profiles = [profile for _, profile in members]
+    columns = insurance_columns(analyses, profiles)
+    if args.dataframe:
+        import pandas as pd
+        columns = pd.DataFrame(columns)
+
+    expected, loop_seconds = timed(lambda: [check_insurance(a, p) for a, p in members])
+    fired, audit_seconds = timed(lambda: audit_insurance(columns))
+    audit, messages_seconds = timed(lambda: audit_insurance(columns, with_messages=True))
+
+    print(f"{'method':<28}{'seconds':>10}{'us/member':>12}")
+    for name, seconds in (("check_insurance loop", loop_seconds), ("audit (rules fired)", audit_seconds),
+                          ("audit with messages", messages_seconds)):
+        print(f"{name:<28}{seconds:>10.3f}{seconds / args.count * 1e6:>12.2f}")
+
+    print(f"\n{'rule':<40}{'severity':>9}{'fired':>9}{'share':>8}")
+    for rule in INSURANCE_RULES:
+        count = fired["counts"][rule.name]
+        print(f"{rule.name:<40}{rule.severity:>9}{count:>9}{count / args.count:>8.1%}")
+
+    mismatches = sum(1 for got, want in zip(audit["warnings"], expected) if got != want)
+    if mismatches:
+        print(f"{mismatches} members got different warnings from audit_insurance", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
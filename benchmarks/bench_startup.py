@@ -0,0 +1,112 @@
+"""
+רובייקטיבי - Startup Benchmark
+==============================
+Cold-start time to first paint of the Streamlit app: a fresh interpreter runs
+app.py once with streamlit's AppTest - the work the first page paint waits for -
+under python -X importtime. Prints the slowest imports of that run, whether the
+extraction stack was loaded, and fails when the first run is slower than the target.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --target 1.5 --top 25 --runs 5
+
+Needs streamlit installed. Times are machine specific, like bench_core's baselines.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+DEFAULT_TARGET_SECONDS = 1.0  # first script run, excluding the streamlit import itself
+DEFAULT_RUNS = 3
+MARKER = "--- app run ---"
+
+# Modules that should only load once a PDF is uploaded
+DEFERRED_MODULES = ("anthropic", "httpx", "fitz", "pymupdf", "pandas", "core.extraction", "core.api_client")
+
+CHILD = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+sys.stderr.write({MARKER!r} + "\\n")
+sys.stderr.flush()
+start = time.perf_counter()
+at = AppTest.from_file({APP_PATH!r}, default_timeout=120)
+at.secrets["ANTHROPIC_API_KEY"] = ""  # a secrets.toml as in deployment, without a real key
+at.run()
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "first_run_seconds": seconds,
+    "exceptions": [str(e.value) for e in at.exception],
+    "deferred_loaded": [m for m in {DEFERRED_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def parse_importtime(stderr):
+    """[(cumulative microseconds, module, depth)] of imports logged after MARKER."""
+    imports = []
+    seen_marker = False
+    for line in stderr.splitlines():
+        if line.strip() == MARKER:
+            seen_marker = True
+            continue
+        if not seen_marker or not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        try:
+            imports.append((int(cumulative), name.strip(), (len(name) - len(name.lstrip())) // 2))
+        except ValueError:
+            continue  # the header row
+    return imports
+
+
+def run_once():
+    """One cold start in a fresh interpreter. Returns (result dict, imports)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        capture_output=True, text=True, cwd=os.path.dirname(APP_PATH),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result, parse_importtime(proc.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the app's cold-start time to first paint.")
+    parser.add_argument("--target", type=float, default=DEFAULT_TARGET_SECONDS, help="seconds allowed for the first run")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--top", type=int, default=15, help="slowest top-level imports to list")
+    args = parser.parse_args(argv)
+
+    timings = []
+    for _ in range(args.runs):
+        result, imports = run_once()
+        timings.append(result["first_run_seconds"])
+
+    # Top-level imports (depth 1 under the app run) from the last run
+    top_level = sorted((i for i in imports if i[2] <= 1), reverse=True)[:args.top]
+    print(f"{'import':<48}{'cumulative ms':>14}")
+    for cumulative, name, _ in top_level:
+        print(f"{name:<48}{cumulative / 1000:>14.1f}")
+    print(f"imports during first run: {sum(i[0] for i in imports if i[2] == 0) / 1000:.1f} ms")
+
+    median = statistics.median(timings)
+    print(f"first run: median {median:.3f}s over {len(timings)} cold starts (target {args.target:.3f}s)")
+    if result["exceptions"]:
+        print(f"app raised: {result['exceptions']}", file=sys.stderr)
+        return 1
+    if result["deferred_loaded"]:
+        print(f"loaded before any upload: {', '.join(result['deferred_loaded'])}", file=sys.stderr)
+    if median > args.target:
+        print(f"first run above target ({median:.3f}s > {args.target:.3f}s)", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+רובייקטיבי - Single-Flight Check
+================================
+Concurrency check of ExtractionJobQueue's request coalescing against the local
+stub server: many threads (standing in for Streamlit sessions) submit the same
+PDF at once while its extraction is in flight, and must all get the same job
+and result from exactly one API request. Distinct PDFs must still get one
+request each, and a PDF submitted again after its job finished starts a new job.
+
+    python -m benchmarks.check_single_flight
+    python -m benchmarks.check_single_flight --sessions 32 --latency 1
+
+Runs offline and exits non-zero when a check fails.
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+from core.api_client import DEFAULT_CLIENT_SETTINGS
+from core.extraction import call_anthropic
+from core.jobs import ExtractionJobQueue
+from core.stub_server import StubAPI, ReplayResponder, start_in_background
+from benchmarks.bench_extraction import STUB_API_KEY, synthetic_recordings, synthetic_pdfs
+
+
+def submit_together(queue, pdfs):
+    """Submit every PDF from its own thread, released at the same moment. Returns the job ids."""
+    barrier = threading.Barrier(len(pdfs))
+    job_ids = [None] * len(pdfs)
+
+    def session(i):
+        barrier.wait()
+        job_ids[i] = queue.submit(pdfs[i])
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(len(pdfs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return job_ids
+
+
+def wait_all(queue, job_ids, timeout):
+    """Wait for the jobs to finish. Returns them in job_ids order."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        jobs = [queue.get(job_id) for job_id in job_ids]
+        if all(job is not None and job.finished for job in jobs):
+            return jobs
+        time.sleep(0.05)
+    raise TimeoutError("extraction jobs did not finish")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that identical in-flight PDFs share one extraction.")
+    parser.add_argument("--sessions", type=int, default=16, help="concurrent submitters")
+    parser.add_argument("--latency", type=float, default=0.5, help="stub seconds before a response starts")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args(argv)
+
+    api = StubAPI(ReplayResponder(synthetic_recordings(4)), latency_seconds=args.latency)
+    server, base_url = start_in_background(api)
+    settings = dict(DEFAULT_CLIENT_SETTINGS, base_url=base_url, max_connections=args.sessions)
+
+    def extract(pdf_bytes, on_progress):
+        return call_anthropic(pdf_bytes, STUB_API_KEY, cache=None, client_settings=settings,
+                              preprocess=False, on_progress=on_progress)
+
+    queue = ExtractionJobQueue(extract, max_workers=4)
+    same, other = synthetic_pdfs(2)
+    failures = []
+
+    def check(name, ok, detail):
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {detail}")
+        if not ok:
+            failures.append(name)
+
+    try:
+        # ── Same PDF from every session ──
+        before = api.stats()["requests_seen"]
+        job_ids = submit_together(queue, [same] * args.sessions)
+        jobs = wait_all(queue, job_ids, args.timeout)
+        requests = api.stats()["requests_seen"] - before
+        check("one job", len(set(job_ids)) == 1, f"{len(set(job_ids))} distinct job ids for {args.sessions} sessions")
+        check("one API request", requests == 1, f"{requests} requests")
+        check("same result", all(job.status == jobs[0].status and job.result is jobs[0].result for job in jobs),
+              f"status {jobs[0].status}")
+        check("coalesced count", queue.coalesced == args.sessions - 1, f"{queue.coalesced} joined")
+
+        # ── Distinct PDFs are not merged ──
+        before = api.stats()["requests_seen"]
+        job_ids = submit_together(queue, [same, other])
+        wait_all(queue, job_ids, args.timeout)
+        requests = api.stats()["requests_seen"] - before
+        check("distinct PDFs", len(set(job_ids)) == 2 and requests == 2,
+              f"{len(set(job_ids))} jobs, {requests} requests")
+        check("finished job not reused", job_ids[0] not in {j.job_id for j in jobs}, "resubmission starts a new job")
+    finally:
+        server.shutdown()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
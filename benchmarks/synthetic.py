@@ -0,0 +1,186 @@
+"""
+רובייקטיבי - Synthetic Reports
+==============================
+Deterministic generator of extracted-report JSON in the SYSTEM_PROMPT schema,
+for benchmarks and offline runs. Varies fund, period, deposit source, deposit
+row count, investment tracks and insurance coverage.
+
+    python -m benchmarks.synthetic --count 5 --seed 1 > reports.jsonl
+"""
+
+import argparse
+import json
+import random
+import sys
+
+from core.pension_core import EQUITY_TRACKS
+
+
+FUND_NAMES = {
+    "אינפיניטי": "אינפיניטי פנסיה מקיפה",
+    "אלטשולר שחם": "אלטשולר שחם פנסיה מקיפה",
+    "הפניקס": "הפניקס פנסיה מקיפה",
+    "הראל": "הראל פנסיה מקיפה",
+    "כלל": "כלל פנסיה מקיפה",
+    "מגדל": "מגדל מקפת אישית",
+    "מור": "מור פנסיה מקיפה",
+    "מיטב דש": "מיטב דש פנסיה מקיפה",
+    "מנורה": "מנורה מבטחים פנסיה",
+}
+AGE_TRACKS = ["מסלול לבני 50 ומטה", "מסלול לבני 50 עד 60", "מסלול לבני 60 ומעלה", "מסלול כללי"]
+OTHER_TRACKS = ["מסלול אג\"ח", "מסלול שקלי טווח קצר", "מסלול S&P500", "מסלול הלכה"]
+EMPLOYERS = ["משרד הבריאות", "בנק ישראל", "אלביט מערכות בע\"מ", "עיריית חיפה", "טבע תעשיות", "המוסד לביטוח לאומי"]
+GENDERS = ["גבר", "אשה"]
+MARITAL_STATUSES = ["נשוי/אה", "רווק/ה", "גרוש/ה", "אלמן/ה"]
+QUARTER_END = {1: 3, 2: 6, 3: 9, 4: 12}
+
+
+def _pct(value):
+    return f"{value:.2f}%"
+
+
+def _period(rng):
+    """(report_period, year, end month)."""
+    year = rng.randint(2021, 2025)
+    if rng.random() < 0.5:
+        return f"שנתי {year}", year, 12
+    quarter = rng.randint(1, 4)
+    return f"רבעון {quarter} {year}", year, QUARTER_END[quarter]
+
+
+def _deposit_row(rng, employer, month, year, salary, self_employed):
+    if self_employed:
+        total = round(rng.uniform(800, 4500))
+        employee, employer_c, severance, salary = total, 0, 0, None
+    else:
+        employee = round(salary * 0.06)
+        employer_c = round(salary * 0.065)
+        severance = round(salary * rng.choice([0.06, 0.0833]))
+        total = employee + employer_c + severance
+    deposit_month = month % 12 + 1
+    deposit_year = year + (1 if month == 12 else 0)
+    return {
+        "employer": employer,
+        "deposit_date": f"{rng.randint(1, 28):02d}/{deposit_month:02d}/{deposit_year}",
+        "salary_month": f"{month:02d}/{year}",
+        "salary": salary,
+        "employee_contribution": employee,
+        "employer_contribution": employer_c,
+        "severance": severance,
+        "total": total,
+    }
+
+
+def generate_report(rng, deposit_rows=None, track_count=None, fund_key=None, self_employed=None):
+    """One synthetic report. Unspecified parameters are drawn from rng."""
+    fund_key = fund_key or rng.choice(list(FUND_NAMES))
+    report_period, year, end_month = _period(rng)
+    self_employed = rng.random() < 0.15 if self_employed is None else self_employed
+    if deposit_rows is None:
+        deposit_rows = rng.choice([end_month, end_month, end_month * 2, rng.randint(1, 60)])
+    if track_count is None:
+        track_count = rng.choice([1, 1, 2, 3])
+
+    # ── Table E ──
+    employers = rng.sample(EMPLOYERS, rng.choice([1, 1, 2]))
+    salary = round(rng.uniform(6000, 40000), -1)
+    deposits = []
+    for i in range(deposit_rows):
+        month = i % end_month + 1
+        row_year = year - i // end_month  # rows beyond one period belong to earlier years
+        deposits.append(_deposit_row(rng, employers[i % len(employers)], month, row_year, salary, self_employed))
+    late_deposits = []
+    if rng.random() < 0.3:
+        late_deposits.append(_deposit_row(rng, employers[0], end_month, year, salary, self_employed))
+    totals = {
+        key: sum(d[key] or 0 for d in deposits)
+        for key in ("salary", "employee_contribution", "employer_contribution", "severance", "total")
+    }
+
+    # ── Table B ──
+    opening = round(rng.uniform(10000, 1500000))
+    deposited = totals["total"]
+    returns = round(opening * rng.uniform(-0.08, 0.18))
+    fees_paid = -round(opening * 0.002 + deposited * 0.015)
+    insurance = -round(rng.uniform(0, 3000))
+    actuarial = round(opening * rng.uniform(-0.003, 0.002))
+    closing = opening + deposited + returns + fees_paid + insurance + actuarial
+
+    # ── Table A ──
+    insured = rng.random() > 0.1
+    waived_survivors = insured and rng.random() < 0.15
+    pension_at_67 = round(closing / 190 * rng.uniform(1.5, 6))
+    expected_payments = [
+        {"label": "קצבה חודשית הצפויה לך בפרישה בגיל 67", "amount": pension_at_67},
+        {"label": "קצבה חודשית לאלמן/ה במקרה פטירה", "amount": 0 if waived_survivors or not insured else round(salary * 0.4)},
+        {"label": "קצבה חודשית ליתום במקרה פטירה", "amount": 0 if waived_survivors or not insured else round(salary * 0.2)},
+        {"label": "קצבה חודשית במקרה נכות מלאה", "amount": round(salary * 0.75) if insured else 0},
+        {"label": "שחרור מתשלום הפקדות לקרן בזמן נכות", "amount": round(salary * 0.185) if insured else 0},
+        {"label": "קצבה חודשית להורה נתמך", "amount": None},
+    ]
+
+    tracks_pool = EQUITY_TRACKS[fund_key]["tracks"] + AGE_TRACKS + OTHER_TRACKS
+    tracks = [
+        {"track_name": name if name.startswith("מסלול") else f"מסלול {name}", "return_rate": _pct(rng.uniform(-5, 25))}
+        for name in rng.sample(tracks_pool, min(track_count, len(tracks_pool)))
+    ]
+
+    return {
+        "header": {
+            "report_date": f"{rng.randint(1, 28):02d}/{end_month:02d}/{year}",
+            "report_period": report_period,
+            "fund_name": FUND_NAMES[fund_key],
+            "member_name": "ישראל ישראלי",
+            "member_id": f"{rng.randint(10000000, 399999999):09d}",
+            "employer": employers[0],
+            "report_keywords": ["מקיפה"],
+        },
+        "expected_payments": expected_payments,
+        "movements": [
+            {"label": "יתרת הכספים בקרן בתחילת השנה", "amount": opening},
+            {"label": "כספים שהופקדו לקרן", "amount": deposited},
+            {"label": "רווחים/הפסדים מהשקעות", "amount": returns},
+            {"label": "דמי ניהול", "amount": fees_paid},
+            {"label": "עלות ביטוח למקרה מוות ונכות", "amount": insurance},
+            {"label": "עדכון לפי מאזן אקטוארי", "amount": actuarial},
+            {"label": "יתרת הכספים בקרן בסוף השנה", "amount": closing},
+        ],
+        "fees": [
+            {"label": "דמי ניהול מהפקדה", "rate": _pct(rng.choice([0, 1.0, 1.5, 2.0, 3.0, 6.0]))},
+            {"label": "דמי ניהול מחיסכון", "rate": _pct(rng.choice([0.05, 0.1, 0.15, 0.22, 0.3, 0.5]))},
+        ],
+        "investment_tracks": tracks,
+        "deposits": deposits,
+        "deposits_total": totals,
+        "late_deposits": late_deposits,
+    }
+
+
+def generate_profile(rng):
+    """Random user profile for the questionnaire fields."""
+    marital = rng.choice(MARITAL_STATUSES)
+    return {
+        "gender": rng.choice(GENDERS),
+        "marital_status": marital,
+        "has_minor_children": marital in ("גרוש/ה", "אלמן/ה") and rng.random() < 0.5,
+    }
+
+
+def generate_reports(count, seed=0, **kwargs):
+    """List of count (report, profile) pairs; the same seed gives the same reports."""
+    rng = random.Random(seed)
+    return [(generate_report(rng, **kwargs), generate_profile(rng)) for _ in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic extracted reports as JSONL.")
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--deposit-rows", type=int, default=None)
+    args = parser.parse_args(argv)
+    for report, _ in generate_reports(args.count, args.seed, deposit_rows=args.deposit_rows):
+        sys.stdout.write(json.dumps(report, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+רובייקטיבי - Admission Control
+==============================
+Token-bucket rate limiting of new extractions, shared by every session: each
+client (IP address, or session when the IP is unknown) has its own bucket, and
+all clients draw from one global bucket sized to the API quota. The buckets live
+in memory (one process) or in SQLite (all worker processes on a host).
+
+A client over its own quota is refused at once. When only the global bucket is
+empty the request waits for a token up to max_wait_seconds and is shed after
+that, so under a spike admitted users see a bounded delay instead of everyone
+queueing behind the API together.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+
+DEFAULT_CLIENT_BURST = 10  # analyses a client can start back to back
+DEFAULT_CLIENT_PER_HOUR = 10.0
+DEFAULT_GLOBAL_BURST = 20
+DEFAULT_GLOBAL_PER_MINUTE = 30.0
+DEFAULT_MAX_WAIT_SECONDS = 5.0  # longest a request waits for a global token before it is shed
+DEFAULT_MAX_QUEUE_DEPTH = 32  # extractions queued or running; 0 disables the check
+PRUNE_INTERVAL_SECONDS = 60.0  # how often idle buckets are dropped
+
+GLOBAL_KEY = "global"
+
+ADMITTED = "admitted"
+CLIENT_LIMIT = "client_limit"
+GLOBAL_LIMIT = "global_limit"
+QUEUE_FULL = "queue_full"
+
+
+def refill(tokens, updated_at, capacity, rate, now):
+    """Tokens in a bucket at now, given its level at updated_at."""
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+
+def token_wait(tokens, rate):
+    """Seconds until a bucket holding tokens has a whole token (0 if it has one)."""
+    if tokens >= 1:
+        return 0.0
+    return (1 - tokens) / rate if rate > 0 else float("inf")
+
+
+# ─── Bucket Stores ───
+
+class MemoryBucketStore:
+    """Buckets of the current process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, updated_at)
+
+    def take(self, limits, now):
+        """Take one token from every bucket in limits ([(key, capacity, rate)]) or from none.
+        Returns each bucket's wait in seconds; all zero means the tokens were taken."""
+        with self._lock:
+            levels = [
+                refill(*self._buckets.get(key, (capacity, now)), capacity, rate, now)
+                for key, capacity, rate in limits
+            ]
+            waits = [token_wait(tokens, rate) for tokens, (_, _, rate) in zip(levels, limits)]
+            if not any(waits):
+                levels = [tokens - 1 for tokens in levels]
+            for (key, _, _), tokens in zip(limits, levels):
+                self._buckets[key] = (tokens, now)
+        return waits
+
+    def prune(self, before):
+        """Drop buckets last used before the given time."""
+        with self._lock:
+            for key in [k for k, (_, updated_at) in self._buckets.items() if updated_at < before]:
+                del self._buckets[key]
+
+
+class SQLiteBucketStore:
+    """Buckets in a SQLite file, shared by all processes that open the same path."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._open()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " key TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    def _open(self):
+        # Autocommit mode, so take() controls the transaction itself
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def take(self, limits, now):
+        """Same as MemoryBucketStore.take, atomic across processes."""
+        with closing(self._open()) as conn:
+            # IMMEDIATE takes the write lock up front, so concurrent takers serialize here
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                levels = []
+                for key, capacity, rate in limits:
+                    row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+                    levels.append(refill(*(row or (capacity, now)), capacity, rate, now))
+                waits = [token_wait(tokens, rate) for tokens, (_, _, rate) in zip(levels, limits)]
+                if not any(waits):
+                    levels = [tokens - 1 for tokens in levels]
+                conn.executemany(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    [(key, tokens, now) for (key, _, _), tokens in zip(limits, levels)],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return waits
+
+    def prune(self, before):
+        """Same as MemoryBucketStore.prune."""
+        with closing(self._open()) as conn:
+            conn.execute("DELETE FROM buckets WHERE updated_at < ?", (before,))
+
+
+# ─── Controller ───
+
+class Admission:
+    """Outcome of AdmissionController.admit."""
+
+    def __init__(self, reason, retry_after_seconds=0.0, waited_seconds=0.0):
+        self.reason = reason
+        self.retry_after_seconds = retry_after_seconds
+        self.waited_seconds = waited_seconds
+
+    @property
+    def admitted(self):
+        return self.reason == ADMITTED
+
+
+class AdmissionController:
+    """Admits a new extraction when both the client's and the global bucket have a token."""
+
+    def __init__(self, store=None, client_burst=DEFAULT_CLIENT_BURST, client_per_hour=DEFAULT_CLIENT_PER_HOUR,
+                 global_burst=DEFAULT_GLOBAL_BURST, global_per_minute=DEFAULT_GLOBAL_PER_MINUTE,
+                 max_wait_seconds=DEFAULT_MAX_WAIT_SECONDS, max_queue_depth=DEFAULT_MAX_QUEUE_DEPTH):
+        self.store = store if store is not None else MemoryBucketStore()
+        self.client_limit = (client_burst, client_per_hour / 3600)
+        self.global_limit = (global_burst, global_per_minute / 60)
+        self.max_wait_seconds = max_wait_seconds
+        self.max_queue_depth = max_queue_depth
+        # A bucket idle this long has refilled completely, so dropping it changes nothing
+        self.idle_seconds = max(capacity / rate if rate > 0 else float("inf")
+                                for capacity, rate in (self.client_limit, self.global_limit))
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._pruned_at = time.time()
+
+    def _incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def admit(self, client_key, queue_depth=0):
+        """Take a token for client_key, waiting up to max_wait_seconds for a global one.
+        queue_depth is the number of extractions already queued or running."""
+        if self.max_queue_depth and queue_depth >= self.max_queue_depth:
+            return self._finish(Admission(QUEUE_FULL, self.max_wait_seconds))
+
+        limits = [(f"client:{client_key}", *self.client_limit), (GLOBAL_KEY, *self.global_limit)]
+        start = time.time()
+        self._prune_idle(start)
+        while True:
+            now = time.time()
+            client_wait, global_wait = self.store.take(limits, now)
+            waited = now - start
+            if not client_wait and not global_wait:
+                return self._finish(Admission(ADMITTED, waited_seconds=waited))
+            if client_wait:
+                # The client's own quota: waiting would only hold up its session
+                return self._finish(Admission(CLIENT_LIMIT, client_wait, waited))
+            if waited + global_wait > self.max_wait_seconds:
+                return self._finish(Admission(GLOBAL_LIMIT, global_wait, waited))
+            time.sleep(global_wait)
+
+    def _prune_idle(self, now):
+        """Drop idle buckets (one per client ever seen) at most every PRUNE_INTERVAL_SECONDS."""
+        with self._lock:
+            if now - self._pruned_at < PRUNE_INTERVAL_SECONDS or self.idle_seconds == float("inf"):
+                return
+            self._pruned_at = now
+        self.store.prune(now - self.idle_seconds)
+
+    def _finish(self, admission):
+        self._incr(admission.reason)
+        if admission.waited_seconds:
+            self._incr("wait_seconds", admission.waited_seconds)
+        return admission
+
+    def stats(self):
+        """Counters of each outcome and the total seconds spent waiting for a token."""
+        with self._lock:
+            return {f"admission/{name}": value for name, value in self._counters.items()}
@@ -0,0 +1,229 @@
+"""
+רובייקטיבי - Anthropic Client Pool
+==================================
+One process-wide Anthropic client with a tuned HTTP connection pool, an explicit
+retry/backoff policy and counters for connection reuse, retries and token usage.
+"""
+
+import logging
+import random
+import threading
+import time
+
+import anthropic
+import httpx
+
+from core.tracing import tracer
+
+
+DEFAULT_CLIENT_SETTINGS = {
+    "timeout_seconds": 120.0,
+    "connect_timeout_seconds": 10.0,
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry_seconds": 120.0,
+    "max_retries": 3,
+    "backoff_initial_seconds": 1.0,
+    "backoff_max_seconds": 20.0,
+    "base_url": "",  # empty = the SDK default; point at a local stub server for tests
+}
+
+# Secrets / environment variable names for each setting
+SETTING_NAMES = {
+    "timeout_seconds": "ANTHROPIC_TIMEOUT_SECONDS",
+    "connect_timeout_seconds": "ANTHROPIC_CONNECT_TIMEOUT_SECONDS",
+    "max_connections": "ANTHROPIC_MAX_CONNECTIONS",
+    "max_keepalive_connections": "ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS",
+    "keepalive_expiry_seconds": "ANTHROPIC_KEEPALIVE_EXPIRY_SECONDS",
+    "max_retries": "ANTHROPIC_MAX_RETRIES",
+    "backoff_initial_seconds": "ANTHROPIC_BACKOFF_INITIAL_SECONDS",
+    "backoff_max_seconds": "ANTHROPIC_BACKOFF_MAX_SECONDS",
+    "base_url": "ANTHROPIC_BASE_URL",
+}
+
+RETRYABLE_ERRORS = (
+    anthropic.APIConnectionError,  # includes APITimeoutError
+    anthropic.RateLimitError,
+    anthropic.InternalServerError,  # 529 overloaded on older SDKs
+    # Newer SDKs raise OverloadedError for 529, which is not an InternalServerError
+    getattr(anthropic, "OverloadedError", anthropic.InternalServerError),
+)
+
+logger = logging.getLogger(__name__)
+
+
+def load_client_settings(source):
+    """Build client settings from a mapping such as st.secrets or os.environ."""
+    settings = dict(DEFAULT_CLIENT_SETTINGS)
+    for setting, name in SETTING_NAMES.items():
+        value = source.get(name)
+        if value is not None and value != "":
+            settings[setting] = type(DEFAULT_CLIENT_SETTINGS[setting])(value)
+    return settings
+
+
+# ─── Metrics ───
+
+class ClientMetrics:
+    """Thread-safe counters for the pooled client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """Return a copy of all counters plus average warm/cold request latency."""
+        with self._lock:
+            counters = dict(self._counters)
+        for kind in ("warm", "cold"):
+            count = counters.get(f"{kind}_requests", 0)
+            if count:
+                counters[f"{kind}_avg_seconds"] = counters.get(f"{kind}_seconds", 0) / count
+        return counters
+
+
+metrics = ClientMetrics()
+
+
+def _on_request(request):
+    """Attach a trace hook so we know if this request opened a new connection."""
+    state = {"new_connection": False, "start": time.perf_counter()}
+
+    def trace(event_name, info):
+        if event_name == "connection.connect_tcp.started":
+            state["new_connection"] = True
+
+    request.extensions["trace"] = trace
+    request.extensions["pension_bot_state"] = state
+    metrics.incr("http_requests")
+
+
+def _on_response(response):
+    state = response.request.extensions.get("pension_bot_state")
+    if state is None:
+        return
+    kind = "cold" if state["new_connection"] else "warm"
+    metrics.incr("connections_opened" if state["new_connection"] else "connections_reused")
+    metrics.incr(f"{kind}_requests")
+    metrics.incr(f"{kind}_seconds", time.perf_counter() - state["start"])
+
+
+# ─── Client Factory ───
+
+_client = None
+_client_config = None
+_client_lock = threading.Lock()
+
+
+def get_client(api_key, settings=None):
+    """Return the process-wide client, rebuilding it only if key or settings change."""
+    global _client, _client_config
+    settings = settings or DEFAULT_CLIENT_SETTINGS
+    config = (api_key, tuple(sorted(settings.items())))
+    with _client_lock:
+        if _client is None or _client_config != config:
+            http_client = httpx.Client(
+                timeout=httpx.Timeout(settings["timeout_seconds"], connect=settings["connect_timeout_seconds"]),
+                limits=httpx.Limits(
+                    max_connections=settings["max_connections"],
+                    max_keepalive_connections=settings["max_keepalive_connections"],
+                    keepalive_expiry=settings["keepalive_expiry_seconds"],
+                ),
+                event_hooks={"request": [_on_request], "response": [_on_response]},
+            )
+            # Retries are handled by _with_retries so they can be counted and tuned
+            _client = anthropic.Anthropic(
+                api_key=api_key,
+                base_url=settings.get("base_url") or None,
+                http_client=http_client,
+                max_retries=0,
+            )
+            _client_config = config
+            metrics.incr("clients_created")
+        return _client
+
+
+def _with_retries(call, settings, can_retry=lambda: True):
+    """Run call() with exponential backoff + jitter on transient errors."""
+    metrics.incr("api_calls")
+    attempt = 0
+    while True:
+        try:
+            return call()
+        except RETRYABLE_ERRORS as e:
+            if attempt >= settings["max_retries"] or not can_retry():
+                metrics.incr("api_failures")
+                raise
+            delay = min(settings["backoff_max_seconds"], settings["backoff_initial_seconds"] * (2 ** attempt))
+            delay *= random.uniform(0.5, 1.0)
+            delay = max(delay, _retry_after(e))
+            attempt += 1
+            metrics.incr("retries")
+            logger.warning("Anthropic call failed (%s), retry %d in %.1fs", type(e).__name__, attempt, delay)
+            time.sleep(delay)
+
+
+def create_message(client, settings=None, **kwargs):
+    """client.messages.create with the retry policy."""
+    def call():
+        message = client.messages.create(**kwargs)
+        record_usage(getattr(message, "usage", None), getattr(message, "model", None))
+        return message
+
+    return _with_retries(call, settings or DEFAULT_CLIENT_SETTINGS)
+
+
+def stream_message(client, settings=None, on_text=None, **kwargs):
+    """client.messages.stream with the retry policy; on_text gets each text delta.
+    A failed stream is retried only if no text was delivered yet."""
+    received = []
+
+    def call():
+        with client.messages.stream(**kwargs) as stream:
+            for text in stream.text_stream:
+                received.append(True)
+                if on_text is not None:
+                    on_text(text)
+            message = stream.get_final_message()
+        record_usage(getattr(message, "usage", None), getattr(message, "model", None))
+        return message
+
+    return _with_retries(call, settings or DEFAULT_CLIENT_SETTINGS, can_retry=lambda: not received)
+
+
+def record_usage(usage, model=None):
+    """Add token counts from message.usage, split into cached and uncached input.
+    With the model, usage is also added to the tracer's per-model token counters."""
+    if usage is None:
+        return
+    if model:
+        tracer.record_usage(usage, model)
+    uncached = getattr(usage, "input_tokens", 0) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+    metrics.incr("input_tokens_uncached", uncached)
+    metrics.incr("input_tokens_cache_write", cache_write)
+    metrics.incr("input_tokens_cache_read", cache_read)
+    metrics.incr("output_tokens", getattr(usage, "output_tokens", 0) or 0)
+    metrics.incr("prompt_cache_hits" if cache_read else "prompt_cache_misses")
+    logger.info("token usage: uncached=%d cache_write=%d cache_read=%d", uncached, cache_write, cache_read)
+
+
+def _retry_after(error):
+    """Seconds the server asked us to wait, or 0."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return 0
+    try:
+        return float(response.headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def get_client_metrics():
+    """Snapshot of connection reuse, retry, latency and token counters."""
+    return metrics.snapshot()
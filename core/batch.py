@@ -0,0 +1,274 @@
+"""
+רובייקטיבי - Batch Analysis CLI
+===============================
+Headless analysis of a directory (or glob) of pension report PDFs.
+Extracts reports concurrently through the extraction cache, runs the core
+analysis on each and writes one row per report to JSONL or Parquet.
+Reports already in the output are skipped, so an interrupted run can be resumed.
+
+    python -m core.batch reports/ --output results.jsonl --workers 8
+    python -m core.batch reports/ --output results.parquet --backend batch
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from core.report_model import build_report_model, MIXED_DEPOSIT_SOURCE
+from core.extraction import call_anthropic, ExtractionError, EXTRACTION_MODEL
+from core.batch_backend import MessageBatchBackend, DEFAULT_POLL_SECONDS
+from core.extraction_cache import (
+    ExtractionCache, pdf_hash,
+    DEFAULT_CACHE_PATH, DEFAULT_TTL_SECONDS, DEFAULT_MAX_BYTES,
+)
+from core.api_client import load_client_settings, get_client
+from core.model_router import ModelRouter
+
+
+DEFAULT_WORKERS = 4
+MAX_PDF_SIZE_KB = 400  # same limit as the web app
+DONE_STATUSES = ("ok", "invalid")  # rows with these statuses are not re-run on resume
+
+
+# ─── Input / Output ───
+
+def find_pdfs(inputs):
+    """Expand directories and glob patterns into a sorted, de-duplicated list of PDF paths."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True)
+            matches += glob.glob(os.path.join(item, "**", "*.PDF"), recursive=True)
+        elif os.path.isfile(item):
+            matches = [item]
+        else:
+            matches = glob.glob(item, recursive=True)
+        paths.extend(sorted(matches))
+    seen = set()
+    return [p for p in paths if not (p in seen or seen.add(p))]
+
+
+def checkpoint_path(output):
+    """JSONL file results are appended to (the output itself unless writing Parquet)."""
+    return output + ".checkpoint.jsonl" if output.endswith(".parquet") else output
+
+
+def load_checkpoint(path):
+    """Return {pdf_sha256: row} for finished rows already written to path."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partially written last line of an interrupted run
+            if row.get("status") in DONE_STATUSES:
+                done[row["pdf_sha256"]] = row
+    return done
+
+
+def write_parquet(rows, path):
+    """Write rows to Parquet; nested values are stored as JSON strings."""
+    import pandas as pd
+
+    flat = [
+        {k: json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict)) else v for k, v in row.items()}
+        for row in rows
+    ]
+    pd.DataFrame(flat).to_parquet(path, index=False)
+
+
+class ProgressBar:
+    """Minimal stderr progress bar."""
+
+    def __init__(self, total, enabled=True, width=30):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.enabled = enabled
+        self.width = width
+        self._lock = threading.Lock()
+
+    def update(self, ok):
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+            if self.enabled:
+                filled = int(self.width * self.done / max(1, self.total))
+                bar = "#" * filled + "-" * (self.width - filled)
+                sys.stderr.write(f"\r[{bar}] {self.done}/{self.total} (failed: {self.failed})")
+                if self.done == self.total:
+                    sys.stderr.write("\n")
+                sys.stderr.flush()
+
+
+# ─── Analysis ───
+
+def analyze_report(data, user_profile):
+    """Run validation, analysis, insurance, fee and track logic on extracted data.
+    Returns a flat result row."""
+    model = build_report_model(data, user_profile)
+    if not model.is_valid:
+        return {"status": "invalid", "error": model.error}
+    if model.deposit_source == MIXED_DEPOSIT_SOURCE:
+        return {"status": "invalid", "error": "mixed employee and self-employed deposits", "deposit_source": model.deposit_source}
+
+    fees = model.fees
+    row = {"status": "ok", "error": ""}
+    row.update(model.analysis)
+    row["insurance_warnings"] = [{"type": icon, "message": msg} for icon, msg in model.insurance_warnings]
+    row["fee_status"] = fees["status"]
+    if fees["status"] == "ok":
+        for key in ("deposit_fee", "savings_fee", "current_fee", "max_fee", "adv_fee",
+                    "cheapest_fee", "cheapest_fund_fee", "cheapest_fund_names", "max_saving"):
+            row[f"fee_{key}"] = fees[key]
+    row["track_names"] = [t.get("track_name", "") for t in data.get("investment_tracks", [])]
+    row["track_returns"] = [t.get("return_rate", "") for t in data.get("investment_tracks", [])]
+    for key, value in model.tracks.items():
+        row[f"track_{key}"] = value
+    row["gov_employer"] = model.gov_employer
+    return row
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def process_file(path, extract, user_profile):
+    """Extract and analyse one PDF. Never raises; failures become error rows."""
+    row = {"file": path, "pdf_sha256": ""}
+    try:
+        pdf_bytes = _read_bytes(path)
+        row["pdf_sha256"] = pdf_hash(pdf_bytes)
+        if not pdf_bytes:
+            row.update(status="error", error="empty file")
+        elif len(pdf_bytes) / 1024 > MAX_PDF_SIZE_KB:
+            row.update(status="error", error="file too large")
+        else:
+            row.update(analyze_report(extract(pdf_bytes), user_profile))
+    except ExtractionError as e:
+        row.update(status="error", error=str(e))
+    except Exception as e:
+        row.update(status="error", error=f"{type(e).__name__}: {e}")
+    return row
+
+
+def pending_paths(paths, done):
+    """Paths whose content hash is not among the finished rows."""
+    todo = []
+    for path in paths:
+        if pdf_hash(_read_bytes(path)) not in done:
+            todo.append(path)
+    return todo
+
+
+def run_batch(paths, output, extract, user_profile, workers=DEFAULT_WORKERS, progress=True):
+    """Process paths concurrently, appending rows to the checkpoint as they finish.
+    Returns all finished rows (including ones from earlier runs)."""
+    ckpt = checkpoint_path(output)
+    done = load_checkpoint(ckpt)
+
+    # Skip files whose content was already processed in an earlier run
+    todo = pending_paths(paths, done)
+
+    bar = ProgressBar(len(todo), enabled=progress)
+    rows = list(done.values())
+    write_lock = threading.Lock()
+    with open(ckpt, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_file, path, extract, user_profile) for path in todo]
+        for future in as_completed(futures):
+            row = future.result()
+            with write_lock:
+                out.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+                out.flush()
+            rows.append(row)
+            bar.update(row["status"] in DONE_STATUSES)
+
+    if output.endswith(".parquet"):
+        write_parquet([r for r in rows if r["status"] in DONE_STATUSES], output)
+    return rows
+
+
+# ─── Entry Point ───
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Batch-analyse Israeli pension report PDFs.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="output .jsonl or .parquet file")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS, help="concurrent extractions")
+    parser.add_argument("--backend", choices=["sync", "batch"], default="sync",
+                        help="sync = one API call per report, batch = Message Batches API")
+    parser.add_argument("--section-parallel", action="store_true",
+                        help="sync backend: extract summary tables and deposit pages with concurrent requests")
+    parser.add_argument("--poll-seconds", type=float, default=DEFAULT_POLL_SECONDS, help="batch status poll interval")
+    parser.add_argument("--model", default=EXTRACTION_MODEL)
+    parser.add_argument("--models", nargs="+", default=None,
+                        help="sync backend: model tiers, cheapest first; escalate when a report fails the checks")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_TTL_SECONDS, help="seconds")
+    parser.add_argument("--cache-max-bytes", type=int, default=DEFAULT_MAX_BYTES)
+    parser.add_argument("--gender", choices=["גבר", "אשה"], default="גבר")
+    parser.add_argument("--marital-status", choices=["נשוי/אה", "רווק/ה", "גרוש/ה", "אלמן/ה"], default="נשוי/אה")
+    parser.add_argument("--has-minor-children", action="store_true")
+    parser.add_argument("--no-progress", action="store_true")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    paths = find_pdfs(args.inputs)
+    if not paths:
+        print("no PDF files found", file=sys.stderr)
+        return 1
+
+    cache = ExtractionCache(args.cache_path, ttl_seconds=args.cache_ttl, max_bytes=args.cache_max_bytes)
+    api_key = os.environ.get("ANTHROPIC_API_KEY", "")
+    client_settings = load_client_settings(os.environ)
+    user_profile = {
+        "gender": args.gender,
+        "marital_status": args.marital_status,
+        "has_minor_children": args.has_minor_children,
+    }
+
+    if args.backend == "batch":
+        backend = MessageBatchBackend(
+            get_client(api_key, client_settings), model=args.model, cache=cache, poll_seconds=args.poll_seconds,
+        )
+        todo = pending_paths(paths, load_checkpoint(checkpoint_path(args.output)))
+        todo = [p for p in todo if 0 < os.path.getsize(p) <= MAX_PDF_SIZE_KB * 1024]
+        batch_results = backend.extract_all(_read_bytes(path) for path in todo)
+
+        def extract(pdf_bytes):
+            result = batch_results.get(pdf_hash(pdf_bytes), ExtractionError("missing from batch results"))
+            if isinstance(result, ExtractionError):
+                raise result
+            return result
+    elif args.models:
+        router = ModelRouter(args.models)
+
+        def extract(pdf_bytes):
+            return router.extract(pdf_bytes, api_key, cache=cache, client_settings=client_settings,
+                                  section_parallel=args.section_parallel)
+    else:
+        def extract(pdf_bytes):
+            return call_anthropic(pdf_bytes, api_key, model=args.model, cache=cache, client_settings=client_settings,
+                                  section_parallel=args.section_parallel)
+
+    rows = run_batch(paths, args.output, extract, user_profile, workers=args.workers, progress=not args.no_progress)
+    failed = sum(1 for r in rows if r["status"] not in DONE_STATUSES)
+    if args.models and args.backend == "sync":
+        print(f"model router: {json.dumps(router.stats())}", file=sys.stderr)
+    print(f"{len(rows)} reports, {failed} failed -> {args.output}", file=sys.stderr)
+    return 0 if failed == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+רובייקטיבי - Message Batches Backend
+====================================
+Bulk offline extraction through the asynchronous Message Batches API, which is
+billed at a discount and does not count against the per-minute rate limits.
+Results are mapped back to PDF content hashes and stored in the extraction cache.
+"""
+
+import logging
+import time
+
+from core.extraction import (
+    build_request, parse_response,
+    ExtractionError, EXTRACTION_MODEL,
+)
+from core.extraction_cache import cache_key, pdf_hash
+from core.tracing import tracer
+
+
+DEFAULT_POLL_SECONDS = 60
+MAX_BATCH_REQUESTS = 10000  # API limit is 100,000
+MAX_BATCH_BYTES = 200 * 1024 * 1024  # API limit is 256MB per batch
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBatchBackend:
+    """Extract many reports with one or more message batches."""
+
+    def __init__(self, client, model=EXTRACTION_MODEL, cache=None, poll_seconds=DEFAULT_POLL_SECONDS,
+                 preprocess=True):
+        self.client = client
+        self.model = model
+        self.cache = cache
+        self.poll_seconds = poll_seconds
+        self.preprocess = preprocess
+
+    def extract_all(self, pdfs):
+        """Extract every PDF in pdfs (an iterable of bytes).
+        Returns {pdf_sha256: data or ExtractionError}."""
+        results = {}
+        pending = {}
+        for pdf_bytes in pdfs:
+            digest = pdf_hash(pdf_bytes)
+            if digest in results or digest in pending:
+                continue
+            key = cache_key(pdf_bytes, self.model)
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                results[digest] = cached
+            else:
+                pending[digest] = pdf_bytes
+
+        if not pending:
+            return results
+
+        submitted = []
+        for chunk in self._chunks(pending):
+            batch_id = self.submit(chunk)
+            logger.info("submitted message batch %s with %d reports", batch_id, len(chunk))
+            submitted.append((batch_id, {digest: key for digest, key, _ in chunk}))
+
+        for batch_id, keys in submitted:
+            self.wait(batch_id)
+            results.update(self.collect(batch_id, keys))
+        return results
+
+    def _chunks(self, pending):
+        """Yield lists of (digest, cache key, params) within the batch size limits."""
+        chunk = []
+        size = 0
+        for digest, pdf_bytes in pending.items():
+            params = build_request(pdf_bytes, self.model, self.preprocess)
+            request_size = len(params["messages"][0]["content"][0]["source"]["data"])
+            if chunk and (len(chunk) >= MAX_BATCH_REQUESTS or size + request_size > MAX_BATCH_BYTES):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append((digest, cache_key(pdf_bytes, self.model), params))
+            size += request_size
+        if chunk:
+            yield chunk
+
+    def submit(self, chunk):
+        """Create a batch; custom_id is the PDF hash. Returns the batch id."""
+        batch = self.client.messages.batches.create(
+            requests=[{"custom_id": digest, "params": params} for digest, _, params in chunk],
+        )
+        return batch.id
+
+    def wait(self, batch_id):
+        """Poll until the batch has ended. Returns the final batch object."""
+        while True:
+            batch = self.client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                return batch
+            time.sleep(self.poll_seconds)
+
+    def collect(self, batch_id, keys):
+        """Map batch results to {pdf_sha256: data or ExtractionError}, caching successes."""
+        results = {}
+        for entry in self.client.messages.batches.results(batch_id):
+            digest = entry.custom_id
+            if digest not in keys:
+                continue
+            if entry.result.type != "succeeded":
+                results[digest] = ExtractionError(f"batch request {entry.result.type}")
+                continue
+            message = entry.result.message
+            tracer.observe_report_cost(self.model, tracer.record_usage(message.usage, self.model, batch=True))
+            try:
+                data = parse_response(message)
+            except ExtractionError as e:
+                results[digest] = e
+                continue
+            if self.cache is not None:
+                self.cache.put(keys[digest], data)
+            results[digest] = data
+
+        for digest in keys:
+            results.setdefault(digest, ExtractionError("missing from batch results"))
+        return results
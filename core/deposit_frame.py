@@ -0,0 +1,130 @@
+"""
+רובייקטיבי - Columnar Deposit Table
+===================================
+Table E (deposits + late deposits) as NumPy columns, built once per report.
+Month/year are parsed up front, so source detection, the salary-rate median and
+the monthly aggregation are array operations rather than per-row Python loops.
+"""
+
+import numpy as np
+
+
+AMOUNT_COLUMNS = ("salary", "employee_contribution", "employer_contribution", "severance", "total")
+
+
+def _amount(value):
+    """Deposit amount as float; NaN when missing or not a number."""
+    if value is None or isinstance(value, bool):
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(",", ""))
+    except ValueError:
+        return np.nan
+
+
+def parse_deposit_month(dep):
+    """(month, year) of a deposit row from salary_month, else deposit_date. None if unparsable."""
+    sm = dep.get("salary_month", "")
+    # For self-employed, salary_month may be missing - fall back to deposit_date
+    if not sm:
+        dd = dep.get("deposit_date", "")
+        if dd:
+            # deposit_date format: DD/MM/YYYY or DD.MM.YYYY
+            parts = dd.replace(".", "/").split("/")
+            if len(parts) == 3:
+                sm = f"{parts[1]}/{parts[2]}"
+    if not sm:
+        return None
+    try:
+        parts = sm.split("/")
+        if len(parts) != 2:
+            return None
+        month_num = int(parts[0])
+        year_num = int(parts[1])
+        # Handle 2-digit year (e.g. "24" -> 2024)
+        if year_num < 100:
+            year_num += 2000
+        return month_num, year_num
+    except (ValueError, IndexError):
+        return None
+
+
+class DepositFrame:
+    """Columns: one float array per AMOUNT_COLUMNS entry (NaN = missing),
+    plus int arrays month and year (0 = no parsable month)."""
+
+    def __init__(self, rows):
+        self.size = len(rows)
+        cells = [[r.get(col) for col in AMOUNT_COLUMNS] for r in rows]
+        try:
+            # Fast path: numbers and None (None becomes NaN)
+            table = np.array(cells, dtype=float).reshape(self.size, len(AMOUNT_COLUMNS))
+        except (TypeError, ValueError):
+            table = np.array([[_amount(v) for v in row] for row in cells], dtype=float).reshape(self.size, len(AMOUNT_COLUMNS))
+        self.columns = {col: table[:, i] for i, col in enumerate(AMOUNT_COLUMNS)}
+
+        # Reports repeat the same few month strings across employers; parse each once
+        parsed = {}
+        month_years = []
+        for r in rows:
+            key = (r.get("salary_month", ""), r.get("deposit_date", ""))
+            month_year = parsed.get(key)
+            if month_year is None:
+                month_year = parsed[key] = parse_deposit_month(r) or (0, 0)
+            month_years.append(month_year)
+        months = np.array(month_years, dtype=np.int64).reshape(self.size, 2)
+        self.month = months[:, 0]
+        self.year = months[:, 1]
+
+    def filled(self, col):
+        """Column with missing values as 0 (the `value or 0` convention)."""
+        return np.nan_to_num(self.columns[col], nan=0.0)
+
+    # ─── Aggregates ───
+
+    def deposit_source(self):
+        """'שכיר', 'עצמאי' or 'שכיר + עצמאי' (see pension_core.detect_deposit_source)."""
+        if not self.size:
+            return "שכיר"  # default
+        employer = self.filled("employer_contribution") != 0
+        # Employee contribution without employer contribution = עצמאי
+        self_employed = ~employer & (self.filled("employee_contribution") != 0)
+        has_employer = bool(employer.any())
+        has_self = bool(self_employed.any())
+        if has_employer and has_self:
+            return "שכיר + עצמאי"
+        elif has_self:
+            return "עצמאי"
+        return "שכיר"
+
+    def total(self, col):
+        """Column sum; int when the sum is whole."""
+        value = float(self.filled(col).sum())
+        return int(value) if value.is_integer() else value
+
+    def median_deposit_rate(self, min_salary=500, min_total=50, low=0.10, high=0.30):
+        """Median total/salary over rows with a plausible rate, or None."""
+        salary = self.filled("salary")
+        total = self.filled("total")
+        usable = (salary > min_salary) & (total > min_total)
+        rates = total[usable] / salary[usable]
+        rates = rates[(rates > low) & (rates < high)]
+        return float(np.median(rates)) if rates.size else None
+
+    def monthly_totals(self, value_col, year):
+        """{month: summed value} for rows of the given year.
+        Uses value_col, falling back to salary, then total; rows without a value are skipped."""
+        value = self.columns[value_col]
+        for fallback in ("salary", "total"):
+            value = np.where(np.isnan(value), self.columns[fallback], value)
+        rows = (self.year == year) & (self.month >= 1) & (self.month <= 12) & ~np.isnan(value) & (value != 0)
+        sums = np.bincount(self.month[rows], weights=value[rows], minlength=13)
+        counts = np.bincount(self.month[rows], minlength=13)
+        return {int(m): float(sums[m]) for m in np.flatnonzero(counts)}
+
+
+def build_deposit_frame(data):
+    """DepositFrame over deposits + late_deposits of a report."""
+    return DepositFrame(data.get("deposits", []) + data.get("late_deposits", []))
@@ -0,0 +1,354 @@
+"""
+רובייקטיבי - Report Extraction
+==============================
+Sends a pension report PDF to the model and returns the parsed JSON.
+Has no Streamlit dependency so it can run in worker threads and CLI tools.
+"""
+
+import base64
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import anthropic
+
+from core.pension_core import SYSTEM_PROMPT, USER_PROMPT, deposits_total_problem
+from core.extraction_cache import cache_key
+from core.api_client import get_client, stream_message, create_message
+from core.json_stream import SectionStreamParser, recover_json
+from core.pdf_preprocess import preprocess_pdf, split_report_pages
+from core.tracing import tracer, span, traced, usage_cost
+
+
+EXTRACTION_MODEL = "claude-sonnet-4-20250514"
+MAX_OUTPUT_TOKENS = 8000
+MAX_CONTINUATIONS = 2  # targeted follow-up requests for sections a broken answer is missing
+
+# Top-level sections of the SYSTEM_PROMPT structure, in answer order
+REPORT_SECTIONS = (
+    "header", "expected_payments", "movements", "fees", "investment_tracks",
+    "deposits", "deposits_total", "late_deposits",
+)
+
+# Section-parallel extraction: one request for the summary tables, one per run of deposit pages
+SUMMARY_SECTIONS = ("header", "expected_payments", "movements", "fees", "investment_tracks")
+DEPOSIT_SECTIONS = ("deposits", "deposits_total", "late_deposits")
+SUMMARY_PROMPT = (
+    "These pages are part of an Israeli pension report. Extract only these keys of the JSON structure "
+    "specified: header, expected_payments, movements, fees, investment_tracks. Return ONLY the JSON."
+)
+DEPOSITS_PROMPT = (
+    "These pages are part of the deposits table of an Israeli pension report. Extract only these keys "
+    "of the JSON structure specified: deposits, deposits_total, late_deposits - with the rows shown on "
+    "these pages only. Set deposits_total to null unless the totals row is on these pages. "
+    "Return ONLY the JSON."
+)
+
+# Static system prompt marked for prompt caching, so repeat calls are billed as cache reads
+SYSTEM_BLOCKS = [
+    {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}},
+]
+
+
+class ExtractionError(Exception):
+    """Extraction failed. The message is user-facing Hebrew text."""
+
+
+def build_request(pdf_bytes, model=EXTRACTION_MODEL, preprocess=True, prompt=USER_PROMPT):
+    """Messages API parameters for extracting one report (or the part of it that prompt asks for)."""
+    if preprocess:
+        with span("preprocess_pdf"):
+            send_bytes = preprocess_pdf(pdf_bytes)["pdf_bytes"]
+    else:
+        send_bytes = pdf_bytes
+    with span("base64_encode", bytes=len(send_bytes)):
+        b64 = base64.standard_b64encode(send_bytes).decode("utf-8")
+    return {
+        "model": model,
+        "max_tokens": MAX_OUTPUT_TOKENS,
+        "system": SYSTEM_BLOCKS,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "document",
+                        "source": {
+                            "type": "base64",
+                            "media_type": "application/pdf",
+                            "data": b64,
+                        },
+                    },
+                    {"type": "text", "text": prompt},
+                ],
+            }
+        ],
+    }
+
+
+def message_text(message):
+    return "".join(block.text for block in message.content if hasattr(block, "text"))
+
+
+def recover_response(message):
+    """recover_json of a model message (see json_stream). Raises ExtractionError if nothing is usable."""
+    try:
+        return recover_json(message_text(message))
+    except ValueError as e:
+        raise ExtractionError("שגיאה בפענוח התשובה מה-AI. נסה שוב.") from e
+
+
+@traced()
+def parse_response(message):
+    """Parse the report JSON out of a model message. Code fences and text after
+    the JSON are ignored. Raises ExtractionError if the JSON is broken."""
+    recovered = recover_response(message)
+    if not recovered["complete"]:
+        raise ExtractionError("שגיאה בפענוח התשובה מה-AI. נסה שוב.")
+    return recovered["data"]
+
+
+@contextmanager
+def api_errors():
+    """Translate Anthropic API errors into ExtractionError."""
+    try:
+        yield
+    except anthropic.BadRequestError as e:
+        error_msg = str(e.message) if hasattr(e, 'message') else str(e)
+        if "credit balance" in error_msg.lower():
+            raise ExtractionError("שגיאה: אין מספיק קרדיט ב-API. יש לרכוש קרדיט נוסף.") from e
+        raise ExtractionError("שגיאה בעיבוד הדוח. נסה שוב או העלה דוח אחר.") from e
+    except anthropic.APIError as e:
+        raise ExtractionError("שגיאה בתקשורת עם שרת ה-AI. נסה שוב מאוחר יותר.") from e
+
+
+# ─── Continuation ───
+
+def missing_sections(recovered, sections=REPORT_SECTIONS):
+    """Sections a recovered answer still needs: the ones that failed to parse, the one
+    that was cut off and every section the answer did not reach."""
+    if recovered["complete"]:
+        return []
+    data = recovered["data"]
+    return [
+        name for name in sections
+        if name not in data or name in recovered["failed"] or name == recovered["truncated"]
+    ]
+
+
+def build_continuation_request(request, sections, partial):
+    """Copy of an extraction request that asks only for sections.
+    partial maps a cut-off array section to the items already extracted, so the
+    model continues after the last of them instead of starting over."""
+    lines = [f"Return ONLY a JSON object with these keys of the structure specified: {', '.join(sections)}."]
+    for name, items in partial.items():
+        lines.append(
+            f'"{name}" was already extracted up to and including this item ({len(items)} items): '
+            f'{json.dumps(items[-1], ensure_ascii=False)}. In "{name}" return only the items that come after it.'
+        )
+    content = [block for block in request["messages"][0]["content"] if block.get("type") != "text"]
+    content.append({"type": "text", "text": "\n".join(lines)})
+    return dict(request, messages=[{"role": "user", "content": content}])
+
+
+def _append_items(done, new):
+    """done + new, trimming items of new that repeat the end of done."""
+    if new[:len(done)] == done:
+        new = new[len(done):]
+    elif new and new[0] == done[-1]:
+        new = new[1:]
+    return done + new
+
+
+def complete_report(client, settings, request, recovered, model, sections=REPORT_SECTIONS, nullable=()):
+    """Fill in the sections missing from a broken answer with targeted continuation
+    requests, instead of extracting the whole report again. A section returned as
+    null is still missing, unless it is in nullable.
+    Returns (data, USD cost of the continuations). Raises ExtractionError."""
+    data = dict(recovered["data"])
+    missing = missing_sections(recovered, sections)
+    truncated = recovered["truncated"]
+    cost = 0.0
+    for _ in range(MAX_CONTINUATIONS):
+        if not missing:
+            break
+        partial = {
+            name: data[name] for name in missing
+            if name == truncated and isinstance(data.get(name), list) and data[name]
+        }
+        with span("continuation", sections=",".join(missing), continued=",".join(partial)), api_errors():
+            message = create_message(client, settings, **build_continuation_request(request, missing, partial))
+        cost += usage_cost(message.usage, model) or 0.0
+        answer = recover_response(message)
+        still_missing = []
+        for name in missing:
+            value = answer["data"].get(name)
+            if (value is None and name not in nullable) or name not in answer["data"] or name in answer["failed"]:
+                still_missing.append(name)
+                continue
+            if name in partial and isinstance(value, list):
+                value = _append_items(partial[name], value)
+            data[name] = value
+            if name == answer["truncated"]:
+                still_missing.append(name)
+        missing, truncated = still_missing, answer["truncated"]
+    if missing:
+        raise ExtractionError("שגיאה בפענוח התשובה מה-AI. נסה שוב.")
+    return data, cost
+
+
+# ─── Section-Parallel Extraction ───
+
+def extract_part(client, settings, request, model, sections, on_sections=None):
+    """Stream one request and recover the given sections of its answer, continuing
+    a broken answer like call_anthropic does. on_sections(sections) gets progress.
+    Returns (data, USD cost or None). Raises ExtractionError."""
+    parser = SectionStreamParser()
+
+    def on_text(text):
+        if parser.feed(text) and on_sections is not None:
+            on_sections(dict(parser.sections))
+
+    with api_errors():
+        message = stream_message(client, settings, on_text=on_text, **request)
+    cost = usage_cost(message.usage, model)
+    recovered = recover_response(message)
+    data = recovered["data"]
+    if not recovered["complete"]:
+        # A run of deposit pages without the totals row rightly answers "deposits_total": null
+        data, continuation_cost = complete_report(client, settings, request, recovered, model, sections,
+                                                  nullable=("deposits_total",))
+        if cost is not None:
+            cost += continuation_cost
+    return {name: data[name] for name in sections if name in data}, cost
+
+
+def merge_deposit_parts(parts):
+    """Deposit sections of consecutive page runs as one: rows concatenated in page
+    order, deposits_total from the part that has the totals row."""
+    totals = [part["deposits_total"] for part in parts if part.get("deposits_total")]
+    return {
+        "deposits": [row for part in parts for row in part.get("deposits") or []],
+        "deposits_total": totals[-1] if totals else {},
+        "late_deposits": [row for part in parts for row in part.get("late_deposits") or []],
+    }
+
+
+def extract_sections_parallel(client, settings, split, model=EXTRACTION_MODEL, on_progress=None):
+    """Extract a split report (see pdf_preprocess.split_report_pages) with concurrent
+    requests: one for the summary tables and one per run of deposit pages, so the
+    wall-clock time is that of the slowest part rather than the sum.
+    If no part found the totals row or the merged rows don't add up to
+    deposits_total, the deposits are extracted again in one request over the
+    pages from the first deposit page to the end of the report.
+    Returns (data, USD cost or None). Raises ExtractionError."""
+    summary_request = build_request(split["summary"], model, preprocess=False, prompt=SUMMARY_PROMPT)
+    deposit_requests = [build_request(part, model, preprocess=False, prompt=DEPOSITS_PROMPT) for part in split["deposits"]]
+    total_cost = [0.0]
+
+    def add_cost(cost):
+        if cost is None or total_cost[0] is None:
+            total_cost[0] = None
+        else:
+            total_cost[0] += cost
+
+    with span("section_parallel", parts=1 + len(deposit_requests)), \
+            ThreadPoolExecutor(max_workers=1 + len(deposit_requests)) as pool:
+        summary_future = pool.submit(extract_part, client, settings, summary_request, model,
+                                     SUMMARY_SECTIONS, on_progress)
+        deposit_futures = [
+            pool.submit(extract_part, client, settings, request, model, DEPOSIT_SECTIONS)
+            for request in deposit_requests
+        ]
+        summary, cost = summary_future.result()
+        add_cost(cost)
+        deposit_parts = []
+        for future in deposit_futures:
+            part, cost = future.result()
+            add_cost(cost)
+            deposit_parts.append(part)
+
+    data = dict(summary)
+    data.update(merge_deposit_parts(deposit_parts))
+    # Without a totals row the merged rows can't be cross-checked, so that is a problem too
+    problem = deposits_total_problem(data) if data["deposits_total"] else "no deposits_total in any part"
+    if problem:
+        # A row split across a page break, a totals row read as a deposit, or a totals
+        # row past the detected deposit pages - use one request over the rest of the report
+        with span("section_parallel_fallback", problem=problem):
+            request = build_request(split["all_deposits"], model, preprocess=False, prompt=DEPOSITS_PROMPT)
+            deposits, cost = extract_part(client, settings, request, model, DEPOSIT_SECTIONS)
+        add_cost(cost)
+        data.update(merge_deposit_parts([deposits]))
+    return data, total_cost[0]
+
+
+def call_anthropic(pdf_bytes, api_key, model=EXTRACTION_MODEL, cache=None, client_settings=None,
+                   preprocess=True, on_progress=None, section_parallel=False):
+    """Send PDF to Anthropic API and return parsed JSON (cached by PDF content).
+    The response is streamed; on_progress(sections) is called with the
+    top-level sections parsed so far each time one completes.
+    With preprocess, only the pages holding Tables A–E are sent. With section_parallel, a report whose tables
+    are all found in the text layer is extracted by extract_sections_parallel.
+    Raises ExtractionError on failure."""
+    key = cache_key(pdf_bytes, model)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    if not api_key:
+        raise ExtractionError("מפתח API לא הוגדר. הגדר ANTHROPIC_API_KEY ב-Secrets.")
+
+    client = get_client(api_key, client_settings)
+    if section_parallel:
+        with span("split_report_pages"):
+            split = split_report_pages(pdf_bytes)
+        if split is not None and split["deposits"]:
+            result, cost = extract_sections_parallel(client, client_settings, split, model, on_progress)
+            tracer.observe_report_cost(model, cost)
+            if cache is not None:
+                cache.put(key, result)
+            return result
+
+    parser = SectionStreamParser()
+    request = build_request(pdf_bytes, model, preprocess)
+    first_text_at = []
+
+    def on_text(text):
+        if not first_text_at:
+            first_text_at.append(time.perf_counter())
+        if parser.feed(text) and on_progress is not None:
+            on_progress(dict(parser.sections))
+
+    started = time.perf_counter()
+    with api_errors():
+        message = stream_message(
+            client,
+            client_settings,
+            on_text=on_text,
+            **request,
+        )
+
+    finished = time.perf_counter()
+    # Time to first token includes any retries before the stream started
+    first = first_text_at[0] if first_text_at else finished
+    tracer.observe("time_to_first_token", first - started, model=model)
+    tracer.observe("generation", finished - first, model=model)
+    cost = usage_cost(message.usage, model)
+
+    # A truncated (max_tokens) or partly broken answer keeps its complete sections;
+    # only the missing ones are requested again
+    with span("parse_response"):
+        recovered = recover_response(message)
+    result = recovered["data"]
+    if not recovered["complete"]:
+        result, continuation_cost = complete_report(client, client_settings, request, recovered, model)
+        if cost is not None:
+            cost += continuation_cost
+    tracer.observe_report_cost(model, cost)
+
+    if cache is not None:
+        cache.put(key, result)
+    return result
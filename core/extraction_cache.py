@@ -0,0 +1,117 @@
+"""
+רובייקטיבי - Extraction Cache
+=============================
+Persistent, content-addressed cache of parsed report JSON.
+The same PDF (same bytes, same prompts, same model) is sent to the model once.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+
+from core.pension_core import SYSTEM_PROMPT, USER_PROMPT
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pension-bot", "extractions.sqlite3")
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600  # 30 days
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200MB of stored JSON
+
+
+def pdf_hash(pdf_bytes):
+    """SHA-256 hex digest of the raw PDF bytes."""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def prompt_hash(system_prompt=SYSTEM_PROMPT, user_prompt=USER_PROMPT):
+    """SHA-256 hex digest of the prompts, so a prompt change invalidates old entries."""
+    return hashlib.sha256(f"{system_prompt}\0{user_prompt}".encode("utf-8")).hexdigest()
+
+
+def cache_key(pdf_bytes, model, system_prompt=SYSTEM_PROMPT, user_prompt=USER_PROMPT):
+    """Build the cache key from the PDF content, the prompts and the model id."""
+    return f"{pdf_hash(pdf_bytes)}:{prompt_hash(system_prompt, user_prompt)}:{model}"
+
+
+class ExtractionCache:
+    """SQLite-backed cache with TTL expiry and size-based LRU eviction."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                " key TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_accessed ON extractions (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, commit on success and always close it."""
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    def get(self, key):
+        """Return the stored parsed JSON for key, or None on miss/expiry."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT data, created_at FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            data, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM extractions WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE extractions SET accessed_at = ? WHERE key = ?", (now, key))
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            return None
+
+    def contains(self, key):
+        """Whether get(key) would hit, without touching the entry."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT created_at FROM extractions WHERE key = ?", (key,)).fetchone()
+        return row is not None and not (self.ttl_seconds and time.time() - row[0] > self.ttl_seconds)
+
+    def put(self, key, data):
+        """Store parsed JSON under key and evict old entries if over budget."""
+        payload = json.dumps(data, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, data, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload.encode("utf-8")), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        """Drop expired rows, then least-recently-used rows until under max_bytes."""
+        if self.ttl_seconds:
+            conn.execute("DELETE FROM extractions WHERE created_at < ?", (now - self.ttl_seconds,))
+        if not self.max_bytes:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM extractions ORDER BY accessed_at ASC"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM extractions WHERE key = ?", stale)
@@ -0,0 +1,172 @@
+"""
+רובייקטיבי - Report History
+===========================
+Persistent per-member history of analysed reports, for year-over-year trends.
+Members are identified by a salted hash of member_id; one snapshot is kept per
+(member, report period, fund). Snapshots are also looked up by PDF hash, so a
+report that was analysed before does not go back to the model. The stored report
+keeps the member key in place of the member's name and id.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+
+from core.pension_core import (
+    validate_report, compute_analysis, extract_fee_rates,
+    find_report_year, report_period_end,
+)
+
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pension-bot", "history.sqlite3")
+
+# Header fields that identify the member; never written to the store
+IDENTIFYING_HEADER_FIELDS = ("member_name", "member_id")
+
+TREND_FIELDS = ("report_period", "fund_name", "period_order", "closing_balance",
+                "deposit_fee", "savings_fee", "insured_income", "track_returns")
+
+
+def member_key(member_id, salt):
+    """Salted SHA-256 of the member id digits. None if there is no id."""
+    digits = "".join(ch for ch in str(member_id or "") if ch.isdigit())
+    if not digits:
+        return None
+    return hashlib.sha256(f"{salt}\0{digits}".encode("utf-8")).hexdigest()
+
+
+def strip_identity(data, key):
+    """Copy of a report without the identifying header fields, with key as its member_key."""
+    header = {k: v for k, v in data.get("header", {}).items() if k not in IDENTIFYING_HEADER_FIELDS}
+    header["member_key"] = key
+    return {**data, "header": header}
+
+
+def period_order(header):
+    """Sortable period number: year * 100 + last month of the period. 0 if unknown."""
+    year = find_report_year(header)
+    if not year:
+        return 0
+    end_month, _, _ = report_period_end(header.get("report_period", ""))
+    return year * 100 + end_month
+
+
+class HistoryStore:
+    """SQLite store of report snapshots, indexed by member and period.
+    salt is required: an unsalted hash of a 9-digit id is easily brute-forced."""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, salt=None):
+        if not salt:
+            raise ValueError("HistoryStore needs a secret salt for member keys")
+        self.path = path
+        self.salt = salt
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                " member_key TEXT NOT NULL,"
+                " report_period TEXT NOT NULL,"
+                " fund_name TEXT NOT NULL,"
+                " period_order INTEGER NOT NULL,"
+                " pdf_sha256 TEXT,"
+                " closing_balance REAL,"
+                " deposit_fee REAL,"
+                " savings_fee REAL,"
+                " insured_income REAL,"
+                " track_returns TEXT NOT NULL,"
+                " data TEXT NOT NULL,"
+                " recorded_at REAL NOT NULL,"
+                " PRIMARY KEY (member_key, report_period, fund_name))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_member_period ON snapshots (member_key, period_order)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_pdf ON snapshots (pdf_sha256)")
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, commit on success and always close it."""
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    def member_key(self, data):
+        """Hashed member key of a report, or None if it has no member id.
+        Reports read back from the store carry their key instead of the id."""
+        header = data.get("header", {})
+        return header.get("member_key") or member_key(header.get("member_id"), self.salt)
+
+    def record(self, data, pdf_sha256=None):
+        """Store a snapshot of a valid report. Returns its member key, or None if not stored."""
+        key = self.member_key(data)
+        if key is None or not validate_report(data)[0]:
+            return None
+        header = data.get("header", {})
+        # Only profile-independent values are kept, so no user profile is needed
+        analysis = compute_analysis(data, {})
+        deposit_fee, savings_fee = extract_fee_rates(data)
+        tracks = [
+            {"track_name": t.get("track_name", ""), "return_rate": t.get("return_rate", "")}
+            for t in data.get("investment_tracks", [])
+        ]
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (member_key, report_period, fund_name, period_order, pdf_sha256,"
+                " closing_balance, deposit_fee, savings_fee, insured_income, track_returns, data, recorded_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, header.get("report_period", ""), header.get("fund_name", ""), period_order(header),
+                    pdf_sha256, analysis.get("closing_balance"), deposit_fee, savings_fee,
+                    analysis.get("insured_income"), json.dumps(tracks, ensure_ascii=False),
+                    json.dumps(strip_identity(data, key), ensure_ascii=False), time.time(),
+                ),
+            )
+        return key
+
+    def has_pdf(self, pdf_sha256):
+        """Whether a report was recorded for this PDF."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM snapshots WHERE pdf_sha256 = ? LIMIT 1", (pdf_sha256,)).fetchone()
+        return row is not None
+
+    def get_by_pdf(self, pdf_sha256):
+        """Report data previously recorded for this PDF, or None."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM snapshots WHERE pdf_sha256 = ? ORDER BY recorded_at DESC LIMIT 1", (pdf_sha256,),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except json.JSONDecodeError:
+            return None
+
+    def trend(self, key, start=None, end=None, fund_name=None):
+        """Snapshots of a member ordered by period, as dicts of TREND_FIELDS.
+        start/end are period_order bounds (inclusive), e.g. 202303 for Q1 2023."""
+        query = f"SELECT {', '.join(TREND_FIELDS)} FROM snapshots WHERE member_key = ?"
+        params = [key]
+        if start is not None:
+            query += " AND period_order >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND period_order <= ?"
+            params.append(end)
+        if fund_name is not None:
+            query += " AND fund_name = ?"
+            params.append(fund_name)
+        query += " ORDER BY period_order, fund_name"
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        points = []
+        for row in rows:
+            point = dict(zip(TREND_FIELDS, row))
+            point["track_returns"] = json.loads(point["track_returns"])
+            points.append(point)
+        return points
@@ -0,0 +1,117 @@
+"""
+רובייקטיבי - Extraction Jobs
+============================
+Bounded worker pool that runs extractions off the Streamlit script thread.
+The UI submits a job, keeps the job id in the session and polls until it lands.
+Submitting a PDF that is already being extracted returns the running job, so
+identical uploads from any session share one extraction.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_MAX_WORKERS = 4
+JOB_RETENTION_SECONDS = 15 * 60  # finished jobs are kept this long for polling
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class ExtractionJob:
+    """State of a single submitted extraction."""
+
+    def __init__(self, job_id, pdf_sha256=None):
+        self.job_id = job_id
+        self.pdf_sha256 = pdf_sha256
+        self.status = PENDING
+        self.result = None
+        self.partial = {}  # top-level sections streamed so far
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+
+class ExtractionJobQueue:
+    """Runs extract_fn(pdf_bytes, on_progress) on at most max_workers threads.
+    on_progress(sections) stores partially extracted sections on the job."""
+
+    def __init__(self, extract_fn, max_workers=DEFAULT_MAX_WORKERS):
+        self._extract_fn = extract_fn
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extraction")
+        self._jobs = {}
+        self._in_flight = {}  # PDF sha256 -> unfinished job
+        self._lock = threading.Lock()
+        self.coalesced = 0  # submissions that joined an in-flight job
+
+    def submit(self, pdf_bytes):
+        """Queue an extraction and return its job id. The id of the in-flight job
+        is returned instead if the same PDF is already queued or running."""
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        with self._lock:
+            running = self._in_flight.get(digest)
+            if running is not None:
+                self.coalesced += 1
+                return running.job_id
+            self._prune()
+            job = ExtractionJob(uuid.uuid4().hex, digest)
+            self._jobs[job.job_id] = job
+            self._in_flight[digest] = job
+        self._executor.submit(self._run, job, pdf_bytes)
+        return job.job_id
+
+    def is_in_flight(self, pdf_bytes):
+        """True if submit(pdf_bytes) would join a job that is queued or running."""
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        with self._lock:
+            return digest in self._in_flight
+
+    def get(self, job_id):
+        """Return the job for job_id, or None if unknown or expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pending_count(self):
+        """Number of jobs queued or running."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _run(self, job, pdf_bytes):
+        # Imported on first use so the UI can create the queue without loading the extraction stack
+        from core.extraction import ExtractionError
+
+        job.status = RUNNING
+        try:
+            job.result = self._extract_fn(pdf_bytes, lambda sections: setattr(job, "partial", sections))
+            status = DONE
+        except ExtractionError as e:
+            job.error = str(e)
+            status = FAILED
+        except Exception:
+            logger.exception("extraction job %s crashed", job.job_id)
+            job.error = "שגיאה בעיבוד הדוח. נסה שוב או העלה דוח אחר."
+            status = FAILED
+        with self._lock:
+            # Later submissions of this PDF start a new job (and hit the caches)
+            self._in_flight.pop(job.pdf_sha256, None)
+            job.finished_at = time.time()
+            job.status = status
+
+    def _prune(self):
+        """Forget finished jobs nobody collected. Caller holds the lock."""
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        stale = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in stale:
+            del self._jobs[job_id]
@@ -0,0 +1,182 @@
+"""
+רובייקטיבי - Incremental JSON Section Parser
+============================================
+Consumes the model's JSON output as it streams and reports each top-level
+section ("header", "movements", ...) as soon as it is complete.
+Also recovers what it can from a broken response: every complete section, and
+the complete items of an array that was cut off (e.g. by max_tokens).
+"""
+
+import json
+import re
+
+
+MEMBER_KEY_RE = re.compile(r'^\s*"((?:[^"\\]|\\.)*)"\s*:')
+MAX_REPAIR_ATTEMPTS = 64
+
+
+class SectionStreamParser:
+    """Feed text chunks; completed top-level members are collected in .sections."""
+
+    def __init__(self):
+        self.sections = {}
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+        self._opened = False
+        self.closed = False  # the top-level object has ended
+        self.failed = []  # names of members that could not be parsed
+
+    def feed(self, chunk):
+        """Consume a chunk of model output. Returns names of sections completed by it."""
+        self._text += chunk
+        completed = []
+        text = self._text
+        while self._pos < len(text):
+            ch = text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                if self._depth > 0:
+                    self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = self._pos + 1
+                    self._opened = True
+            elif ch in "}]":
+                if self._depth == 1:
+                    completed.extend(self._close_member())
+                    self.closed = True
+                self._depth = max(0, self._depth - 1)
+            elif ch == "," and self._depth == 1:
+                completed.extend(self._close_member())
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return completed
+
+    def _close_member(self):
+        """Parse the '"key": value' text between the last separator and here."""
+        if self._member_start is None:
+            return []
+        member = self._text[self._member_start:self._pos].strip()
+        self._member_start = None
+        if not member:
+            return []
+        try:
+            parsed = json.loads("{" + member + "}")
+        except json.JSONDecodeError:
+            name = member_name(member)
+            if name is not None:
+                self.failed.append(name)
+            return []
+        self.sections.update(parsed)
+        return list(parsed)
+
+    def pending(self):
+        """Text of the top-level member still being written ("" if none)."""
+        if self.closed or self._member_start is None:
+            return ""
+        return self._text[self._member_start:].strip()
+
+    @property
+    def text(self):
+        """Everything fed so far."""
+        return self._text
+
+
+# ─── Repair ───
+
+def member_name(member):
+    """Key of a '"key": value' member text, or None."""
+    match = MEMBER_KEY_RE.match(member)
+    return json.loads(f'"{match.group(1)}"') if match else None
+
+
+def strip_code_fences(text):
+    return text.replace("```json", "").replace("```", "").strip()
+
+
+def close_truncated(text):
+    """Parse the longest prefix of truncated JSON text that ends on a complete array item,
+    with its open arrays/objects closed. Objects are never cut short, so every
+    recovered item is whole. Raises ValueError if no prefix can be repaired."""
+    # Cut points where every open container but the outermost is an array:
+    # just before a ',', or just after an item or the '['
+    cuts = []
+    stack = []
+
+    def in_arrays():
+        return len(stack) > 1 and all(closer == "]" for closer in stack[1:])
+
+    in_string = escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            if ch == "[" and in_arrays():
+                cuts.append((i + 1, "".join(reversed(stack))))
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if in_arrays():
+                cuts.append((i + 1, "".join(reversed(stack))))
+        elif ch == "," and in_arrays():
+            cuts.append((i, "".join(reversed(stack))))
+    for end, closers in reversed(cuts[-MAX_REPAIR_ATTEMPTS:]):
+        try:
+            return json.loads(text[:end] + closers)
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("no repairable prefix")
+
+
+def recover_json(text):
+    """Best-effort parse of a model's JSON object answer.
+    Returns {"data", "complete", "truncated", "failed"}:
+    complete - the answer parsed as a whole (code fences and trailing text ignored);
+    truncated - the member cut off at the end (its complete items are kept in data), or None;
+    failed - members that were present but could not be parsed (left out of data).
+    Raises ValueError if nothing could be recovered."""
+    clean = strip_code_fences(text)
+    start = clean.find("{")
+    if start < 0:
+        raise ValueError("no JSON object")
+    try:
+        data, _ = json.JSONDecoder().raw_decode(clean, start)
+        if isinstance(data, dict):
+            return {"data": data, "complete": True, "truncated": None, "failed": []}
+    except json.JSONDecodeError:
+        pass
+
+    parser = SectionStreamParser()
+    parser.feed(clean[start:])
+    data = dict(parser.sections)
+    truncated = None
+    pending = parser.pending()
+    if pending:
+        truncated = member_name(pending)
+        if truncated is not None:
+            try:
+                data.update(close_truncated("{" + pending))
+            except ValueError:
+                pass
+    if not data and truncated is None:
+        raise ValueError("nothing recoverable")
+    return {"data": data, "complete": False, "truncated": truncated, "failed": list(parser.failed)}
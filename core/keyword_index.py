@@ -0,0 +1,109 @@
+"""
+רובייקטיבי - Keyword Index
+==========================
+Aho–Corasick automaton over a keyword table. Answers "which keywords (and
+which categories) occur in this string" in one pass over the string, however
+many keywords the table holds. Used for the government employer, fund and
+investment track tables in pension_core.
+"""
+
+from collections import deque
+
+
+class KeywordIndex:
+    """Compiled set of keywords, each tagged with a category.
+
+    keywords is an iterable of (keyword, category) pairs or a
+    {category: [keyword, ...]} dict. normalize (optional) is applied to
+    keywords at build time and to every searched string.
+    """
+
+    def __init__(self, keywords, normalize=None):
+        if isinstance(keywords, dict):
+            keywords = [(kw, category) for category, kws in keywords.items() for kw in kws]
+        self.normalize = normalize
+        self.category_order = {}
+        self.keywords = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._substrings = {}
+
+        for keyword, category in keywords:
+            self.category_order.setdefault(category, len(self.category_order))
+            keyword = self._norm(keyword)
+            if keyword:
+                self.keywords.append((keyword, category))
+                self._add(keyword, category)
+        self._link()
+
+    def _norm(self, text):
+        return self.normalize(text) if self.normalize else text
+
+    def _add(self, keyword, category):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((keyword, category))
+
+    def _link(self):
+        """Breadth-first construction of failure links; outputs are merged along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    # ─── Queries ───
+
+    def iter_matches(self, text):
+        """Yield (end_index, keyword, category) for every keyword occurrence in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(self._norm(text)):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for keyword, category in out[state]:
+                yield i, keyword, category
+
+    def categories(self, text):
+        """Set of categories with at least one keyword in text."""
+        return {category for _, _, category in self.iter_matches(text)}
+
+    def first_category(self, text):
+        """Matching category that was registered first, or None."""
+        found = self.categories(text)
+        return min(found, key=self.category_order.__getitem__) if found else None
+
+    def contains_any(self, text):
+        """True if any keyword occurs in text."""
+        return next(self.iter_matches(text), None) is not None
+
+    def keyword_containing(self, text):
+        """Categories of keywords that contain text (the reverse substring test).
+        The substring table is built on first use."""
+        if not self._substrings:
+            self._build_substrings()
+        return self._substrings.get(self._norm(text), set())
+
+    def _build_substrings(self):
+        substrings = {}
+        for keyword, category in self.keywords:
+            for start in range(len(keyword)):
+                for end in range(start + 1, len(keyword) + 1):
+                    substrings.setdefault(keyword[start:end], set()).add(category)
+        substrings[""] = set(self.category_order)  # "" is contained in every keyword
+        self._substrings = substrings
@@ -0,0 +1,230 @@
+"""
+רובייקטיבי - Message Templates
+==============================
+User-facing messages, compiled once at import for both genders. A message is
+written with its gendered words as {male|female} and its values as named
+str.format slots; a {name:num} slot is shown with format_number, {name:int}
+rounds first. Each template keeps a ready str.format string per gender (plain
+and with Markdown line breaks), so rendering a message is a single substitution.
+"""
+
+import re
+import string
+import sys
+
+
+FEMALE = "אשה"
+
+GENDERED_WORDS_RE = re.compile(r"\{([^{}|:]*)\|([^{}|:]*)\}")
+
+
+# ─── Formatting ───
+
+def format_number(n):
+    """Format number with Hebrew locale style, preserve negatives."""
+    if n is None or n == "":
+        return "—"
+    try:
+        num = float(n)
+        negative = num < 0
+        abs_num = abs(num)
+        if abs_num == int(abs_num):
+            formatted = f"{int(abs_num):,}"
+        else:
+            formatted = f"{abs_num:,.2f}"
+        return f"-{formatted}" if negative else formatted
+    except (ValueError, TypeError):
+        return "—"
+
+
+def g(gender, male, female):
+    """Return male or female form based on gender."""
+    return female if gender == FEMALE else male
+
+
+NUMBER_SLOTS = {
+    "num": format_number,
+    "int": lambda n: format_number(round(n)),
+}
+
+
+# ─── Templates ───
+
+class MessageTemplate:
+    """A message compiled for both genders. render() and markdown() take the slot
+    values as keyword arguments."""
+
+    __slots__ = ("source", "slots", "numeric", "_text", "_markdown")
+
+    def __init__(self, source):
+        self.source = source
+        self.slots = set()
+        self.numeric = {}  # slot name -> formatter, for the num/int slots
+        forms = []
+        for female in (False, True):
+            text = GENDERED_WORDS_RE.sub(lambda m: m.group(2 if female else 1), source)
+            forms.append(self._compile(text))
+        if not self.slots:
+            # Nothing to substitute: keep the final text, with {{ }} unescaped
+            forms = [form.replace("{{", "{").replace("}}", "}") for form in forms]
+        self._text = tuple(sys.intern(form) for form in forms)
+        self._markdown = tuple(sys.intern(form.replace("\n", "  \n")) for form in forms)
+
+    def _compile(self, text):
+        """text as a str.format string, with the num/int specs taken out into self.numeric."""
+        pieces = []
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            pieces.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            self.slots.add(field)
+            if spec in NUMBER_SLOTS:
+                self.numeric[field] = NUMBER_SLOTS[spec]
+                spec = ""
+            pieces.append("{" + field + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}")
+        return "".join(pieces)
+
+    def _fill(self, form, slots):
+        for name, formatter in self.numeric.items():
+            slots[name] = formatter(slots[name])
+        # slots is render()'s own kwargs dict, so it can be filled in place
+        return form.format_map(slots)
+
+    def render(self, gender=None, **slots):
+        """The message for gender (None: the male form)."""
+        form = self._text[gender == FEMALE]
+        return self._fill(form, slots) if self.slots else form
+
+    def markdown(self, gender=None, **slots):
+        """render() with Markdown line breaks ("  \\n")."""
+        form = self._markdown[gender == FEMALE]
+        return self._fill(form, slots) if self.slots else form
+
+
+_TEMPLATES = {}
+
+
+def message(source):
+    """The compiled template of source. Every distinct text is compiled once and shared."""
+    template = _TEMPLATES.get(source)
+    if template is None:
+        template = _TEMPLATES[source] = MessageTemplate(source)
+    return template
+
+
+# ─── Insurance Checks ───
+# Keyed by the message key of the insurance rules (pension_core.INSURANCE_RULES)
+
+INSURANCE_MESSAGES = {
+    "inactive_fund": message("{שים|שימי} לב קרן הפנסיה שלך איננה פעילה. הכסף שצברת ממשיך לצבור תשואה אך אין לך כיסויים ביטוחיים. אם יש לך קרן פנסיה נוספת {שקול|שיקלי} לאחד אותן. החברה המנהלת רשאית לגבות את דמי ניהול מקסימליים מקרן פנסיה לא פעילה."),
+    "inactive_selected_fund": message("""{שים|שימי} לב קרן הפנסיה שלך איננה פעילה. הכסף שצברת ממשיך לצבור תשואה אך אין לך כיסויים ביטוחיים. אם יש לך קרן פנסיה נוספת {שקול|שיקלי} לאחד אותן. במידה והצטרפת לקרן כ"קרן נבחרת" דמי הניהול לא יועלו עד 10 שנים מההצטרפות."""),
+    "no_survivors_married": message("""{שים|שימי} לב, אין לך כיסוי שארים. עליך לעדכן את קרן הפנסיה ש{אתה נשוי|את נשואה} בכדי שיפעילו את כיסוי השארים."""),
+    "survivors_waived": message("""וויתרת על ביטוח שארים וכך הגדלת את הפנסיה העתידית שלך.
+הוויתור תקף לשנתיים.
+אם מצבך המשפחתי השתנה {זכור|זכרי} לעדכן את הקרן.
+כל עוד הוא לא משתנה כדאי לחדש את הוויתור על כיסוי השארים לפני תום השנתיים."""),
+    "survivors_waived_uninsurable": message("""{שים|שימי} לב {אתה|את} {נמצא|נמצאת} בוויתור על שארים אבל אם {תרצה|תרצי} לעשות ביטוח שארים {תצטרך|תצטרכי} להתחיל מחדש את תקופת האכשרה.
+מומלץ לפנות לקרן הפנסיה כבר עכשיו ולבקש לרכוש ברות ביטוח."""),
+    "survivors_without_dependents": message("""{שים|שימי} לב – {לחוסך שאין לו|לחוסכת שאין לה} בן/ת זוג ולא ילדים אין טעם לשלם ביטוח שארים.
+בדוח רואים ששילמת ₪{death_cost:num} על ביטוח שארים שהוא מיותר לגמרי עבורך (זה ממש כסף שהולך לפח).{cost_note}
+
+מומלץ לפנות לקרן ולבקש לוותר על ביטוח שארים.
+הוויתור יהיה תקף לשנתיים, ו{תוכל|תוכלי} לחדש אותו במידה ומצבך המשפחתי לא ישתנה.
+במידה ומצבך המשפחתי ישתנה בתוך שנתיים אלו, {פנה|פני} אל הקרן {וחדש|וחדשי} את ביטוח השארים.
+זה לא ידרוש הצהרת בריאות ולא תקופת אכשרה חדשה."""),
+    # death_cost is 0 but orphan > 0 — can't determine actual cost
+    "survivors_without_dependents_no_cost": message("""{שים|שימי} לב – {לחוסך שאין לו|לחוסכת שאין לה} בן/ת זוג ולא ילדים אין טעם לשלם ביטוח שארים.
+מומלץ לפנות לקרן ולבקש לוותר על ביטוח שארים. כך {תגדיל|תגדילי} את הפנסיה העתידית שלך.
+הוויתור יהיה תקף לשנתיים, ו{תוכל|תוכלי} לחדש אותו במידה ומצבך המשפחתי לא ישתנה.
+במידה ומצבך המשפחתי ישתנה בתוך שנתיים אלו, {פנה|פני} אל הקרן {וחדש|וחדשי} את ביטוח השארים.
+זה לא ידרוש הצהרת בריאות ולא תקופת אכשרה חדשה."""),
+    "spouse_cover_without_spouse": message("""{שים|שימי} לב {אתה|את} {משלם|משלמת} ביטוח שארים על בן/ת זוג וזה מיותר לגמרי עבורך (זה ממש כסף שהולך לפח).
+אם {תפנה|תפני} אל קרן הפנסיה {ותבקש|ותבקשי} לוותר על ביטוח השארים לבן/ת זוג {תגדיל|תגדילי} את הפנסיה העתידית שלך.
+הוויתור יהיה תקף לשנתיים, ו{תוכל|תוכלי} לחדש אותו במידה ומצבך המשפחתי לא ישתנה.
+במידה ומצבך המשפחתי ישתנה בתוך שנתיים אלו, {פנה|פני} אל הקרן {וחדש|וחדשי} את ביטוח השארים.
+זה לא ידרוש הצהרת בריאות ולא תקופת אכשרה חדשה."""),
+    "not_default_plan": message("{שים|שימי} לב – מסלול הביטוח שבו {אתה|את} {נמצא|נמצאת} ככל הנראה איננו מסלול הביטוח עם הכיסוי המקסימלי. מומלץ לוודא שגובה הכיסויים לסיכוני הנכות והשארים מספיקים.\nמומלץ להיעזר באיש מקצוע אובייקטיבי שאין לו אינטרס למכור לכם ביטוחים – כלומר ביועץ פנסיוני."),
+}
+SURVIVORS_ANNUAL_COST_NOTE = message(" (במונחים שנתיים: ₪{annual_cost:num})")
+
+INSURED_INCOME_LINE = message("**הכנסה מבוטחת:** ₪{income:,} &nbsp;|&nbsp; **שיעור הפקדה:** {rate}%{rate_note}")
+DISABILITY_PENSION_INFO = message("במקרה של נכות של 75% ומעלה הקרן תשלם קצבה חודשית של **₪{disability:num}**.")
+MAXIMUM_COVERAGE = message("""מהדוח נראה ש{אתה|את} {נמצא|נמצאת} במסלול ביטוח עם כיסויים מקסימליים.
+
+הקרן מבטיחה {לאשתך|לבעלך} קצבה חודשית של **₪{spouse:num}** לכל החיים אם ח"ו יקרה לך משהו.
+בנוסף הקרן תשלם **₪{orphan:num}** בכל חודש עד שהילד הקטן יגיע לגיל 21, ובסך הכל **₪{total:num}**.
+
+במקרה של נכות של 75% ומעלה הקרן תשלם קצבה חודשית של **₪{disability:num}**.""")
+
+
+# ─── Fee Analysis ───
+
+CURRENT_FEES = message("""
+**דמי הניהול שלך:** {deposit_fee}% מהפקדה + {savings_fee}% מצבירה
+**עלות שנתית צפויה:** ₪{current_fee:int}
+""")
+CHEAPER_FUND = message("""💡 בקרן הפנסיה של **{fund_names}** {תוכל|תוכלי} לקבל דמי ניהול של {deposit_fee}% מהפקדה + {savings_fee}% מצבירה.
+{תוכל|תוכלי} לחסוך בשנה הבאה בערך **₪{saving:int}**.""")
+CHEAPER_FUND_AND_ADVISOR = message("""💡 בקרן הפנסיה של **{fund_names}** {תוכל|תוכלי} לקבל דמי ניהול של {deposit_fee}% מהפקדה + {savings_fee}% מצבירה.
+{תוכל|תוכלי} לחסוך בשנה הבאה בערך **₪{saving:int}**.
+
+יועץ פנסיוני יוכל להשיג לך דמי ניהול של 1% על ההפקדה ו-0.145% מהצבירה.
+כך {תחסוך|תחסכי} בשנה הבאה בערך **₪{advisor_saving:int}**.""")
+CHEAPER_ADVISOR = message("💡 יועץ פנסיוני יוכל להשיג לך דמי ניהול של 1% על ההפקדה ו-0.145% מהצבירה. כך {תחסוך|תחסכי} בשנה הבאה בערך **₪{advisor_saving:int}**.")
+ALTSHULER_RETURNS = message("⚠️ יחד עם זאת {קח|קחי} בחשבון שהתשואות של אלטשולר בלטו לרעה בשנים האחרונות.")
+MENORAH_ACTUARIAL_DEFICIT = message("""⚠️ {שים|שימי} לב, בדוח מופיע שהורידו לך **₪{actuarial_cost:int}** בתקופת הדוח בגלל הגרעון האקטוארי של הקרן.
+קרן הפנסיה של מנורה היא באופן כמעט עקבי עם האיזון האקטוארי הגרוע ביותר מה שגורע מהצבירה הפנסיונית שלך.
+ב-5 השנים האחרונות הגרעון הממוצע של הקרן היה 0.19% בשעה שיש קרנות שהחזירו כסף לחוסכים אצלם!
+ההשפעה של גרעון אקטוארי שקולה להשפעה של דמי ניהול מצבירה.
+{שקול|שיקלי} לעבור לקרן פנסיה אחרת ובפרט קרנות שהציגו איזון אקטוארי חיובי, גם אם דמי הניהול יהיו מעט יותר גבוהים.""")
+
+
+# ─── Deposits ───
+
+DEPOSIT_AVERAGE = message("**{avg_label}:** ₪{average:int} &nbsp;|&nbsp; **חודשים עם הפקדות בשנת {report_year}:** {months_with_deposits}/{months}")
+MISSING_SELF_DEPOSITS = message("⚠️ לא נמצאו הפקדות עבור חודשים: {months}. {וודא|וודאי} שלא ביצעת הפקדות נוספות שלא נקלטו בחשבונך בקרן.")
+MISSING_EMPLOYER_DEPOSITS = message("⚠️ לא נמצאו הפקדות עבור חודשים: {months}. יש לוודא שהמעסיק הפקיד את כל ההפקדות.")
+LAST_MONTH_NOTE = message('<div style="background:#dbeafe;border-radius:8px;padding:14px 18px;color:#1e40af;font-size:1.1rem;direction:rtl;text-align:right;margin-top:8px;"><span style="color:#ef4444;font-weight:bold;font-size:1.4rem;">*</span> ההפקדה בגין חודש {month_name} בדרך כלל מתבצעת אחרי סוף {period_label} ולכן לא מופיעה בדוח זה.</div>')
+LOW_DEPOSIT_RATE = message("""⚠️ {שים|שימי} לב, שיעור ההפקדות מתוך השכר נראה נמוך מהמינימום לפי חוק (6% תגמולי עובד + 6.5% תגמולי מעסיק + 6% פיצויים).
+ייתכן שמופקד לך לפנסיה גם על החזרי הוצאות (במקרה זה מקובל להפקיד רק 5% עובד ו-5% מעסיק). אחרת {בדוק|בדקי} מה הסיבה לכך.""")
+EXCESS_SELF_DEPOSIT = message("""⚠️ {אתה מפקיד|את מפקידה} סכום שהוא מעבר לסכום שמקנה לך הטבות מס.
+ייתכן מאוד שכדאי להתייעץ האם נכון יותר עבורך להפנות חלק מההפקדה לכלים פיננסיים אחרים שבהם {אינך מוותר|אינך מוותרת} על הנזילות של הכסף.""")
+
+
+# ─── Investment Tracks ───
+
+EQUITY_RECOMMENDATION = message("""💡 בהתחשב בטווח השנים שנותר לך עד לפרישה אני ממליץ {שתבחר|שתבחרי} במסלול או במסלולים מנייתיים בלבד.
+ב-5 השנים האחרונות המסלולים המנייתיים הניבו תשואה עודפת של כ-1.25% ביחס למסלולי 'בני 50 ומטה' (ופער גדול יותר מול יתר המסלולים).
+הקצבה מהכספים שצברת עד סוף תקופת הדוח היא **₪{pension_at_67:num}**.
+אם {תשפר|תשפרי} את התשואה ב-1.25% הקצבה על אותם כספים תגדל ל-**₪{improved_pension:num}**.
+כמובן שהפער יהיה גדול יותר כי התשואה העודפת תהיה גם על הכספים שיופקדו לקרן בעתיד.""")
+SPLIT_TRACKS_SELF_EMPLOYED = message("""ℹ️ הכסף שלך מפוצל בין מסלול מנייתי לבין מסלול שאיננו מנייתי ({tracks}).
+סביר להניח שבמסלול הלא מנייתי נמצאים כספי פיצויים.
+{בדוק|בדקי} עם הקרן מה צריך לעשות בכדי להעביר אותם למסלול ההשקעה שבחרת.""")
+SPLIT_TRACKS_EMPLOYEE = message("""ℹ️ הכסף שלך מפוצל בין מסלול מנייתי לבין מסלול שאיננו מנייתי ({tracks}).
+סביר להניח שבמסלול הלא מנייתי נמצאים כספי הפיצויים שלך המהווים כ-30%-40% מהפנסיה שלך.
+בכדי להעביר גם אותם למסלול מנייתי יש צורך באישור של המעסיק.""")
+SP500_CONCENTRATION = message("""⚠️ {אתה מושקע|את מושקעת} במדד S&P 500. מדד זה סובל היום מריכוזיות גבוהה.
+המשקל של 9 החברות הגדולות הכלולות בו הוא כ-40% מה שמגדיל את הסיכון הכרוך בהשקעה בו.
+בנוסף התימחור של המניות הכלולות בו משקף מידה רבה של אופטימיות שאם היא תתברר כמוגזמת התשואה שהמדד יניב תהיה נמוכה.
+מעבר לכך אין לך חשיפה למניות של חברות מוצלחות מיתר העולם.""")
+MADEDEI_CONCENTRATION = message("""⚠️ בפנסיה אנחנו צריכים לנהוג בזהירות. מסלול מדדי מניות הוא מסלול עם רמת ריכוז גבוהה מאוד וממילא סיכון גבוה.
+המניות הכלולות בו אמנם הניבו תשואה חריגה בעבר אבל זה כרוך בסיכון שלגמרי לא בטוח שמתאים לכספי פנסיה.""")
+HALACHA_TRACK = message("""⚠️ במסלול ההלכה בקרן בה {אתה נמצא|את נמצאת} החשיפה למניות איננה מקסימלית.
+הצפי הוא שהתשואה שלך תהיה נמוכה יותר בגלל זה.
+{שקול|שיקלי} לעבור למסלול מותאם להלכה שיש בו חשיפה מנייתית מקסימלית בכדי לשפר את הפנסיה שלך.""")
+
+
+# ─── Portfolio ───
+
+PORTFOLIO_DUPLICATE_INSURANCE = message("""⚠️ יש לך כיסוי ביטוחי ביותר מקרן אחת ({funds}).
+הכיסוי לנכות ולשארים משולם לפי ההכנסה המבוטחת ולכן כיסוי כפול לרוב לא מגדיל את הקצבה אלא רק את העלות.
+{שקול|שיקלי} לאחד את הקרנות או לוודא שרק באחת מהן יש כיסוי ביטוחי.""")
+PORTFOLIO_CONSOLIDATION = message("""💡 אם {תאחד|תאחדי} את כל הכספים לקרן אחת, בקרן הפנסיה של **{fund_names}** {תוכל|תוכלי} לקבל דמי ניהול של {deposit_fee}% מהפקדה + {savings_fee}% מצבירה – עלות שנתית של כ-**₪{fund_fee:int}**.
+יועץ פנסיוני יוכל להשיג לך דמי ניהול של 1% על ההפקדה ו-0.145% מהצבירה – עלות שנתית של כ-**₪{advisor_fee:int}**.""")
+PORTFOLIO_CONSOLIDATION_SAVING = message("\nבסך הכל {תוכל|תוכלי} לחסוך בשנה הבאה עד כ-**₪{saving:int}**.")
+
+
+# ─── Government Employees ───
+
+GOV_ADVISORY_SUBSIDY = message('<div style="background:#f0fdf4;border-radius:8px;padding:14px 18px;color:#166534;font-size:1.1rem;direction:rtl;text-align:right;">💡 החשב הכללי מעודד את עובדי המדינה לקחת ייעוץ פנסיוני אובייקטיבי. לשם כך הוא נותן סבסוד של 600 ש"ח לעובד מדינה שלוקח ייעוץ. {קח|קחי} ייעוץ פנסיוני {ונצל|ונצלי} את ההטבה הזו. <a href="{url}" target="_blank">לצפייה בחוזר החשב הכללי {לחץ|לחצי} כאן</a>.</div>')
@@ -0,0 +1,105 @@
+"""
+רובייקטיבי - Model Tiering
+==========================
+Extracts a report with a faster, cheaper model first and escalates to the next
+(stronger) model only when the answer fails validate_report or the numeric
+consistency checks. Attempts, acceptances and escalation reasons are counted
+per model so the tier order can be tuned for latency and cost.
+"""
+
+import logging
+import threading
+
+from core.extraction import call_anthropic, ExtractionError, EXTRACTION_MODEL
+from core.pension_core import (
+    validate_report, deposit_row_problems, deposits_total_problem, movements_balance_problem,
+)
+from core.tracing import span
+
+
+# Cheapest first; the last model's answer is accepted even if it fails the checks.
+# Tiering is off until EXTRACTION_MODELS is set, e.g. "claude-haiku-4-5,<EXTRACTION_MODEL>".
+DEFAULT_MODEL_TIERS = (EXTRACTION_MODEL,)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_model_tiers(value):
+    """Model list from a comma-separated setting; DEFAULT_MODEL_TIERS if empty."""
+    models = [m.strip() for m in str(value or "").split(",") if m.strip()]
+    return tuple(models) or DEFAULT_MODEL_TIERS
+
+
+def report_problems(data):
+    """[(check, description)] of every failed check; empty when the report is acceptable."""
+    is_valid, error = validate_report(data)
+    if not is_valid:
+        return [("validate_report", error)]
+    problems = [("deposit_rows", p) for p in deposit_row_problems(data)]
+    for check, find_problem in (("deposits_total", deposits_total_problem),
+                                ("movements_balance", movements_balance_problem)):
+        problem = find_problem(data)
+        if problem:
+            problems.append((check, problem))
+    return problems
+
+
+class ModelRouter:
+    """Try each model in order until one's answer passes report_problems."""
+
+    def __init__(self, models=DEFAULT_MODEL_TIERS):
+        if not models:
+            raise ValueError("at least one model is required")
+        self.models = tuple(models)
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def _incr(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+
+    def extract(self, pdf_bytes, api_key, cache=None, client_settings=None, **kwargs):
+        """call_anthropic through the tiers. Extra kwargs are passed to call_anthropic.
+        Raises ExtractionError if the last model fails."""
+        self._incr("reports")
+        for tier, model in enumerate(self.models):
+            last = tier == len(self.models) - 1
+            self._incr(f"{model}/attempts")
+            with span("model_tier", model=model, tier=tier) as attrs:
+                try:
+                    data = call_anthropic(pdf_bytes, api_key, model=model, cache=cache, client_settings=client_settings, **kwargs)
+                except ExtractionError:
+                    attrs["outcome"] = "error"
+                    self._incr(f"{model}/errors")
+                    if last:
+                        raise
+                    self._escalate(model, ["extraction_error"])
+                    continue
+                problems = report_problems(data)
+                if not problems or last:
+                    attrs["outcome"] = "accepted"
+                    self._incr(f"{model}/accepted")
+                    if problems:
+                        self._incr(f"{model}/accepted_with_problems")
+                    return data
+                attrs["outcome"] = "escalated"
+                logger.info("escalating from %s: %s", model, "; ".join(p for _, p in problems))
+                self._escalate(model, sorted({check for check, _ in problems}))
+
+    def _escalate(self, model, checks):
+        self._incr("escalations")
+        self._incr(f"{model}/escalated")
+        for check in checks:
+            self._incr(f"escalation_reason/{check}")
+
+    def stats(self):
+        """Counters plus the escalation rate of each model and overall."""
+        with self._lock:
+            stats = dict(self._counters)
+        for model in self.models:
+            attempts = stats.get(f"{model}/attempts", 0)
+            if attempts:
+                stats[f"{model}/escalation_rate"] = stats.get(f"{model}/escalated", 0) / attempts
+        if stats.get("reports"):
+            stats["escalations_per_report"] = stats.get("escalations", 0) / stats["reports"]
+        return stats
@@ -0,0 +1,150 @@
+"""
+רובייקטיבי - PDF Pre-processing
+===============================
+Opens the report with PyMuPDF, reads the text layer and keeps only the pages that
+hold Tables A–E, so fewer input tokens are sent to the model.
+Falls back to the full document when there is no usable text layer.
+"""
+
+import logging
+import re
+
+import fitz
+
+
+# Headings of the condensed report tables (מבנה אחיד), as they appear in the text layer
+TABLE_MARKERS = {
+    "A": ["תשלומים צפויים", "קצבה חודשית הצפויה"],
+    "B": ["תנועות בקרן", "יתרת הכספים בקרן"],
+    "C": ["דמי ניהול", "הוצאות ניהול"],
+    "D": ["מסלולי השקעה", "מסלול השקעה"],
+    "E": ["פירוט הפקדות", "הפקדות שהופקדו"],
+}
+MIN_TEXT_CHARS = 200  # below this the PDF is treated as scanned (no text layer)
+SALARY_MONTH_RE = re.compile(r"\b(0?[1-9]|1[0-2])[/.](20)?\d{2}\b")
+MIN_CONTINUATION_ROWS = 3  # salary-month matches that mark a deposits continuation page
+DEPOSIT_PAGES_PER_PART = 2  # deposits pages per request in section-parallel extraction
+SUMMARY_TABLES = ("A", "B", "C", "D")
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text):
+    """Collapse whitespace so markers match across line breaks."""
+    return re.sub(r"\s+", " ", text)
+
+
+def _has_marker(page_text, markers):
+    # Some PDFs store Hebrew in visual order, so also look for the reversed marker
+    return any(m in page_text or m[::-1] in page_text for m in markers)
+
+
+def detect_table_pages(page_texts):
+    """Map each table letter (A–E) to the list of page indexes where it appears."""
+    found = {}
+    for idx, text in enumerate(page_texts):
+        norm = _normalize(text)
+        for table, markers in TABLE_MARKERS.items():
+            if _has_marker(norm, markers):
+                found.setdefault(table, []).append(idx)
+    return found
+
+
+def deposit_pages(page_texts, table_pages):
+    """Pages of Table E, including continuation pages that don't repeat its heading."""
+    if "E" not in table_pages:
+        return []
+    pages = set(table_pages["E"])
+    for idx in range(max(table_pages["E"]) + 1, len(page_texts)):
+        if len(SALARY_MONTH_RE.findall(page_texts[idx])) < MIN_CONTINUATION_ROWS:
+            break
+        pages.add(idx)
+    return sorted(pages)
+
+
+def select_pages(page_texts, table_pages):
+    """Pages to send: the first page, every page with a table, plus deposit-table
+    continuation pages."""
+    # The header and report keywords are near the top, before Table A
+    pages = {0}
+    for indexes in table_pages.values():
+        pages.update(indexes)
+    pages.update(deposit_pages(page_texts, table_pages))
+    return sorted(pages)
+
+
+def page_subset(doc, pages):
+    """PDF bytes holding only the given pages of an open document."""
+    subset = fitz.open()
+    with subset:
+        for idx in pages:
+            subset.insert_pdf(doc, from_page=idx, to_page=idx)
+        return subset.tobytes(garbage=3, deflate=True)
+
+
+def preprocess_pdf(pdf_bytes):
+    """Return dict with the bytes to send, kept page indexes, text layer and a full_document flag."""
+    full = {"pdf_bytes": pdf_bytes, "pages": None, "text": "", "full_document": True}
+    try:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    except Exception:
+        logger.warning("PyMuPDF could not open the PDF, sending full document")
+        return full
+
+    with doc:
+        page_texts = [page.get_text() for page in doc]
+        text = "\n".join(page_texts)
+        full["text"] = text
+        if len(text.strip()) < MIN_TEXT_CHARS:
+            return full
+
+        table_pages = detect_table_pages(page_texts)
+        if set(table_pages) != set(TABLE_MARKERS):
+            # A table we can't see in the text layer may be an image - don't risk dropping it
+            return full
+
+        pages = select_pages(page_texts, table_pages)
+        if len(pages) == doc.page_count:
+            full["pages"] = pages
+            return full
+
+        subset_bytes = page_subset(doc, pages)
+
+    logger.info("sending pages %s of %d", pages, len(page_texts))
+    return {"pdf_bytes": subset_bytes, "pages": pages, "text": text, "full_document": False}
+
+
+def split_report_pages(pdf_bytes, deposit_pages_per_part=DEPOSIT_PAGES_PER_PART):
+    """Split a report for section-parallel extraction.
+    Returns {"summary": bytes of page 1 and the Table A–D pages,
+             "deposits": [bytes of each run of deposit_pages_per_part Table E pages],
+             "all_deposits": bytes of the pages from the first Table E page to the end}
+    or None when the text layer does not show every table."""
+    try:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    except Exception:
+        logger.warning("PyMuPDF could not open the PDF, not splitting it")
+        return None
+
+    with doc:
+        page_texts = [page.get_text() for page in doc]
+        if len("".join(page_texts).strip()) < MIN_TEXT_CHARS:
+            return None
+        table_pages = detect_table_pages(page_texts)
+        if set(table_pages) != set(TABLE_MARKERS):
+            return None
+
+        # The header (member, fund, period) is on the first page
+        summary = {0}
+        for table in SUMMARY_TABLES:
+            summary.update(table_pages[table])
+        deposits = deposit_pages(page_texts, table_pages)
+        runs = [deposits[i:i + deposit_pages_per_part] for i in range(0, len(deposits), deposit_pages_per_part)]
+        split = {
+            "summary": page_subset(doc, sorted(summary)),
+            "deposits": [page_subset(doc, run) for run in runs],
+            # Up to the last page, in case the totals row is on a page not detected as Table E
+            "all_deposits": page_subset(doc, list(range(deposits[0], doc.page_count)) if deposits else []),
+        }
+    logger.info("split report into summary pages %s and deposit pages %s", sorted(summary), runs)
+    return split
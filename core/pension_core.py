@@ -4,9 +4,19 @@
 Shared logic between streamlit-app/app.py and whatsapp-bot/main.py.
 """
 
+import ast
+import functools
 import math
+import re
 from datetime import datetime, date
 
+import numpy as np
+
+from core.deposit_frame import build_deposit_frame
+from core.keyword_index import KeywordIndex
+from core.messages import format_number, g, INSURANCE_MESSAGES, SURVIVORS_ANNUAL_COST_NOTE
+from core.tracing import traced
+
 
 # ─── System Prompt ───
 SYSTEM_PROMPT = """You are an expert at extracting structured data from Israeli pension fund reports (דוחות פנסיה).
@@ -86,28 +96,6 @@ USER_PROMPT = "Extract all data from this Israeli pension report into the JSON s
 
 # ─── Helper Functions ───
 
-def format_number(n):
-    """Format number with Hebrew locale style, preserve negatives."""
-    if n is None or n == "":
-        return "—"
-    try:
-        num = float(n)
-        negative = num < 0
-        abs_num = abs(num)
-        if abs_num == int(abs_num):
-            formatted = f"{int(abs_num):,}"
-        else:
-            formatted = f"{abs_num:,.2f}"
-        return f"-{formatted}" if negative else formatted
-    except (ValueError, TypeError):
-        return "—"
-
-
-def g(gender, male, female):
-    """Return male or female form based on gender."""
-    return female if gender == "אשה" else male
-
-
 def get_payment_value(payments, keyword):
     """Find a payment amount by matching Hebrew keyword in the label."""
     for p in payments:
@@ -126,33 +114,15 @@ def get_movement_value(movements, keyword):
 
 # ─── Report Validation ───
 
-def detect_deposit_source(data):
+def detect_deposit_source(data, frame=None):
     """Auto-detect if deposits are from employee, self-employed, or both.
     Returns: 'שכיר', 'עצמאי', or 'שכיר + עצמאי'"""
-    deposits = data.get("deposits", []) + data.get("late_deposits", [])
-    if not deposits:
-        return "שכיר"  # default
-
-    has_employer = False
-    has_self = False
-
-    for dep in deposits:
-        employer_contrib = dep.get("employer_contribution", 0) or 0
-        employee_contrib = dep.get("employee_contribution", 0) or 0
-        if employer_contrib != 0:
-            has_employer = True
-        elif employee_contrib != 0:
-            # Has employee contribution but no employer contribution = עצמאי
-            has_self = True
-
-    if has_employer and has_self:
-        return "שכיר + עצמאי"
-    elif has_self:
-        return "עצמאי"
-    else:
-        return "שכיר"
+    if frame is None:
+        frame = build_deposit_frame(data)
+    return frame.deposit_source()
 
 
+@traced()
 def validate_report(data):
     """Validate that this is a condensed comprehensive pension fund report.
     Returns (is_valid, error_message) tuple."""
@@ -190,12 +160,68 @@ def validate_report(data):
     return True, ""
 
 
+@traced()
+def check_report_consistency(data, tolerance=2):
+    """Cross-check extracted numbers against each other.
+    Returns a list of problem descriptions (empty when consistent)."""
+    problems = deposit_row_problems(data, tolerance)
+    for check in (deposits_total_problem, movements_balance_problem):
+        problem = check(data, tolerance)
+        if problem:
+            problems.append(problem)
+    return problems
+
+
+def deposit_row_problems(data, tolerance=2):
+    """Deposit rows whose contributions don't add up to their total."""
+    problems = []
+    for i, dep in enumerate(data.get("deposits", [])):
+        parts = sum((dep.get(k) or 0) for k in ("employee_contribution", "employer_contribution", "severance"))
+        total = dep.get("total") or 0
+        if abs(parts - total) > tolerance:
+            problems.append(f"deposit row {i}: contributions {parts} != total {total}")
+    return problems
+
+
+def deposits_total_problem(data, tolerance=2):
+    """Description of a mismatch between deposits_total and the sum of deposit rows, or None."""
+    deposits = data.get("deposits", [])
+    deposits_total = data.get("deposits_total") or {}
+    if deposits and deposits_total.get("total") is not None:
+        rows_sum = sum((dep.get("total") or 0) for dep in deposits)
+        if abs(rows_sum - deposits_total["total"]) > tolerance * max(1, len(deposits)):
+            return f"deposits_total {deposits_total['total']} != sum of rows {rows_sum}"
+    return None
+
+
+def movements_balance_problem(data, tolerance=2):
+    """Description of Table B not adding up (opening balance + flows != closing balance), or None.
+    Only checked when the first and last rows are balances (יתרת הכספים...)."""
+    movements = data.get("movements", [])
+    if len(movements) < 3:
+        return None
+    first, last = movements[0], movements[-1]
+    if "יתר" not in first.get("label", "") or "יתר" not in last.get("label", ""):
+        return None
+    amounts = [m.get("amount") for m in movements]
+    if any(not isinstance(a, (int, float)) for a in amounts):
+        return None
+    expected = sum(amounts[:-1])
+    if abs(expected - amounts[-1]) > tolerance * len(movements):
+        return f"opening balance + movements {expected} != closing balance {amounts[-1]}"
+    return None
+
+
 # ─── Analysis Engine ───
 
-def compute_analysis(data, user_profile):
-    """Compute all analysis values from pension data."""
+@traced()
+def compute_analysis(data, user_profile, frame=None):
+    """Compute all analysis values from pension data.
+    frame: build_deposit_frame(data), if already built."""
 
     analysis = {}
+    if frame is None:
+        frame = build_deposit_frame(data)
 
     payments = data.get("expected_payments", [])
     movements = data.get("movements", [])
@@ -214,9 +240,8 @@ def compute_analysis(data, user_profile):
     death_insurance_cost = get_movement_value(movements, "מוות") or get_movement_value(movements, "שאירים")
 
     # ── Extract from Table E totals ──
-    all_deps = data.get("deposits", []) + data.get("late_deposits", [])
-    computed_salary = sum(d.get("salary", 0) or 0 for d in all_deps)
-    computed_deposits = sum(d.get("total", 0) or 0 for d in all_deps)
+    computed_salary = frame.total("salary")
+    computed_deposits = frame.total("total")
 
     total_deposits = deposits_total.get("total", 0) or computed_deposits or 0
     total_salary = computed_salary if computed_salary > 0 else (deposits_total.get("salary", 0) or 0)
@@ -235,7 +260,7 @@ def compute_analysis(data, user_profile):
     analysis["report_period"] = header.get("report_period", "")
 
     # ── Detect deposit source ──
-    analysis["deposit_source"] = detect_deposit_source(data)
+    analysis["deposit_source"] = detect_deposit_source(data, frame)
 
     # ── 1. Age Estimate (NPER) ──
     if pension_at_67 and closing_balance and pension_at_67 > 0 and closing_balance > 0:
@@ -270,23 +295,13 @@ def compute_analysis(data, user_profile):
     # ── 2. Insured Income ──
     analysis["can_calc_income"] = False
     deposit_source = analysis.get("deposit_source", "שכיר")
-    all_deps = data.get("deposits", []) + data.get("late_deposits", [])
 
     if deposit_source == "שכיר":
         if premium_waiver and premium_waiver > 0:
             insured_deposit = premium_waiver / 0.94
-            row_rates = []
-            for d in all_deps:
-                sal = d.get("salary", 0) or 0
-                tot = d.get("total", 0) or 0
-                if sal > 500 and tot > 50:
-                    r = tot / sal
-                    if 0.10 < r < 0.30:
-                        row_rates.append(r)
-            if row_rates:
-                row_rates.sort()
-                mid = len(row_rates) // 2
-                deposit_rate = row_rates[mid] if len(row_rates) % 2 == 1 else (row_rates[mid - 1] + row_rates[mid]) / 2
+            # Median of the per-row total/salary rates that look like a pension deposit
+            deposit_rate = frame.median_deposit_rate()
+            if deposit_rate is not None:
                 insured_income = insured_deposit / deposit_rate
                 analysis["insured_income"] = round(insured_income)
                 analysis["insured_deposit"] = round(insured_deposit)
@@ -315,146 +330,423 @@ def compute_analysis(data, user_profile):
 
 
 # ─── Insurance Checks ───
+# Each check is a row of INSURANCE_RULES: a predicate over the features of a report,
+# a severity icon and a message key (core.messages.INSURANCE_MESSAGES). Predicates are
+# Python expressions, compiled once into one function for a single report and into
+# NumPy expressions for a batch.
+
+NON_SELECTED_FUNDS = ("מנורה", "הראל", "הפניקס", "כלל", "מקפת")
+SELECTED_FUNDS = ("מיטב", "אלטשולר", "מור", "אינפיניטי")
+NON_SELECTED_FUND_RE = re.compile("|".join(map(re.escape, NON_SELECTED_FUNDS)))
+SELECTED_FUND_RE = re.compile("|".join(map(re.escape, SELECTED_FUNDS)))
+
+# Quarter wording -> yearly survivors cost; Q4 and annual reports already are yearly
+QUARTER_ANNUAL_COST = (
+    (("רבעון 1", "רבעון ראשון"), lambda cost: cost * 4),
+    (("רבעון 2", "רבעון שני"), lambda cost: cost * 2),
+    (("רבעון 3", "רבעון שלישי"), lambda cost: round(cost * 4 / 3)),
+)
+
+
+@functools.lru_cache(maxsize=256)
+def fund_activity_flags(fund_name):
+    """(non-selected fund, selected fund) by fund name, for the settled pension checks."""
+    return NON_SELECTED_FUND_RE.search(fund_name) is not None, SELECTED_FUND_RE.search(fund_name) is not None
+
+
+@functools.lru_cache(maxsize=64)
+def profile_flags(gender, marital, has_kids):
+    """(message gender, male, married, no dependents, single parent) of a user profile."""
+    divorced_or_widowed = marital == "גרוש/ה" or marital == "אלמן/ה"
+    return (
+        "אשה" if gender == "אשה" else "גבר",
+        gender == "גבר",
+        marital == "נשוי/אה",
+        marital == "רווק/ה" or (divorced_or_widowed and not has_kids),
+        divorced_or_widowed and has_kids,
+    )
+
+
+PROFILE_FEATURES = ("gender", "male", "married", "no_dependents", "single_parent")
+
+
+def insurance_features(analysis, user_profile):
+    """Values the insurance rules read, for one report."""
+    get = analysis.get
+    non_selected_fund, selected_fund = fund_activity_flags(get("fund_name", ""))
+    gender, male, married, no_dependents, single_parent = profile_flags(
+        user_profile.get("gender", "גבר"),
+        user_profile.get("marital_status", "נשוי/אה"),
+        bool(user_profile.get("has_minor_children", False)),
+    )
+    return {
+        "orphan": get("orphan_pension", 0),
+        "disability": get("disability_pension", 0),
+        "spouse": get("spouse_pension", 0),
+        "death_cost": get("death_insurance_cost", 0),
+        "age": get("estimated_age", 50),
+        "insured_income": get("insured_income", 0),
+        "can_calc": bool(get("can_calc_income", False)),
+        "report_period": get("report_period", ""),
+        "non_selected_fund": non_selected_fund,
+        "selected_fund": selected_fund,
+        "gender": gender,
+        "male": male,
+        "married": married,
+        "no_dependents": no_dependents,
+        "single_parent": single_parent,
+    }
+
 
+INSURANCE_COLUMNS = ("orphan_pension", "disability_pension", "spouse_pension", "death_insurance_cost",
+                     "estimated_age", "insured_income", "can_calc_income", "report_period", "fund_name")
+PROFILE_COLUMNS = ("gender", "marital_status", "has_minor_children")
+
+
+def insurance_columns(analyses, user_profiles):
+    """Columns for audit_insurance from parallel lists of analyses and profiles."""
+    columns = {name: [a.get(name) for a in analyses] for name in INSURANCE_COLUMNS}
+    columns.update({name: [p.get(name) for p in user_profiles] for name in PROFILE_COLUMNS})
+    return columns
+
+
+def insurance_batch_features(columns):
+    """insurance_features as NumPy columns. columns maps the analysis and profile keys
+    (INSURANCE_COLUMNS, PROFILE_COLUMNS) to equal-length sequences - a dict of lists
+    or a pandas DataFrame. Missing keys and values take insurance_features' defaults."""
+    rows = len(columns[next(iter(columns))])
+
+    def values(name, default):
+        column = columns.get(name)
+        if column is None:
+            return [default] * rows
+        if hasattr(column, "tolist"):
+            column = column.tolist()  # pandas Series / NumPy array: iterate Python objects
+        return [default if v is None or v != v else v for v in column]  # v != v: NaN
+
+    def numbers(name, default=0):
+        column = columns.get(name)
+        if column is None:
+            return np.full(rows, float(default))
+        numbers = np.asarray(column, dtype=float)  # None -> NaN
+        return np.where(np.isnan(numbers), default, numbers)
+
+    # Flags of the distinct fund names and profiles come from the lru caches
+    funds = np.array([fund_activity_flags(name) for name in values("fund_name", "")], dtype=bool).reshape(rows, 2)
+    profiles = [
+        profile_flags(gender, marital, bool(has_kids))
+        for gender, marital, has_kids in zip(values("gender", "גבר"), values("marital_status", "נשוי/אה"),
+                                             values("has_minor_children", False))
+    ]
+    features = {
+        "orphan": numbers("orphan_pension"),
+        "disability": numbers("disability_pension"),
+        "spouse": numbers("spouse_pension"),
+        "death_cost": numbers("death_insurance_cost"),
+        "age": numbers("estimated_age", 50),
+        "insured_income": numbers("insured_income"),
+        "can_calc": np.asarray([bool(v) for v in values("can_calc_income", False)], dtype=bool),
+        "report_period": values("report_period", ""),
+        "non_selected_fund": funds[:, 0],
+        "selected_fund": funds[:, 1],
+    }
+    for i, name in enumerate(PROFILE_FEATURES):
+        features[name] = np.asarray([flags[i] for flags in profiles], dtype=object if name == "gender" else bool)
+    return features
+
+
+def _survivors_cost_slots(f):
+    """Slots of the survivors-cost message: the cost paid and its yearly equivalent."""
+    death_cost = f["death_cost"]
+    cost_note = ""
+    for keywords, annual_cost in QUARTER_ANNUAL_COST:
+        if any(kw in f["report_period"] for kw in keywords):
+            cost_note = SURVIVORS_ANNUAL_COST_NOTE.render(annual_cost=annual_cost(death_cost))
+            break
+    return {"death_cost": death_cost, "cost_note": cost_note}
+
+
+class InsuranceRule:
+    """One insurance check. when is a boolean expression over the insurance_features
+    names; a stop rule ends the checks of a report it fires on; slots(features)
+    fills the named slots of the message."""
+
+    def __init__(self, name, severity, when, message=None, stop=False, slots=None):
+        self.name = name
+        self.severity = severity
+        self.when = " ".join(when.split())
+        self.message = message or name
+        self.stop = stop
+        self.slots = slots
+
+
+INSURANCE_RULES = (
+    # Settled pension (no disability coverage), non-selected then selected fund
+    InsuranceRule("inactive_fund", "⚠️", "non_selected_fund and disability == 0", stop=True),
+    InsuranceRule("inactive_selected_fund", "⚠️", "selected_fund and disability == 0", stop=True),
+    # Waived survivors with insurability (still paying for death insurance)
+    InsuranceRule("no_survivors_married", "🔴", "orphan == 0 and death_cost > 0 and married"),
+    InsuranceRule("survivors_waived", "ℹ️", "orphan == 0 and death_cost > 0 and not married"),
+    # Waived survivors without insurability
+    InsuranceRule("no_survivors_married_uninsurable", "🔴",
+                  "orphan == 0 and disability > 0 and death_cost == 0 and married",
+                  message="no_survivors_married"),
+    InsuranceRule("survivors_waived_uninsurable", "🔴",
+                  "orphan == 0 and disability > 0 and death_cost == 0 and not married"),
+    # Single/divorced/widowed without kids - paying survivors
+    InsuranceRule("survivors_without_dependents", "💡", "no_dependents and orphan > 0 and death_cost > 0",
+                  slots=_survivors_cost_slots),
+    InsuranceRule("survivors_without_dependents_no_cost", "💡",
+                  "no_dependents and orphan > 0 and not death_cost > 0"),
+    # Divorced/widowed with kids - paying spouse insurance
+    InsuranceRule("spouse_cover_without_spouse", "💡", "single_parent and spouse > 0"),
+    # Not the default (maximum coverage) plan: orphan/disability off 40/75, or low disability cover
+    InsuranceRule("not_default_plan", "⚠️", """
+        (disability > 0 and orphan > 0 and (
+            abs(orphan / disability - 40 / 75) > 0.02
+            or (male and age < 40 and orphan < 40 / 75 * disability * 0.98)
+            or spouse < 1.5 * orphan * 0.98))
+        or (can_calc and insured_income > 0 and disability > 0
+            and disability < 0.9 * 0.75 * insured_income * 0.98)"""),
+)
+
+RULE_BUILTINS = {"__builtins__": {}, "abs": abs}
+
+
+class _Vectorize(ast.NodeTransformer):
+    """and/or/not -> &, |, ~ so an expression works element-wise on NumPy columns."""
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        expr = node.values[0]
+        for value in node.values[1:]:
+            expr = ast.BinOp(left=expr, op=op, right=value)
+        return expr
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=node.operand)
+        return node
+
+
+def compile_rules(rules):
+    """(single-report evaluator, [code per rule] for batches).
+    The evaluator is one generated function: it takes the features dict and returns
+    the indexes of the rules that fire, stopping at a stop rule, with Python's
+    short-circuit evaluation (so disability == 0 never reaches a division)."""
+    names = sorted({
+        node.id for rule in rules for node in ast.walk(ast.parse(rule.when, mode="eval"))
+        if isinstance(node, ast.Name) and node.id not in RULE_BUILTINS
+    })
+    lines = ["def evaluate(f):"]
+    lines += [f"    {name} = f[{name!r}]" for name in names]
+    lines.append("    fired = []")
+    for i, rule in enumerate(rules):
+        lines.append(f"    if {rule.when}:")
+        lines.append(f"        fired.append({i})")
+        if rule.stop:
+            lines.append("        return fired")
+    lines.append("    return fired")
+    namespace = dict(RULE_BUILTINS)
+    exec(compile("\n".join(lines), "<insurance rules>", "exec"), namespace)
+
+    batch_codes = []
+    for rule in rules:
+        tree = ast.fix_missing_locations(_Vectorize().visit(ast.parse(rule.when, mode="eval")))
+        batch_codes.append(compile(tree, f"<insurance rule {rule.name}>", "eval"))
+    return namespace["evaluate"], batch_codes
+
+
+class _Row:
+    """Features of one batch row, looked up on demand (for slots)."""
+
+    __slots__ = ("features", "index")
+
+    def __init__(self, features, index):
+        self.features = features
+        self.index = index
+
+    def __getitem__(self, name):
+        return self.features[name][self.index]
+
+
+class InsuranceRuleSet:
+    """Rules compiled once: the predicates into an evaluator (compile_rules), and each
+    rule bound to its precompiled message template."""
+
+    def __init__(self, rules=INSURANCE_RULES, messages=INSURANCE_MESSAGES):
+        self.rules = tuple(rules)
+        self._evaluate, self._batch_codes = compile_rules(self.rules)
+        self._templates = {rule.name: messages[rule.message] for rule in self.rules}
+
+    def _render(self, rule, gender, features):
+        template = self._templates[rule.name]
+        return template.render(gender, **rule.slots(features)) if rule.slots else template.render(gender)
+
+    def check(self, analysis, user_profile):
+        """[(icon, message)] of the rules that fire on one report, in rule order."""
+        features = insurance_features(analysis, user_profile)
+        warnings = []
+        for i in self._evaluate(features):
+            rule = self.rules[i]
+            warnings.append((rule.severity, self._render(rule, features["gender"], features)))
+        return warnings
+
+    def audit(self, columns, with_messages=False):
+        """Evaluate every rule over a batch (see insurance_batch_features).
+        Returns {"rows", "fired": {rule: bool array}, "counts": {rule: int}} and,
+        with_messages, "warnings": check()'s output per row."""
+        features = insurance_batch_features(columns)
+        rows = len(features["gender"])
+        active = np.ones(rows, dtype=bool)  # rows no stop rule has fired on
+        fired = {}
+        # Every row is evaluated, so orphan / disability divides by zero where the
+        # disability > 0 term masks the result anyway
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for rule, code in zip(self.rules, self._batch_codes):
+                hit = np.broadcast_to(eval(code, RULE_BUILTINS, features), (rows,)) & active
+                fired[rule.name] = hit
+                if rule.stop:
+                    active &= ~hit
+        result = {
+            "rows": rows,
+            "fired": fired,
+            "counts": {name: int(hit.sum()) for name, hit in fired.items()},
+        }
+        if with_messages:
+            warnings = [[] for _ in range(rows)]
+            for rule in self.rules:
+                for i in np.flatnonzero(fired[rule.name]):
+                    warnings[i].append((rule.severity, self._render(rule, features["gender"][i], _Row(features, i))))
+            result["warnings"] = warnings
+        return result
+
+
+INSURANCE_RULE_SET = InsuranceRuleSet()
+
+
+@traced()
 def check_insurance(analysis, user_profile):
     """Run all insurance coverage checks. Returns list of (type, message) tuples."""
-    warnings = []
-
-    orphan = analysis.get("orphan_pension", 0)
-    disability = analysis.get("disability_pension", 0)
-    spouse = analysis.get("spouse_pension", 0)
-    premium_waiver = analysis.get("premium_waiver", 0)
-    death_cost = analysis.get("death_insurance_cost", 0)
-    fund_name = analysis.get("fund_name", "")
-    age = analysis.get("estimated_age", 50)
-    insured_income = analysis.get("insured_income", 0)
-    can_calc = analysis.get("can_calc_income", False)
-
-    gender = user_profile.get("gender", "גבר")
-    marital = user_profile.get("marital_status", "נשוי/אה")
-    has_kids = user_profile.get("has_minor_children", False)
-
-    is_male = gender == "גבר"
-    is_single = marital == "רווק/ה"
-    is_divorced = marital == "גרוש/ה"
-    is_widowed = marital == "אלמן/ה"
-    is_married = marital == "נשוי/אה"
-    no_dependents = is_single or ((is_divorced or is_widowed) and not has_kids)
-
-    ata = g(gender, "אתה", "את")
-    nimtsa = g(gender, "נמצא", "נמצאת")
-    tsabart = g(gender, "שצברת", "שצברת")
-    tukhal = g(gender, "תוכל", "תוכלי")
-    shkol = g(gender, "שקול", "שיקלי")
-    pne = g(gender, "פנה", "פני")
-    tirtse = g(gender, "תרצה", "תרצי")
-    titstarekh = g(gender, "תצטרך", "תצטרכי")
-    matsbekh = g(gender, "מצבך", "מצבך")
-    avurekh = g(gender, "עבורך", "עבורך")
-
-    # ── Check 6: Settled pension - non-selected fund ──
-    non_selected_funds = ["מנורה", "הראל", "הפניקס", "כלל", "מקפת"]
-    is_non_selected = any(f in fund_name for f in non_selected_funds)
-
-    if is_non_selected and disability == 0:
-        warnings.append(("⚠️", f"{g(gender, 'שים', 'שימי')} לב קרן הפנסיה שלך איננה פעילה. הכסף {tsabart} ממשיך לצבור תשואה אך אין לך כיסויים ביטוחיים. אם יש לך קרן פנסיה נוספת {shkol} לאחד אותן. החברה המנהלת רשאית לגבות את דמי ניהול מקסימליים מקרן פנסיה לא פעילה."))
-        return warnings
+    return INSURANCE_RULE_SET.check(analysis, user_profile)
 
-    # ── Check 7: Settled pension - selected fund ──
-    selected_funds = ["מיטב", "אלטשולר", "מור", "אינפיניטי"]
-    is_selected = any(f in fund_name for f in selected_funds)
 
-    if is_selected and disability == 0:
-        warnings.append(("⚠️", f"""{g(gender, 'שים', 'שימי')} לב קרן הפנסיה שלך איננה פעילה. הכסף {tsabart} ממשיך לצבור תשואה אך אין לך כיסויים ביטוחיים. אם יש לך קרן פנסיה נוספת {shkol} לאחד אותן. במידה והצטרפת לקרן כ"קרן נבחרת" דמי הניהול לא יועלו עד 10 שנים מההצטרפות."""))
-        return warnings
+def audit_insurance(columns, with_messages=False):
+    """Run the insurance checks over a batch of analyses. See InsuranceRuleSet.audit."""
+    return INSURANCE_RULE_SET.audit(columns, with_messages)
 
-    # ── Check 2: Waived survivors WITH insurability ──
-    if orphan == 0 and death_cost > 0:
-        if is_married:
-            msg = f"""{g(gender, 'שים', 'שימי')} לב, אין לך כיסוי שארים. עליך לעדכן את קרן הפנסיה ש{g(gender, 'אתה נשוי', 'את נשואה')} בכדי שיפעילו את כיסוי השארים."""
-            warnings.append(("🔴", msg))
-        else:
-            msg = f"""וויתרת על ביטוח שארים וכך הגדלת את הפנסיה העתידית שלך.
-הוויתור תקף לשנתיים.
-אם {matsbekh} המשפחתי השתנה {g(gender, 'זכור', 'זכרי')} לעדכן את הקרן.
-כל עוד הוא לא משתנה כדאי לחדש את הוויתור על כיסוי השארים לפני תום השנתיים."""
-            warnings.append(("ℹ️", msg))
-
-    # ── Check 3: Waived survivors WITHOUT insurability ──
-    if orphan == 0 and disability > 0 and death_cost == 0:
-        if is_married:
-            msg = f"""{g(gender, 'שים', 'שימי')} לב, אין לך כיסוי שארים. עליך לעדכן את קרן הפנסיה ש{g(gender, 'אתה נשוי', 'את נשואה')} בכדי שיפעילו את כיסוי השארים."""
-            warnings.append(("🔴", msg))
-        else:
-            msg = f"""{g(gender, 'שים', 'שימי')} לב {ata} {nimtsa} בוויתור על שארים אבל אם {tirtse} לעשות ביטוח שארים {titstarekh} להתחיל מחדש את תקופת האכשרה.
-מומלץ לפנות לקרן הפנסיה כבר עכשיו ולבקש לרכוש ברות ביטוח."""
-            warnings.append(("🔴", msg))
-
-    # ── Check 4: Single/divorced/widowed without kids - paying survivors ──
-    if no_dependents and orphan > 0:
-        report_period = analysis.get("report_period", "")
-        annual_cost = death_cost
-        cost_note = ""
-        if death_cost > 0:
-            if "רבעון 1" in report_period or "רבעון ראשון" in report_period:
-                annual_cost = death_cost * 4
-                cost_note = f" (במונחים שנתיים: ₪{format_number(annual_cost)})"
-            elif "רבעון 2" in report_period or "רבעון שני" in report_period:
-                annual_cost = death_cost * 2
-                cost_note = f" (במונחים שנתיים: ₪{format_number(annual_cost)})"
-            elif "רבעון 3" in report_period or "רבעון שלישי" in report_period:
-                annual_cost = round(death_cost * 4 / 3)
-                cost_note = f" (במונחים שנתיים: ₪{format_number(annual_cost)})"
-            elif "רבעון 4" in report_period or "רבעון רביעי" in report_period:
-                pass  # Q4 = annual, no note needed
-
-            msg = f"""{g(gender, 'שים', 'שימי')} לב – {g(gender, 'לחוסך שאין לו', 'לחוסכת שאין לה')} בן/ת זוג ולא ילדים אין טעם לשלם ביטוח שארים.
-בדוח רואים ש{g(gender, 'שילמת', 'שילמת')} ₪{format_number(death_cost)} על ביטוח שארים שהוא מיותר לגמרי {avurekh} (זה ממש כסף שהולך לפח).{cost_note}
-
-מומלץ לפנות לקרן ולבקש לוותר על ביטוח שארים.
-הוויתור יהיה תקף לשנתיים, ו{tukhal} לחדש אותו במידה ו{matsbekh} המשפחתי לא ישתנה.
-במידה ו{matsbekh} המשפחתי ישתנה בתוך שנתיים אלו, {pne} אל הקרן {g(gender, 'וחדש', 'וחדשי')} את ביטוח השארים.
-זה לא ידרוש הצהרת בריאות ולא תקופת אכשרה חדשה."""
-            warnings.append(("💡", msg))
-        else:
-            # death_cost is 0 but orphan > 0 — can't determine actual cost
-            msg = f"""{g(gender, 'שים', 'שימי')} לב – {g(gender, 'לחוסך שאין לו', 'לחוסכת שאין לה')} בן/ת זוג ולא ילדים אין טעם לשלם ביטוח שארים.
-מומלץ לפנות לקרן ולבקש לוותר על ביטוח שארים. כך {g(gender, 'תגדיל', 'תגדילי')} את הפנסיה העתידית שלך.
-הוויתור יהיה תקף לשנתיים, ו{tukhal} לחדש אותו במידה ו{matsbekh} המשפחתי לא ישתנה.
-במידה ו{matsbekh} המשפחתי ישתנה בתוך שנתיים אלו, {pne} אל הקרן {g(gender, 'וחדש', 'וחדשי')} את ביטוח השארים.
-זה לא ידרוש הצהרת בריאות ולא תקופת אכשרה חדשה."""
-            warnings.append(("💡", msg))
-
-    # ── Check 5: Divorced/widowed WITH kids - paying spouse insurance ──
-    if (is_divorced or is_widowed) and has_kids and spouse > 0:
-        msg = f"""{g(gender, 'שים', 'שימי')} לב {ata} {g(gender, 'משלם', 'משלמת')} ביטוח שארים על בן/ת זוג וזה מיותר לגמרי {avurekh} (זה ממש כסף שהולך לפח).
-אם {g(gender, 'תפנה', 'תפני')} אל קרן הפנסיה {g(gender, 'ותבקש', 'ותבקשי')} לוותר על ביטוח השארים לבן/ת זוג {g(gender, 'תגדיל', 'תגדילי')} את הפנסיה העתידית שלך.
-הוויתור יהיה תקף לשנתיים, ו{tukhal} לחדש אותו במידה ו{matsbekh} המשפחתי לא ישתנה.
-במידה ו{matsbekh} המשפחתי ישתנה בתוך שנתיים אלו, {pne} אל הקרן {g(gender, 'וחדש', 'וחדשי')} את ביטוח השארים.
-זה לא ידרוש הצהרת בריאות ולא תקופת אכשרה חדשה."""
-        warnings.append(("💡", msg))
-
-    # ── Check 1: Not default (maximum coverage) plan ──
-    not_default = False
-    if disability > 0 and orphan > 0:
-        ratio = orphan / disability
-        expected_ratio = 40 / 75
-        if abs(ratio - expected_ratio) > 0.02:
-            not_default = True
-        if is_male and age < 40 and orphan < expected_ratio * disability * 0.98:
-            not_default = True
-        if spouse < 1.5 * orphan * 0.98:
-            not_default = True
-
-    if can_calc and insured_income > 0 and disability > 0:
-        threshold = 0.9 * 0.75 * insured_income
-        if disability < threshold * 0.98:
-            not_default = True
-
-    if not_default:
-        warnings.append(("⚠️", f"{g(gender, 'שים', 'שימי')} לב – מסלול הביטוח שבו {ata} {nimtsa} ככל הנראה איננו מסלול הביטוח עם הכיסוי המקסימלי. מומלץ לוודא שגובה הכיסויים לסיכוני הנכות והשארים מספיקים.\nמומלץ להיעזר באיש מקצוע אובייקטיבי שאין לו אינטרס למכור לכם ביטוחים – כלומר ביועץ פנסיוני."))
-
-    return warnings
+
+# ─── Deposit Analysis ───
+
+# (end month, last month name, period label) per quarter wording
+REPORT_PERIOD_ENDS = [
+    (("רבעון 1", "רבעון ראשון", "הרבעון הראשון"), (3, "מרץ", "הרבעון")),
+    (("רבעון 2", "רבעון שני", "הרבעון השני"), (6, "יוני", "הרבעון")),
+    (("רבעון 3", "רבעון שלישי", "הרבעון השלישי"), (9, "ספטמבר", "הרבעון")),
+    (("רבעון 4", "רבעון רביעי", "הרבעון הרביעי"), (12, "דצמבר", "הרבעון")),
+]
+SELF_EMPLOYED_MONTHLY_CAP = 3201  # monthly deposit that still earns a tax benefit
+SELF_EMPLOYED_ANNUAL_CAP = 38412
+MIN_LEGAL_DEPOSIT_RATE = 18.48  # 6% employee + 6.5% employer + 6% severance, as % of salary
+
+
+def find_report_year(header):
+    """Report year from report_period, falling back to report_date. None if not found."""
+    year_match = re.search(r'20\d{2}', header.get("report_period", ""))
+    if not year_match:
+        year_match = re.search(r'20\d{2}', header.get("report_date", "") or "")
+    return int(year_match.group()) if year_match else None
+
+
+def report_period_end(report_period):
+    """Return (end month, last month name, period label) for the report period."""
+    for keywords, end in REPORT_PERIOD_ENDS:
+        if any(kw in report_period for kw in keywords):
+            return end
+    return 12, "דצמבר", "השנה"
+
+
+def project_annual_deposits(total_deposits, period_end_month):
+    """Project deposits up to period_end_month to a full year."""
+    if period_end_month <= 3:
+        return total_deposits * 4
+    elif period_end_month <= 6:
+        return total_deposits * 2
+    elif period_end_month <= 9:
+        return round(total_deposits * 4 / 3)
+    return total_deposits
+
+
+@traced()
+def compute_deposit_summary(data, analysis, frame=None):
+    """Monthly deposit totals for the report year plus the deposit checks.
+    Returns dict; "status" is "ok", "no_deposits", "no_year" or "no_months"."""
+    if frame is None:
+        frame = build_deposit_frame(data)
+    deposit_source = frame.deposit_source()
+    summary = {"deposit_source": deposit_source}
+
+    if not frame.size:
+        summary["status"] = "no_deposits"
+        return summary
+
+    header = data.get("header", {})
+    report_year = find_report_year(header)
+    if not report_year:
+        summary["status"] = "no_year"
+        return summary
+
+    # Only the report year. For עצמאי: total deposits, for שכיר: salary.
+    value_field = "total" if deposit_source == "עצמאי" else "salary"
+    year_totals = frame.monthly_totals(value_field, report_year)
+    if not year_totals:
+        summary["status"] = "no_months"
+        summary["report_year"] = report_year
+        return summary
+
+    period_end_month, last_month_name, period_label = report_period_end(header.get("report_period", ""))
+    months = list(range(1, period_end_month + 1))
+    expected_months = list(range(1, period_end_month))  # last month is usually deposited after the period
+    monthly_totals = {m: year_totals[m] for m in months if m in year_totals}
+    totals = np.array(list(monthly_totals.values()), dtype=float)
+
+    summary.update({
+        "status": "ok",
+        "report_year": report_year,
+        "months": months,
+        "monthly_totals": monthly_totals,
+        "max_total": float(totals.max(initial=0)) or 1,
+        "period_end_month": period_end_month,
+        "last_month_name": last_month_name,
+        "period_label": period_label,
+        "last_month_has_deposit": period_end_month in monthly_totals,
+        "avg_value": float(totals.mean()) if totals.size else None,
+        "months_with_deposits": int(totals.size),
+        "missing_months": [m for m in expected_months if m not in monthly_totals],
+    })
+
+    # Low deposit rate (employees)
+    source = analysis.get("deposit_source", "שכיר")
+    summary["low_deposit_rate"] = bool(
+        analysis.get("can_calc_income", False) and source == "שכיר"
+        and analysis.get("deposit_rate", 0) < MIN_LEGAL_DEPOSIT_RATE
+    )
+
+    # Self-employed deposits above the tax benefit threshold
+    summary["excess_self_deposit"] = False
+    if source == "עצמאי" and report_year >= 2025:
+        last_3 = np.array([monthly_totals.get(m, 0) for m in range(max(1, period_end_month - 2), period_end_month + 1)])
+        last_3_paid = last_3[last_3 > 0]
+        months_above = int((totals > SELF_EMPLOYED_MONTHLY_CAP).sum())
+        projected_annual = project_annual_deposits(float(totals.sum()), period_end_month)
+        summary["excess_self_deposit"] = bool(
+            (last_3_paid.size >= 3 and (last_3_paid > SELF_EMPLOYED_MONTHLY_CAP).all())
+            or months_above > 3
+            or projected_annual > SELF_EMPLOYED_ANNUAL_CAP
+        )
+    return summary
 
 
 # ─── Fee Analysis ───
@@ -501,6 +793,96 @@ def calc_annual_fee(deposit_fee_pct, savings_fee_pct, annual_deposit, avg_saving
     return (deposit_fee_pct / 100) * annual_deposit + (savings_fee_pct / 100) * avg_savings
 
 
+def estimate_avg_savings(closing_balance, annual_deposit):
+    """Average balance over the next year: 2% growth plus half a year of deposits."""
+    return closing_balance * 1.02 + 6 * (annual_deposit / 12)
+
+
+def rank_fund_plans(annual_deposit, avg_savings):
+    """Annual cost of every FUND_PLANS option as (fund_name, dep%, sav%, annual_fee), cheapest first."""
+    options = []
+    for fund_name, plans in FUND_PLANS.items():
+        for dep, sav in plans:
+            options.append((fund_name, dep, sav, calc_annual_fee(dep, sav, annual_deposit, avg_savings)))
+    options.sort(key=lambda x: x[3])
+    return options
+
+
+def annualize_deposits(total_deposits, report_period):
+    """Project the period's deposits to a full year based on the report quarter."""
+    if "רבעון 1" in report_period or "רבעון ראשון" in report_period:
+        return total_deposits * 4
+    elif "רבעון 2" in report_period or "רבעון שני" in report_period:
+        return total_deposits * 2
+    elif "רבעון 3" in report_period or "רבעון שלישי" in report_period:
+        return round(total_deposits * 4 / 3)
+    return total_deposits
+
+
+@traced()
+def compute_fee_comparison(data, analysis):
+    """Compare current fees with FUND_PLANS, ADVISOR_PLAN and MAX_FEES.
+    Returns dict; "status" is "ok", "no_balance" or "no_fees"."""
+    closing_balance = analysis.get("closing_balance", 0)
+    if not closing_balance or closing_balance <= 0:
+        return {"status": "no_balance"}
+
+    # Extract current fee rates
+    deposit_fee, savings_fee = extract_fee_rates(data)
+    if deposit_fee == 0 and savings_fee == 0:
+        return {"status": "no_fees"}
+
+    # Calculate projected annual deposit from actual deposits in report
+    annual_deposit = annualize_deposits(analysis.get("total_deposits", 0), analysis.get("report_period", ""))
+    avg_savings = estimate_avg_savings(closing_balance, annual_deposit)
+
+    current_fee = calc_annual_fee(deposit_fee, savings_fee, annual_deposit, avg_savings)
+    max_fee = calc_annual_fee(MAX_FEES[0], MAX_FEES[1], annual_deposit, avg_savings)
+
+    # All options with fund names: (fund_name, dep%, sav%, annual_fee), cheapest first
+    all_options = rank_fund_plans(annual_deposit, avg_savings)
+
+    adv_fee = calc_annual_fee(ADVISOR_PLAN[0], ADVISOR_PLAN[1], annual_deposit, avg_savings)
+
+    # Find cheapest (including current)
+    cheapest_fee = min([current_fee] + [o[3] for o in all_options] + [adv_fee])
+
+    # Gauge position: 0% = cheapest, 100% = max
+    if max_fee > cheapest_fee:
+        gauge_pct = ((current_fee - cheapest_fee) / (max_fee - cheapest_fee)) * 100
+        gauge_pct = max(0, min(100, gauge_pct))
+    else:
+        gauge_pct = 50
+
+    # Cheapest non-advisor option (may have multiple funds with same fee)
+    cheapest_fund_fee = all_options[0][3] if all_options else None
+    cheapest_fund_names = []
+    if cheapest_fund_fee is not None:
+        cheapest_fund_names = list(set(
+            o[0] for o in all_options if abs(o[3] - cheapest_fund_fee) < 1
+        ))
+
+    return {
+        "status": "ok",
+        "deposit_fee": deposit_fee,
+        "savings_fee": savings_fee,
+        "annual_deposit": annual_deposit,
+        "avg_savings": avg_savings,
+        "current_fee": current_fee,
+        "max_fee": max_fee,
+        "adv_fee": adv_fee,
+        "options": all_options,
+        "cheapest_fee": cheapest_fee,
+        "cheapest_fund_fee": cheapest_fund_fee,
+        "cheapest_fund_dep": all_options[0][1] if all_options else None,
+        "cheapest_fund_sav": all_options[0][2] if all_options else None,
+        "cheapest_fund_names": cheapest_fund_names,
+        "advisor_is_cheapest": adv_fee < cheapest_fund_fee if cheapest_fund_fee else False,
+        "max_saving": current_fee - cheapest_fee,
+        "gauge_pct": gauge_pct,
+    }
+
+
 # ─── Investment Analysis ───
 
 EQUITY_TRACKS = {
@@ -546,39 +928,93 @@ EQUITY_TRACKS = {
 MADEDEI_WARNING_FUNDS = ["אינפיניטי", "הפניקס", "הראל", "מגדל", "מיטב דש"]
 
 
+def _normalize_track(s):
+    return s.lower().strip().replace(" ", "").replace("&amp;", "&")
+
+
+# Keywords looked up in lower-cased track names: category -> keywords
+TRACK_KEYWORDS = {
+    "equity": ["מנייתי", "מניות", "s&p", "500", "הלכה"],
+    "age": ["בני 50", "50 ומטה", "50-60", "עד 50", "60 ומעלה", "כללי"],
+    "sp500": ["s&p", "s&amp;p", "500"],
+    "madedei": ["מדדי מניות"],
+    "halacha": ["הלכה"],
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _fund_index():
+    return KeywordIndex({key: [key] for key in EQUITY_TRACKS})
+
+
+@functools.lru_cache(maxsize=None)
+def _equity_track_index():
+    """Each fund's equity track names (normalised), tagged with the fund key."""
+    return KeywordIndex(
+        {key: fund["tracks"] for key, fund in EQUITY_TRACKS.items()}, normalize=_normalize_track,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _track_keyword_index():
+    return KeywordIndex(TRACK_KEYWORDS, normalize=str.lower)
+
+
 def find_fund_key(fund_name):
     """Match PDF fund name to our equity tracks dictionary."""
-    for key in EQUITY_TRACKS:
-        if key in fund_name:
-            return key
-    return None
+    return _fund_index().first_category(fund_name)
 
 
-def is_equity_track(track_name, fund_key):
-    """Check if a track name is an equity track for the given fund."""
+def is_equity_track(track_name, fund_key, track_keywords=None):
+    """Check if a track name is an equity track for the given fund.
+    track_keywords: TRACK_KEYWORDS categories of track_name, if already looked up."""
     if not fund_key or fund_key not in EQUITY_TRACKS:
         return False
-    equity_names = EQUITY_TRACKS[fund_key]["tracks"]
-
-    def normalize(s):
-        s = s.lower().strip()
-        s = s.replace(" ", "").replace("&", "&").replace("&amp;", "&")
-        return s
-
-    track_norm = normalize(track_name)
-    for eq in equity_names:
-        eq_norm = normalize(eq)
-        if eq_norm in track_norm or track_norm in eq_norm:
-            return True
-    equity_keywords = ["מנייתי", "מניות", "s&p", "500", "הלכה"]
-    track_lower = track_name.lower()
-    return any(kw in track_lower for kw in equity_keywords)
+    index = _equity_track_index()
+    if fund_key in index.categories(track_name) or fund_key in index.keyword_containing(track_name):
+        return True
+    if track_keywords is None:
+        track_keywords = _track_keyword_index().categories(track_name)
+    return "equity" in track_keywords
 
 
 def is_age_related_track(track_name):
     """Check if track is an age-based default (בני 50 ומטה, בני 50-60, etc.)."""
-    age_keywords = ["בני 50", "50 ומטה", "50-60", "עד 50", "60 ומעלה", "כללי"]
-    return any(kw in track_name for kw in age_keywords)
+    return "age" in _track_keyword_index().categories(track_name)
+
+
+@traced()
+def classify_tracks(tracks, fund_name):
+    """Classify the report's investment tracks for the investment analysis."""
+    fund_key = find_fund_key(fund_name)
+    result = {
+        "fund_key": fund_key,
+        "equity_tracks": [],
+        "non_equity_tracks": [],
+        "has_sp500": False,
+        "has_madedei": False,
+        "has_age_track": False,
+        "has_halacha": False,
+    }
+    index = _track_keyword_index()
+    for t in tracks:
+        name = t.get("track_name", "")
+        found = index.categories(name)
+        if "sp500" in found:
+            result["has_sp500"] = True
+        if "madedei" in found:
+            result["has_madedei"] = True
+        if "halacha" in found:
+            result["has_halacha"] = True
+
+        if fund_key and is_equity_track(name, fund_key, found):
+            result["equity_tracks"].append(name)
+        else:
+            result["non_equity_tracks"].append(name)
+
+        if "age" in found:
+            result["has_age_track"] = True
+    return result
 
 
 # ─── Government Employer Check ───
@@ -634,12 +1070,27 @@ GOV_EMPLOYERS = [
 GOV_ADVISORY_URL = "https://drive.google.com/file/d/1XJQNljx97nxO1b3P791QUl9XR5aSCCC1/view"
 
 
+@functools.lru_cache(maxsize=None)
+def _gov_employer_index():
+    return KeywordIndex((gov, gov) for gov in GOV_EMPLOYERS)
+
+
 def is_gov_employer(employer_name):
-    """Check if employer matches a government body."""
+    """Check if employer matches a government body (either name containing the other)."""
     if not employer_name:
         return False
-    employer_lower = employer_name.strip()
-    for gov in GOV_EMPLOYERS:
-        if gov in employer_lower or employer_lower in gov:
-            return True
-    return False
+    index = _gov_employer_index()
+    employer = employer_name.strip()
+    return index.contains_any(employer) or bool(index.keyword_containing(employer))
+
+
+def find_gov_employer(data):
+    """Return the government employer named in the header or deposits table, or None."""
+    employer = data.get("header", {}).get("employer", "")
+    if is_gov_employer(employer):
+        return employer
+    for dep in data.get("deposits", []):
+        dep_employer = dep.get("employer", "")
+        if dep_employer and is_gov_employer(dep_employer):
+            return dep_employer
+    return None
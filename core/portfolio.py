@@ -0,0 +1,96 @@
+"""
+רובייקטיבי - Portfolio Analysis
+===============================
+Combines the report models of several pension funds held by the same member:
+total balance and fees, duplicated insurance coverage and the cost of
+consolidating everything into one fund on the FUND_PLANS terms.
+Each report is analysed through the memoised build_report_model, so adding a
+report to the portfolio only analyses the new one.
+"""
+
+from core.pension_core import (
+    ADVISOR_PLAN,
+    calc_annual_fee, annualize_deposits, estimate_avg_savings, rank_fund_plans,
+)
+from core.report_model import build_report_model, MIXED_DEPOSIT_SOURCE
+
+
+def build_portfolio_models(reports, user_profile):
+    """ReportModel for each (data, data_hash) pair, in order."""
+    return [build_report_model(data, user_profile, digest) for data, digest in reports]
+
+
+def _fund_row(model):
+    analysis = model.analysis
+    fees = model.fees
+    annual_deposit = annualize_deposits(analysis.get("total_deposits", 0), analysis.get("report_period", ""))
+    return {
+        "fund_name": analysis.get("fund_name", ""),
+        "report_period": analysis.get("report_period", ""),
+        "closing_balance": analysis.get("closing_balance", 0) or 0,
+        "annual_deposit": annual_deposit,
+        "deposit_fee": fees.get("deposit_fee"),
+        "savings_fee": fees.get("savings_fee"),
+        "current_fee": fees.get("current_fee"),
+        # A fund without disability coverage is not active (see the inactive_fund insurance rules)
+        "is_active": (analysis.get("disability_pension", 0) or 0) > 0,
+        "disability_pension": analysis.get("disability_pension", 0) or 0,
+        "spouse_pension": analysis.get("spouse_pension", 0) or 0,
+        "death_insurance_cost": analysis.get("death_insurance_cost", 0) or 0,
+    }
+
+
+def compute_portfolio(models):
+    """Merge report models into a portfolio summary.
+    Models that are invalid or have mixed deposits are listed under "skipped"."""
+    funds = []
+    skipped = []
+    for model in models:
+        if not model.is_valid or model.deposit_source == MIXED_DEPOSIT_SOURCE:
+            skipped.append(model.data.get("header", {}).get("fund_name", "") or model.error)
+        else:
+            funds.append(_fund_row(model))
+
+    total_balance = sum(f["closing_balance"] for f in funds)
+    total_annual_deposit = sum(f["annual_deposit"] for f in funds)
+    priced = [f for f in funds if f["current_fee"] is not None]
+    total_current_fee = sum(f["current_fee"] for f in priced)
+    active = [f for f in funds if f["is_active"]]
+
+    portfolio = {
+        "funds": funds,
+        "skipped": skipped,
+        "total_balance": total_balance,
+        "total_annual_deposit": total_annual_deposit,
+        "total_current_fee": total_current_fee,
+        "fees_complete": len(priced) == len(funds),
+        "active_funds": [f["fund_name"] for f in active],
+        "inactive_funds": [f["fund_name"] for f in funds if not f["is_active"]],
+        # Disability and survivors coverage is paid for in every active fund but only
+        # pays out up to the insured income once, so more than one active fund is duplicated cover
+        "duplicate_insurance": len(active) > 1,
+        "total_insurance_cost": sum(f["death_insurance_cost"] for f in active),
+        "consolidated": None,
+    }
+
+    if total_balance <= 0:
+        return portfolio
+
+    # ── Everything in one fund ──
+    avg_savings = estimate_avg_savings(total_balance, total_annual_deposit)
+    options = rank_fund_plans(total_annual_deposit, avg_savings)
+    adv_fee = calc_annual_fee(ADVISOR_PLAN[0], ADVISOR_PLAN[1], total_annual_deposit, avg_savings)
+    cheapest_fund_fee = options[0][3] if options else None
+    cheapest_fee = min([o[3] for o in options] + [adv_fee])
+    portfolio["consolidated"] = {
+        "avg_savings": avg_savings,
+        "options": options,
+        "cheapest_fund_fee": cheapest_fund_fee,
+        "cheapest_fund_dep": options[0][1] if options else None,
+        "cheapest_fund_sav": options[0][2] if options else None,
+        "cheapest_fund_names": sorted({o[0] for o in options if abs(o[3] - cheapest_fund_fee) < 1}) if options else [],
+        "adv_fee": adv_fee,
+        "cheapest_fee": cheapest_fee,
+        "saving": total_current_fee - cheapest_fee if priced and portfolio["fees_complete"] else None,
+    }
+    return portfolio
@@ -0,0 +1,113 @@
+"""
+רובייקטיבי - Report Model
+=========================
+Everything the result page shows, computed once per (report, profile).
+The Streamlit renderers only turn a ReportModel into HTML, so reruns caused by
+widget changes reuse the memoised model instead of recomputing the analysis.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from core.deposit_frame import build_deposit_frame
+from core.pension_core import (
+    validate_report, detect_deposit_source,
+    compute_analysis, check_insurance,
+    compute_deposit_summary, compute_fee_comparison,
+    classify_tracks, find_gov_employer,
+)
+
+
+MODEL_CACHE_SIZE = 256
+MIXED_DEPOSIT_SOURCE = "שכיר + עצמאי"
+
+
+class ReportModel:
+    """Result of analysing one extracted report for one user profile.
+
+    is_valid / error       -- False with the validate_report message when the report is not supported
+    deposit_source         -- detect_deposit_source output; nothing else is computed for mixed deposits
+    analysis               -- compute_analysis output
+    insurance_warnings     -- check_insurance output, [(icon, message)]
+    deposits               -- compute_deposit_summary output
+    fees                   -- compute_fee_comparison output
+    tracks                 -- classify_tracks output
+    gov_employer           -- matched government employer name or None
+    """
+
+    def __init__(self, data, user_profile, is_valid=True, error=""):
+        self.data = data
+        self.user_profile = user_profile
+        self.is_valid = is_valid
+        self.error = error
+        self.deposit_source = None
+        self.analysis = {}
+        self.insurance_warnings = []
+        self.deposits = {}
+        self.fees = {}
+        self.tracks = {}
+        self.gov_employer = None
+
+    @property
+    def gender(self):
+        return self.user_profile.get("gender", "גבר")
+
+
+def data_hash(data):
+    """Stable hash of extracted report data."""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _profile_key(user_profile):
+    return tuple(sorted(user_profile.items()))
+
+
+def _build(data, user_profile):
+    is_valid, validation_error = validate_report(data)
+    if not is_valid:
+        return ReportModel(data, user_profile, is_valid=False, error=validation_error)
+
+    model = ReportModel(data, user_profile)
+    frame = build_deposit_frame(data)
+    model.deposit_source = detect_deposit_source(data, frame)
+    if model.deposit_source == MIXED_DEPOSIT_SOURCE:
+        return model  # not supported yet; the caller explains this to the user
+
+    model.analysis = compute_analysis(data, user_profile, frame)
+    model.insurance_warnings = check_insurance(model.analysis, user_profile)
+    model.deposits = compute_deposit_summary(data, model.analysis, frame)
+    model.fees = compute_fee_comparison(data, model.analysis)
+    model.tracks = classify_tracks(data.get("investment_tracks", []), model.analysis.get("fund_name", ""))
+    model.gov_employer = find_gov_employer(data)
+    return model
+
+
+_models = OrderedDict()
+_models_lock = threading.Lock()
+
+
+def clear_report_model_cache():
+    """Drop all memoised models."""
+    with _models_lock:
+        _models.clear()
+
+
+def build_report_model(data, user_profile, digest=None):
+    """Memoised ReportModel for data and user_profile.
+    digest is data_hash(data); pass it when already known to skip re-hashing."""
+    key = (digest or data_hash(data), _profile_key(user_profile))
+    with _models_lock:
+        model = _models.get(key)
+        if model is not None:
+            _models.move_to_end(key)
+            return model
+
+    model = _build(data, user_profile)
+    with _models_lock:
+        _models[key] = model
+        while len(_models) > MODEL_CACHE_SIZE:
+            _models.popitem(last=False)
+    return model
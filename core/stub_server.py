@@ -0,0 +1,411 @@
+"""
+רובייקטיבי - Local API Stub Server
+==================================
+Minimal stand-in for the Anthropic Messages and Message Batches endpoints, for
+tests, offline runs and benchmarks. Point the client at it with ANTHROPIC_BASE_URL
+(or client_settings["base_url"]).
+
+Responses are replayed from recordings with configurable latency, and faults can
+be injected at a given rate: overloaded (529), rate limited (429 with retry-after)
+and malformed JSON (the report text cut in half).
+
+    python -m core.stub_server --port 8765 --response report.json
+    python -m core.stub_server --recordings reports.jsonl --latency 1.5 --overload-rate 0.1
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+BATCH_PATH_RE = re.compile(r"^/v1/messages/batches/([\w-]+)(/results)?$")
+
+FAULT_KINDS = ("overloaded", "rate_limit", "malformed")
+
+
+def make_message(text, model, input_tokens=0, output_tokens=0):
+    """A Messages API response body carrying text."""
+    return {
+        "id": f"msg_{uuid.uuid4().hex}",
+        "type": "message",
+        "role": "assistant",
+        "model": model,
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        },
+    }
+
+
+def make_error(kind, message):
+    """A Messages API error body."""
+    return {"type": "error", "error": {"type": kind, "message": message}}
+
+
+def estimate_tokens(size):
+    """Rough token count for size characters (about 4 per token)."""
+    return max(1, size // 4)
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+# ─── Recorded Responses ───
+
+def request_key(params):
+    """SHA-256 of the document sent in a Messages request, or "" if there is none."""
+    for message in params.get("messages", []):
+        content = message.get("content", [])
+        if isinstance(content, str):
+            continue
+        for block in content:
+            source = block.get("source", {}) if isinstance(block, dict) else {}
+            if block.get("type") == "document" and source.get("type") == "base64":
+                return hashlib.sha256(base64.standard_b64decode(source.get("data", ""))).hexdigest()
+    return ""
+
+
+def _recording_text(entry):
+    """Model text of a recording: {"text": ...}, {"response": report} or a bare report."""
+    if isinstance(entry, dict) and isinstance(entry.get("text"), str):
+        return entry["text"]
+    if isinstance(entry, dict) and "response" in entry:
+        entry = entry["response"]
+    return json.dumps(entry, ensure_ascii=False)
+
+
+def load_recordings(path):
+    """[(key, text)] from a JSONL file or a directory of .json files.
+    JSONL lines may carry a "key" (see request_key); a directory entry's key is its file name."""
+    recordings = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".json"):
+                with open(os.path.join(path, name), encoding="utf-8") as f:
+                    recordings.append((name[:-len(".json")], _recording_text(json.load(f))))
+        return recordings
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                key = entry.get("key", "") if isinstance(entry, dict) else ""
+                recordings.append((key, _recording_text(entry)))
+    return recordings
+
+
+class ReplayResponder:
+    """Responder that replays recorded model texts.
+    A request whose document hash matches a recording key gets that recording;
+    any other request gets a recording chosen by its hash, so the same document
+    always gets the same answer and a run is reproducible."""
+
+    def __init__(self, recordings):
+        if not recordings:
+            raise ValueError("no recordings")
+        self.texts = [text for _, text in recordings]
+        self.by_key = {key: text for key, text in recordings if key}
+
+    def __call__(self, params):
+        key = request_key(params)
+        if key in self.by_key:
+            return self.by_key[key]
+        index = int(key, 16) % len(self.texts) if key else 0
+        return self.texts[index]
+
+
+def fixed_responder(path):
+    """Responder that always answers with the JSON report stored at path."""
+    with open(path, encoding="utf-8") as f:
+        text = json.dumps(json.load(f), ensure_ascii=False)
+    return lambda params: text
+
+
+# ─── API State ───
+
+class StubAPI:
+    """State shared by the request handlers. responder(params) returns the model text.
+
+    latency_seconds (+ up to jitter_seconds) is waited before a message response
+    starts; streamed text is sent in chunk_chars pieces, chunk_delay_seconds apart.
+    fault_rates maps FAULT_KINDS to the fraction of message requests that get that
+    fault. Overloaded and rate-limit faults apply to /v1/messages only; malformed
+    also applies to batch results."""
+
+    def __init__(self, responder, batch_delay_seconds=0.0, latency_seconds=0.0, jitter_seconds=0.0,
+                 fault_rates=None, retry_after_seconds=0, chunk_chars=400, chunk_delay_seconds=0.0, seed=None):
+        self.responder = responder
+        self.batch_delay_seconds = batch_delay_seconds
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.fault_rates = dict(fault_rates or {})
+        unknown = set(self.fault_rates) - set(FAULT_KINDS)
+        if unknown:
+            raise ValueError(f"unknown fault kinds: {sorted(unknown)}")
+        self.retry_after_seconds = retry_after_seconds
+        self.chunk_chars = max(1, chunk_chars)
+        self.chunk_delay_seconds = chunk_delay_seconds
+        self.batches = {}
+        self.requests_seen = 0
+        self.faults_injected = {kind: 0 for kind in FAULT_KINDS}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def count_requests(self, count=1):
+        with self._lock:
+            self.requests_seen += count
+
+    def pick_fault(self, kinds=FAULT_KINDS):
+        """Draw the fault for one request among kinds, or None."""
+        with self._lock:
+            roll = self._rng.random()
+            threshold = 0.0
+            for kind in kinds:
+                threshold += self.fault_rates.get(kind, 0.0)
+                if roll < threshold:
+                    self.faults_injected[kind] += 1
+                    return kind
+        return None
+
+    def wait_latency(self):
+        """Sleep for the configured response latency."""
+        with self._lock:
+            jitter = self._rng.uniform(0, self.jitter_seconds) if self.jitter_seconds else 0.0
+        delay = self.latency_seconds + jitter
+        if delay > 0:
+            time.sleep(delay)
+
+    def message_text(self, params, fault):
+        """Model text for one request, cut in half for a malformed fault."""
+        text = self.responder(params)
+        if fault == "malformed":
+            text = text[:len(text) // 2]
+        return text
+
+    def stats(self):
+        with self._lock:
+            return {"requests_seen": self.requests_seen, "faults_injected": dict(self.faults_injected)}
+
+    # ── Messages ──
+
+    def message_events(self, params, text, input_tokens):
+        """(event name, data) pairs of a streamed message carrying text."""
+        message = make_message("", params.get("model", ""), input_tokens, 0)
+        message["content"] = []
+        message["stop_reason"] = None
+        yield "message_start", {"type": "message_start", "message": message}
+        yield "content_block_start", {"type": "content_block_start", "index": 0,
+                                      "content_block": {"type": "text", "text": ""}}
+        for start in range(0, len(text), self.chunk_chars):
+            if start and self.chunk_delay_seconds:
+                time.sleep(self.chunk_delay_seconds)
+            yield "content_block_delta", {"type": "content_block_delta", "index": 0,
+                                          "delta": {"type": "text_delta", "text": text[start:start + self.chunk_chars]}}
+        yield "content_block_stop", {"type": "content_block_stop", "index": 0}
+        yield "message_delta", {"type": "message_delta",
+                                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                "usage": {"output_tokens": estimate_tokens(len(text))}}
+        yield "message_stop", {"type": "message_stop"}
+
+    # ── Batches ──
+
+    def create_batch(self, requests):
+        batch_id = f"msgbatch_{uuid.uuid4().hex}"
+        self.count_requests(len(requests))
+        with self._lock:
+            self.batches[batch_id] = {"created_at": time.time(), "requests": requests}
+        return batch_id
+
+    def batch_json(self, batch_id, base_url):
+        batch = self.batches[batch_id]
+        created = batch["created_at"]
+        ended = time.time() - created >= self.batch_delay_seconds
+        count = len(batch["requests"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count if ended else 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": _iso(created),
+            "expires_at": _iso(created + 24 * 3600),
+            "ended_at": _iso(created + self.batch_delay_seconds) if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"{base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def batch_results(self, batch_id):
+        for request in self.batches[batch_id]["requests"]:
+            params = request["params"]
+            try:
+                text = self.message_text(params, self.pick_fault(("malformed",)))
+                message = make_message(text, params.get("model", ""), output_tokens=estimate_tokens(len(text)))
+                result = {"type": "succeeded", "message": message}
+            except Exception as e:
+                result = {"type": "errored", "error": {"type": "api_error", "message": str(e)}}
+            yield {"custom_id": request["custom_id"], "result": result}
+
+
+# ─── HTTP Handler ───
+
+class StubHandler(BaseHTTPRequestHandler):
+    api = None  # set by make_server
+    protocol_version = "HTTP/1.1"  # keep-alive, so client connection pooling behaves as with the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _base_url(self):
+        return f"http://{self.headers.get('Host')}"
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _not_found(self):
+        self._send_json(404, make_error("not_found_error", self.path))
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) or b"{}"
+
+    def _send_events(self, events):
+        """Write (event, data) pairs as a chunked text/event-stream response."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event, data in events:
+            chunk = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _messages(self, body):
+        api = self.api
+        params = json.loads(body)
+        api.count_requests()
+        fault = api.pick_fault()
+        api.wait_latency()
+        if fault == "overloaded":
+            self._send_json(529, make_error("overloaded_error", "Overloaded"))
+            return
+        if fault == "rate_limit":
+            self._send_json(429, make_error("rate_limit_error", "Rate limited"),
+                            {"retry-after": str(api.retry_after_seconds)})
+            return
+        try:
+            text = api.message_text(params, fault)
+        except Exception as e:
+            self._send_json(500, make_error("api_error", str(e)))
+            return
+        input_tokens = estimate_tokens(len(body))
+        if params.get("stream"):
+            self._send_events(api.message_events(params, text, input_tokens))
+        else:
+            self._send_json(200, make_message(text, params.get("model", ""), input_tokens,
+                                              estimate_tokens(len(text))))
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        body = self._read_body()
+        if path == "/v1/messages":
+            self._messages(body)
+        elif path == "/v1/messages/batches":
+            batch_id = self.api.create_batch(json.loads(body).get("requests", []))
+            self._send_json(200, self.api.batch_json(batch_id, self._base_url()))
+        else:
+            self._not_found()
+
+    def do_GET(self):
+        match = BATCH_PATH_RE.match(self.path.split("?")[0])
+        if not match or match.group(1) not in self.api.batches:
+            self._not_found()
+            return
+        batch_id, results = match.groups()
+        if not results:
+            self._send_json(200, self.api.batch_json(batch_id, self._base_url()))
+            return
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in self.api.batch_results(batch_id))
+        payload = lines.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/binary")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def make_server(api, host="127.0.0.1", port=0):
+    """Create a server bound to host:port (0 = any free port)."""
+    handler = type("BoundStubHandler", (StubHandler,), {"api": api})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_background(api, host="127.0.0.1", port=0):
+    """Start a server on a daemon thread. Returns (server, base_url)."""
+    server = make_server(api, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stub of the Anthropic Messages and batch API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--response", help="JSON report returned for every request")
+    source.add_argument("--recordings", help="JSONL file or directory of recorded responses to replay")
+    parser.add_argument("--batch-delay", type=float, default=0.0, help="seconds until a batch ends")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before a message response starts")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency, up to this many seconds")
+    parser.add_argument("--chunk-chars", type=int, default=400, help="characters per streamed text delta")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed text deltas")
+    parser.add_argument("--overload-rate", type=float, default=0.0, help="fraction of requests answered 529")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of responses with cut-off JSON")
+    parser.add_argument("--retry-after", type=float, default=0, help="retry-after seconds sent with 429")
+    parser.add_argument("--seed", type=int, default=None, help="seed for latency jitter and fault injection")
+    args = parser.parse_args(argv)
+
+    responder = fixed_responder(args.response) if args.response else ReplayResponder(load_recordings(args.recordings))
+    api = StubAPI(
+        responder, args.batch_delay, args.latency, args.jitter,
+        {"overloaded": args.overload_rate, "rate_limit": args.rate_limit_rate, "malformed": args.malformed_rate},
+        args.retry_after, args.chunk_chars, args.chunk_delay, args.seed,
+    )
+    server = make_server(api, args.host, args.port)
+    print(f"stub API listening on http://{args.host}:{server.server_address[1]}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+רובייקטיבי - Stage Tracing
+==========================
+Lightweight per-stage latency and cost instrumentation. Stages are timed with
+span() (a context manager) or @traced; each finished span is logged as one JSON
+line and kept in a bounded window of recent samples, from which p50/p95 per stage
+are exported in the Prometheus text format - over HTTP or to a file for the
+node-exporter textfile collector. Token usage is converted to USD per model.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+STAGE_WINDOW = 1000  # most recent samples kept per stage for the quantiles
+QUANTILES = (0.5, 0.95)
+METRIC_PREFIX = "pension_bot"
+
+# USD per million tokens: (input, output, cache write, cache read), matched by model name prefix
+MODEL_PRICES = {
+    "claude-sonnet-4": (3.0, 15.0, 3.75, 0.30),
+    "claude-opus-4": (15.0, 75.0, 18.75, 1.50),
+    "claude-3-5-haiku": (0.80, 4.0, 1.0, 0.08),
+    "claude-haiku-4-5": (1.0, 5.0, 1.25, 0.10),
+}
+BATCH_DISCOUNT = 0.5  # Message Batches are billed at half price
+
+TOKEN_KINDS = ("input_uncached", "input_cache_write", "input_cache_read", "output")
+
+logger = logging.getLogger("pension_bot.trace")
+
+
+# ─── Cost ───
+
+def model_price(model):
+    """Price tuple of the longest matching MODEL_PRICES prefix, or None."""
+    matches = [prefix for prefix in MODEL_PRICES if (model or "").startswith(prefix)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+
+def usage_tokens(usage):
+    """{kind: count} for TOKEN_KINDS from a message.usage object (or dict)."""
+    def get(name):
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, 0)
+        return value or 0
+
+    return {
+        "input_uncached": get("input_tokens"),
+        "input_cache_write": get("cache_creation_input_tokens"),
+        "input_cache_read": get("cache_read_input_tokens"),
+        "output": get("output_tokens"),
+    }
+
+
+def usage_cost(usage, model, batch=False):
+    """USD cost of one message's usage, or None for an unknown model."""
+    price = model_price(model)
+    if usage is None or price is None:
+        return None
+    tokens = usage_tokens(usage)
+    cost = sum(tokens[kind] * rate for kind, rate in zip(TOKEN_KINDS, (price[0], price[2], price[3], price[1])))
+    cost /= 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+# ─── Tracer ───
+
+class _Summary:
+    """Count and sum of all observations plus a window of recent ones for quantiles."""
+
+    def __init__(self, window):
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantile(self, q):
+        ordered = sorted(self.recent)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Tracer:
+    """Thread-safe store of stage durations, token counts and report costs."""
+
+    def __init__(self, window=STAGE_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._costs = {}
+        self._tokens = {}
+
+    def observe(self, stage, seconds, **attrs):
+        """Record a finished stage and log it as a JSON line."""
+        with self._lock:
+            summary = self._stages.get(stage)
+            if summary is None:
+                summary = self._stages[stage] = _Summary(self.window)
+            summary.add(seconds)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"event": "span", "stage": stage, "seconds": round(seconds, 6), **attrs},
+                                   ensure_ascii=False, default=str))
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """Time the with-block as stage. The yielded dict can take extra log attributes."""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = type(e).__name__
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, **attrs)
+
+    def traced(self, stage=None):
+        """Decorator timing every call of a function (stage defaults to its name)."""
+        def decorate(fn):
+            name = stage or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def record_usage(self, usage, model, batch=False):
+        """Add a message's token counts under its model. Returns its USD cost (None if unknown)."""
+        if usage is None:
+            return None
+        tokens = usage_tokens(usage)
+        with self._lock:
+            for kind, count in tokens.items():
+                self._tokens[(model, kind)] = self._tokens.get((model, kind), 0) + count
+        return usage_cost(usage, model, batch)
+
+    def observe_report_cost(self, model, cost):
+        """Record the total USD cost of extracting one report."""
+        if cost is None:
+            return
+        with self._lock:
+            summary = self._costs.get(model)
+            if summary is None:
+                summary = self._costs[model] = _Summary(self.window)
+            summary.add(cost)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"event": "report_cost", "model": model, "usd": round(cost, 6)}))
+
+    def summary(self):
+        """{"stages": {stage: {count, sum, p50, p95}}, "report_cost_usd": {model: ...}, "tokens": {...}}."""
+        with self._lock:
+            def describe(summaries):
+                return {
+                    name: {"count": s.count, "sum": s.sum,
+                           **{f"p{int(q * 100)}": s.quantile(q) for q in QUANTILES}}
+                    for name, s in sorted(summaries.items())
+                }
+            return {
+                "stages": describe(self._stages),
+                "report_cost_usd": describe(self._costs),
+                "tokens": {f"{model}/{kind}": count for (model, kind), count in sorted(self._tokens.items())},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._costs.clear()
+            self._tokens.clear()
+
+    # ── Prometheus Export ──
+
+    def render_prometheus(self, extra_counters=None):
+        """All metrics in the Prometheus text exposition format.
+        extra_counters ({name: number}) are exported as pension_bot_api_<name>."""
+        lines = []
+
+        def summary_lines(metric, label, summaries, help_text):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} summary")
+            for name, s in sorted(summaries.items()):
+                tag = f'{label}="{_label_value(name)}"'
+                for q in QUANTILES:
+                    lines.append(f'{metric}{{{tag},quantile="{q}"}} {s.quantile(q):.6g}')
+                lines.append(f"{metric}_sum{{{tag}}} {s.sum:.6g}")
+                lines.append(f"{metric}_count{{{tag}}} {s.count}")
+
+        with self._lock:
+            summary_lines(f"{METRIC_PREFIX}_stage_seconds", "stage", self._stages,
+                          "Duration of each processing stage.")
+            summary_lines(f"{METRIC_PREFIX}_report_cost_usd", "model", self._costs,
+                          "Model cost of extracting one report.")
+            lines.append(f"# HELP {METRIC_PREFIX}_tokens_total Tokens used, by model and kind.")
+            lines.append(f"# TYPE {METRIC_PREFIX}_tokens_total counter")
+            for (model, kind), count in sorted(self._tokens.items()):
+                lines.append(f'{METRIC_PREFIX}_tokens_total{{model="{_label_value(model)}",kind="{kind}"}} {count}')
+
+        for name, value in sorted((extra_counters or {}).items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                metric = f"{METRIC_PREFIX}_api_{_metric_name(name)}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value:.6g}")
+        return "\n".join(lines) + "\n"
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric_name(name):
+    return "".join(ch if ch.isalnum() else "_" for ch in name)
+
+
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+
+
+# ─── Exporters ───
+
+def write_prometheus(path, extra_counters=None, source=tracer):
+    """Write the metrics text to path atomically (for the node-exporter textfile collector)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(source.render_prometheus(extra_counters))
+    os.replace(tmp_path, path)
+
+
+def start_metrics_server(host="127.0.0.1", port=9464, extra=None, source=tracer):
+    """Serve GET /metrics on a daemon thread. extra() returns counters to add. Returns the server."""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            payload = source.render_prometheus(extra() if extra else None).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_metrics_file_writer(path, interval_seconds=15.0, extra=None, source=tracer):
+    """Rewrite the metrics file every interval_seconds on a daemon thread. Returns the thread."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    def loop():
+        while True:
+            try:
+                write_prometheus(path, extra() if extra else None, source)
+            except OSError:
+                logger.exception("could not write metrics file %s", path)
+            time.sleep(interval_seconds)
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread
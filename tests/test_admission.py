@@ -0,0 +1,102 @@
+import sqlite3
+import time
+
+import pytest
+
+import core.admission as admission
+from core.admission import (
+    AdmissionController, MemoryBucketStore, SQLiteBucketStore,
+    ADMITTED, CLIENT_LIMIT, GLOBAL_LIMIT, QUEUE_FULL,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBucketStore()
+    return SQLiteBucketStore(str(tmp_path / "buckets.sqlite3"))
+
+
+def bucket_keys(store):
+    if isinstance(store, MemoryBucketStore):
+        return set(store._buckets)
+    with sqlite3.connect(store.path) as conn:
+        return {key for key, in conn.execute("SELECT key FROM buckets")}
+
+
+def test_client_limit_refuses_at_once(store):
+    controller = AdmissionController(store, client_burst=2, client_per_hour=1, global_burst=100)
+    assert [controller.admit("ip:a").reason for _ in range(3)] == [ADMITTED, ADMITTED, CLIENT_LIMIT]
+    refused = controller.admit("ip:a")
+    assert refused.waited_seconds < 0.05
+    assert refused.retry_after_seconds > 0
+    # Other clients have their own bucket
+    assert controller.admit("ip:b").admitted
+
+
+def test_global_limit_waits_then_sheds(store):
+    controller = AdmissionController(store, client_burst=100, global_burst=1, global_per_minute=60 * 20,
+                                     max_wait_seconds=1)
+    assert controller.admit("ip:a").admitted
+    # The global bucket refills a token in 50ms, within max_wait_seconds
+    waited = controller.admit("ip:b")
+    assert waited.admitted
+    assert waited.waited_seconds > 0
+
+    slow = AdmissionController(store, client_burst=100, global_burst=1, global_per_minute=1, max_wait_seconds=0.1)
+    store.prune(float("inf"))
+    assert slow.admit("ip:a").admitted
+    shed = slow.admit("ip:b")
+    assert shed.reason == GLOBAL_LIMIT
+    assert shed.retry_after_seconds > 0.1
+
+
+def test_refused_request_takes_no_token(store):
+    controller = AdmissionController(store, client_burst=1, client_per_hour=1, global_burst=2, global_per_minute=0)
+    assert controller.admit("ip:a").admitted
+    assert controller.admit("ip:a").reason == CLIENT_LIMIT
+    # The refusal above did not use the global bucket's last token
+    assert controller.admit("ip:b").admitted
+
+
+def test_queue_full(store):
+    controller = AdmissionController(store, max_queue_depth=2)
+    assert controller.admit("ip:a", queue_depth=2).reason == QUEUE_FULL
+    assert controller.admit("ip:a", queue_depth=1).admitted
+    assert AdmissionController(store, max_queue_depth=0).admit("ip:a", queue_depth=1000).admitted
+
+
+def test_stats_count_outcomes(store):
+    controller = AdmissionController(store, client_burst=1, client_per_hour=1)
+    controller.admit("ip:a")
+    controller.admit("ip:a")
+    stats = controller.stats()
+    assert stats["admission/admitted"] == 1
+    assert stats["admission/client_limit"] == 1
+
+
+def test_prune_drops_only_idle_buckets(store):
+    now = time.time()
+    store.take([("client:old", 10, 1.0)], now - 100)
+    store.take([("client:new", 10, 1.0)], now)
+    store.prune(now - 50)
+    assert bucket_keys(store) == {"client:new"}
+
+
+def test_controller_prunes_refilled_buckets(store, monkeypatch):
+    controller = AdmissionController(store, client_burst=2, client_per_hour=3600, global_burst=10,
+                                     global_per_minute=600)
+    assert controller.idle_seconds == 2  # slowest refill from empty: the client bucket, 2 tokens at 1/s
+    controller.admit("ip:a")
+    assert bucket_keys(store) == {"client:ip:a", "global"}
+
+    clock = [time.time() + admission.PRUNE_INTERVAL_SECONDS + 10]
+    monkeypatch.setattr(admission.time, "time", lambda: clock[0])
+    controller.admit("ip:b")
+    # ip:a's bucket was idle long enough to be full again, so it was dropped
+    assert bucket_keys(store) == {"client:ip:b", "global"}
+
+    # Within the interval nothing is pruned
+    clock[0] += 5
+    controller.admit("ip:c")
+    assert bucket_keys(store) == {"client:ip:b", "client:ip:c", "global"}
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from core.deposit_frame import AMOUNT_COLUMNS, DepositFrame, build_deposit_frame, parse_deposit_month
+from core.pension_core import detect_deposit_source
+from benchmarks.synthetic import generate_report
+
+
+def reports(count=200, seed=5):
+    """Synthetic reports with some amounts blanked out, as models return them."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        data = generate_report(rng, self_employed=rng.random() < 0.3)
+        for row in data["deposits"] + data["late_deposits"]:
+            for col in AMOUNT_COLUMNS:
+                if rng.random() < 0.1:
+                    row[col] = None
+        yield data
+
+
+# ── The per-row loops the frame replaced ──
+
+def old_total(rows, col):
+    return sum(r.get(col, 0) or 0 for r in rows)
+
+
+def old_monthly_totals(rows, value_col, year):
+    totals = {}
+    for dep in rows:
+        value = dep.get(value_col)
+        if value is None:
+            value = dep.get("salary")
+        if value is None:
+            value = dep.get("total")
+        if not value:
+            continue
+        month_year = parse_deposit_month(dep)
+        if month_year is None:
+            continue
+        month, row_year = month_year
+        if row_year == year and 1 <= month <= 12:
+            totals[month] = totals.get(month, 0) + float(value)
+    return totals
+
+
+def test_column_totals_match_row_sums():
+    for data in reports():
+        rows = data["deposits"] + data["late_deposits"]
+        frame = build_deposit_frame(data)
+        assert frame.size == len(rows)
+        for col in AMOUNT_COLUMNS:
+            assert frame.total(col) == pytest.approx(old_total(rows, col))
+
+
+def test_monthly_totals_match_row_loop():
+    for data in reports():
+        rows = data["deposits"] + data["late_deposits"]
+        frame = build_deposit_frame(data)
+        years = {y for _, y in filter(None, map(parse_deposit_month, rows))}
+        for year in years:
+            for value_col in ("salary", "total"):
+                assert frame.monthly_totals(value_col, year) == pytest.approx(old_monthly_totals(rows, value_col, year))
+
+
+def test_deposit_source_matches_detect_deposit_source():
+    rows = [{"employee_contribution": 500, "employer_contribution": 0, "total": 500}]
+    assert DepositFrame(rows).deposit_source() == "עצמאי"
+    rows.append({"employee_contribution": 300, "employer_contribution": 325, "total": 625})
+    assert DepositFrame(rows).deposit_source() == "שכיר + עצמאי"
+    assert DepositFrame([]).deposit_source() == "שכיר"
+    for data in reports(50):
+        assert build_deposit_frame(data).deposit_source() == detect_deposit_source(data)
+
+
+def test_string_and_missing_amounts():
+    frame = DepositFrame([
+        {"salary": "12,000", "total": "2,220.5"},
+        {"salary": None, "total": "n/a"},
+        {"total": 100},
+    ])
+    assert frame.total("salary") == 12000
+    assert frame.total("total") == pytest.approx(2320.5)
+    assert frame.total("severance") == 0
+
+
+def test_empty_frame():
+    frame = DepositFrame([])
+    assert frame.total("total") == 0
+    assert frame.median_deposit_rate() is None
+    assert frame.monthly_totals("salary", 2024) == {}
@@ -0,0 +1,125 @@
+import threading
+import time
+
+from core.extraction import ExtractionError
+from core.jobs import ExtractionJobQueue, DONE, FAILED
+
+
+def wait_finished(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.01)
+    raise TimeoutError(job_id)
+
+
+class BlockingExtract:
+    """extract_fn stub that holds every call until release() and counts the calls."""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.started = threading.Event()
+        self._release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, pdf_bytes, on_progress):
+        with self._lock:
+            self.calls += 1
+        self.started.set()
+        on_progress({"header": {}})
+        self._release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result if self.result is not None else {"pdf": pdf_bytes.decode()}
+
+    def release(self):
+        self._release.set()
+
+
+def test_concurrent_submits_of_same_pdf_share_one_job():
+    extract = BlockingExtract()
+    queue = ExtractionJobQueue(extract, max_workers=4)
+    sessions = 16
+    barrier = threading.Barrier(sessions)
+    job_ids = [None] * sessions
+
+    def session(i):
+        barrier.wait()
+        job_ids[i] = queue.submit(b"same")
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert extract.started.wait(5)
+    assert len(set(job_ids)) == 1
+    assert queue.is_in_flight(b"same")
+    assert queue.coalesced == sessions - 1
+
+    extract.release()
+    job = wait_finished(queue, job_ids[0])
+    assert job.status == DONE
+    assert job.result == {"pdf": "same"}
+    assert extract.calls == 1
+    assert not queue.is_in_flight(b"same")
+
+
+def test_distinct_pdfs_are_not_coalesced():
+    extract = BlockingExtract()
+    queue = ExtractionJobQueue(extract, max_workers=2)
+    first, second = queue.submit(b"one"), queue.submit(b"two")
+    assert first != second
+    assert queue.pending_count() == 2
+    extract.release()
+    assert wait_finished(queue, first).result == {"pdf": "one"}
+    assert wait_finished(queue, second).result == {"pdf": "two"}
+    assert extract.calls == 2
+    assert queue.coalesced == 0
+
+
+def test_resubmitting_a_finished_pdf_starts_a_new_job():
+    extract = BlockingExtract()
+    extract.release()
+    queue = ExtractionJobQueue(extract)
+    first = queue.submit(b"pdf")
+    wait_finished(queue, first)
+    second = queue.submit(b"pdf")
+    assert second != first
+    wait_finished(queue, second)
+    assert extract.calls == 2
+
+
+def test_partial_sections_are_stored_on_the_job():
+    extract = BlockingExtract()
+    queue = ExtractionJobQueue(extract)
+    job_id = queue.submit(b"pdf")
+    assert extract.started.wait(5)
+    assert queue.get(job_id).partial == {"header": {}}
+    extract.release()
+    wait_finished(queue, job_id)
+
+
+def test_failures_finish_the_job_and_clear_in_flight():
+    extract = BlockingExtract(error=ExtractionError("שגיאה"))
+    extract.release()
+    queue = ExtractionJobQueue(extract)
+    job = wait_finished(queue, queue.submit(b"bad"))
+    assert job.status == FAILED
+    assert job.error == "שגיאה"
+    assert not queue.is_in_flight(b"bad")
+
+    extract.error = RuntimeError("crash")
+    job = wait_finished(queue, queue.submit(b"crash"))
+    assert job.status == FAILED
+    assert job.error  # generic user-facing message, not the exception text
+    assert "crash" not in job.error
+
+
+def test_unknown_job_id():
+    queue = ExtractionJobQueue(BlockingExtract())
+    assert queue.get("missing") is None
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from core.json_stream import recover_json, close_truncated
+
+
+REPORT = {
+    "header": {"fund_name": "מיטב", "report_period": "רבעון 3 2024"},
+    "movements": [{"label": "יתרה", "amount": 1000}],
+    "deposits": [{"month": "01/2024", "total": 100}, {"month": "02/2024", "total": 200}],
+    "late_deposits": [],
+}
+
+
+def test_complete_answer_ignores_code_fences_and_trailing_text():
+    text = "```json\n" + json.dumps(REPORT, ensure_ascii=False) + "\n```\nDone."
+    recovered = recover_json(text)
+    assert recovered == {"data": REPORT, "complete": True, "truncated": None, "failed": []}
+
+
+def test_truncated_array_keeps_its_complete_items():
+    text = json.dumps(REPORT, ensure_ascii=False)
+    cut = text[:text.index('{"month": "02/2024"') + 10]
+    recovered = recover_json(cut)
+    assert not recovered["complete"]
+    assert recovered["truncated"] == "deposits"
+    assert recovered["data"]["header"] == REPORT["header"]
+    assert recovered["data"]["deposits"] == REPORT["deposits"][:1]
+
+
+def test_member_cut_before_its_value_is_truncated_not_recovered():
+    recovered = recover_json('{"header": {"fund_name": "מיטב"}, "deposits_total": ')
+    assert recovered["data"] == {"header": {"fund_name": "מיטב"}}
+    assert recovered["truncated"] == "deposits_total"
+
+
+def test_broken_member_is_reported_as_failed():
+    recovered = recover_json('{"header": {"a": 1}, "fees": [1, 2,, 3], "movements": [')
+    assert recovered["failed"] == ["fees"]
+    assert "fees" not in recovered["data"]
+    assert recovered["data"]["header"] == {"a": 1}
+
+
+def test_nothing_recoverable_raises():
+    with pytest.raises(ValueError):
+        recover_json("I could not read the report.")
+
+
+def test_close_truncated_never_cuts_an_object_short():
+    assert close_truncated('{"a": [1, 2, {"x": 1}, {"y": ') == {"a": [1, 2, {"x": 1}]}
+    with pytest.raises(ValueError):
+        close_truncated('{"a": {"b": ')
+
+
+def test_close_truncated_ignores_brackets_inside_strings():
+    assert close_truncated('{"a": [{"s": "x,]}y"}, {"s": "z') == {"a": [{"s": "x,]}y"}]}
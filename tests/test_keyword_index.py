@@ -0,0 +1,113 @@
+import random
+
+from core.keyword_index import KeywordIndex
+from core.pension_core import (
+    EQUITY_TRACKS, GOV_EMPLOYERS, find_fund_key, is_equity_track, is_age_related_track,
+    classify_tracks, is_gov_employer,
+)
+from benchmarks.synthetic import AGE_TRACKS, OTHER_TRACKS, EMPLOYERS
+
+
+# ── The linear substring scans the index replaced ──
+
+def old_find_fund_key(fund_name):
+    for key in EQUITY_TRACKS:
+        if key in fund_name:
+            return key
+    return None
+
+
+def old_is_equity_track(track_name, fund_key):
+    if not fund_key or fund_key not in EQUITY_TRACKS:
+        return False
+
+    def normalize(s):
+        return s.lower().strip().replace(" ", "").replace("&amp;", "&")
+
+    track_norm = normalize(track_name)
+    for eq in EQUITY_TRACKS[fund_key]["tracks"]:
+        eq_norm = normalize(eq)
+        if eq_norm in track_norm or track_norm in eq_norm:
+            return True
+    return any(kw in track_name.lower() for kw in ["מנייתי", "מניות", "s&p", "500", "הלכה"])
+
+
+def old_is_age_related_track(track_name):
+    return any(kw in track_name for kw in ["בני 50", "50 ומטה", "50-60", "עד 50", "60 ומעלה", "כללי"])
+
+
+def old_flags(name):
+    name_lower = name.lower().strip()
+    return {
+        "has_sp500": "s&p" in name_lower or "s&amp;p" in name_lower or "500" in name_lower,
+        "has_madedei": "מדדי מניות" in name or "עוקב מדדי מניות" in name,
+        "has_halacha": "הלכה" in name,
+    }
+
+
+def old_is_gov_employer(employer_name):
+    if not employer_name:
+        return False
+    employer = employer_name.strip()
+    return any(gov in employer or employer in gov for gov in GOV_EMPLOYERS)
+
+
+def sample_strings(words, count, seed):
+    """The words themselves, fragments of them, and words embedded in other text."""
+    rng = random.Random(seed)
+    samples = list(words)
+    for _ in range(count):
+        word = rng.choice(words)
+        start = rng.randrange(len(word))
+        fragment = word[start:rng.randint(start + 1, len(word))]
+        samples += [fragment, f"{rng.choice(words)} {fragment}", f"קרן {word} בע\"מ", word.upper(), f" {word} "]
+    return samples
+
+
+FUND_NAMES = sample_strings(list(EQUITY_TRACKS) + ["מגדל מקפת", "קרן אחרת"], 300, 1)
+TRACK_NAMES = sample_strings(
+    [t for fund in EQUITY_TRACKS.values() for t in fund["tracks"]] + AGE_TRACKS + OTHER_TRACKS
+    + ["עוקב מדדי מניות", "S&amp;P 500", "מסלול כללי", "מסלול לבני 50-60"], 500, 2,
+)
+EMPLOYER_NAMES = sample_strings(GOV_EMPLOYERS + EMPLOYERS, 500, 3) + ["", "   "]
+
+
+def test_find_fund_key_matches_substring_scan():
+    for name in FUND_NAMES:
+        assert find_fund_key(name) == old_find_fund_key(name), name
+
+
+def test_track_predicates_match_substring_scans():
+    for name in TRACK_NAMES:
+        assert is_age_related_track(name) == old_is_age_related_track(name), name
+        for fund_key in list(EQUITY_TRACKS) + [None, "לא ידוע"]:
+            assert is_equity_track(name, fund_key) == old_is_equity_track(name, fund_key), (name, fund_key)
+
+
+def test_classify_tracks_matches_substring_scans():
+    rng = random.Random(4)
+    for _ in range(200):
+        tracks = [{"track_name": rng.choice(TRACK_NAMES)} for _ in range(rng.randint(1, 4))]
+        fund_name = rng.choice(FUND_NAMES)
+        result = classify_tracks(tracks, fund_name)
+        fund_key = old_find_fund_key(fund_name)
+        names = [t["track_name"] for t in tracks]
+        assert result["equity_tracks"] == [n for n in names if fund_key and old_is_equity_track(n, fund_key)]
+        assert result["has_age_track"] == any(old_is_age_related_track(n) for n in names)
+        for flag in ("has_sp500", "has_madedei", "has_halacha"):
+            assert result[flag] == any(old_flags(n)[flag] for n in names), (flag, names)
+
+
+def test_is_gov_employer_matches_both_way_substring_scan():
+    for name in EMPLOYER_NAMES:
+        assert is_gov_employer(name) == old_is_gov_employer(name), name
+
+
+def test_index_reports_every_occurrence():
+    index = KeywordIndex([("he", "a"), ("she", "b"), ("hers", "c"), ("his", "a")])
+    matches = sorted(index.iter_matches("ushers"))
+    assert matches == [(3, "he", "a"), (3, "she", "b"), (5, "hers", "c")]
+    assert index.categories("ushers") == {"a", "b", "c"}
+    assert index.first_category("xhisx") == "a"
+    assert index.first_category("nothing") is None
+    assert index.keyword_containing("er") == {"c"}